@@ -4,6 +4,8 @@
  * Handles shorthand order parsing requests from the web interface
  */
 
+require_once __DIR__ . '/parser_client.php';
+
 header('Content-Type: application/json');
 header('Access-Control-Allow-Origin: *');
 header('Access-Control-Allow-Methods: POST');
@@ -28,22 +30,16 @@ if (!$data || !isset($data['input'])) {
 $shorthandInput = $data['input'];
 
 try {
-    // Call Python parser
-    $pythonScript = __DIR__ . '/parse_shorthand.py';
-    $command = "python \"$pythonScript\" " . escapeshellarg($shorthandInput);
-    
-    // Execute command and capture output
-    $output = shell_exec($command . ' 2>&1');
+    $result = null;
     
-    if ($output === null) {
-        throw new Exception('Failed to execute Python parser');
+    // Incremental sessions only re-resolve edited lines
+    if (array_key_exists('session_id', $data)) {
+        $result = parse_shorthand_session($data['session_id'], $shorthandInput, !empty($data['full']));
     }
     
-    // Try to decode JSON output
-    $result = json_decode($output, true);
-    
+    // Ask the resident parser service (falls back to the CLI script)
     if ($result === null) {
-        throw new Exception('Invalid JSON output from parser: ' . $output);
+        $result = parse_shorthand_order($shorthandInput);
     }
     
     // Return parsed result
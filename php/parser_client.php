@@ -0,0 +1,116 @@
+<?php
+/**
+ * Order Entry System - Parser Service Client
+ * Talks to the resident Python parser service (python/parser_service.py)
+ * and falls back to spawning the CLI scripts when the service is not running
+ */
+
+if (!defined('PARSER_SERVICE_URL')) {
+    define('PARSER_SERVICE_URL', 'http://127.0.0.1:8765');
+}
+
+/**
+ * POST a JSON payload to the parser service.
+ * Returns the decoded response, or null if the service is unreachable.
+ */
+function call_parser_service($path, $payload, $timeout = 5) {
+    $context = stream_context_create([
+        'http' => [
+            'method' => 'POST',
+            'header' => "Content-Type: application/json\r\n",
+            'content' => json_encode($payload),
+            'timeout' => $timeout,
+            'ignore_errors' => true
+        ]
+    ]);
+
+    $response = @file_get_contents(PARSER_SERVICE_URL . $path, false, $context);
+    if ($response === false) {
+        return null;
+    }
+
+    return json_decode($response, true);
+}
+
+/**
+ * Run a Python CLI script and decode its JSON output (legacy path).
+ * Large payloads can be passed on stdin (use '-' as the argument) to stay
+ * clear of command line length limits.
+ */
+function call_parser_script($script, $args, $stdin = null) {
+    $command = "python \"" . __DIR__ . "/$script\"";
+    foreach ($args as $arg) {
+        $command .= " " . escapeshellarg($arg);
+    }
+
+    if ($stdin === null) {
+        $output = shell_exec($command . ' 2>&1');
+    } else {
+        $process = proc_open($command . ' 2>&1', [0 => ['pipe', 'r'], 1 => ['pipe', 'w']], $pipes);
+        if (!is_resource($process)) {
+            throw new Exception("Failed to execute $script");
+        }
+        fwrite($pipes[0], $stdin);
+        fclose($pipes[0]);
+        $output = stream_get_contents($pipes[1]);
+        fclose($pipes[1]);
+        proc_close($process);
+    }
+
+    if ($output === null) {
+        throw new Exception("Failed to execute $script");
+    }
+
+    $result = json_decode($output, true);
+
+    if ($result === null) {
+        throw new Exception("Invalid JSON output from $script: " . $output);
+    }
+
+    return $result;
+}
+
+function parse_shorthand_order($shorthandInput) {
+    $result = call_parser_service('/parse', ['input' => $shorthandInput]);
+    if ($result !== null) {
+        return $result;
+    }
+    return call_parser_script('parse_shorthand.py', [$shorthandInput]);
+}
+
+/**
+ * Incremental parse-as-you-type: returns only the lines that changed since
+ * the session's previous update, or null when the service is not running
+ * (sessions live in the service, so there is no CLI fallback).
+ */
+function parse_shorthand_session($sessionId, $shorthandInput, $full = false) {
+    $payload = ['input' => $shorthandInput, 'full' => $full];
+    if ($sessionId) {
+        $payload['session_id'] = $sessionId;
+    }
+    return call_parser_service('/session', $payload);
+}
+
+function reparse_shorthand_order($order, $newCustomerId) {
+    $result = call_parser_service('/reparse', [
+        'order' => $order,
+        'new_customer_id' => $newCustomerId
+    ]);
+    if ($result !== null) {
+        return $result;
+    }
+    return call_parser_script('reparse_with_customer.py', ['-', $newCustomerId], json_encode($order));
+}
+
+/**
+ * Customer correction against a stored parse session: only the session id
+ * is sent and only items whose resolution changed come back
+ */
+function reparse_shorthand_session($sessionId, $newCustomerId, $full = false) {
+    return call_parser_service('/session/reparse', [
+        'session_id' => $sessionId,
+        'new_customer_id' => $newCustomerId,
+        'full' => $full
+    ]);
+}
+?>
@@ -4,6 +4,8 @@
  * Handles customer correction and re-contextualization
  */
 
+require_once __DIR__ . '/parser_client.php';
+
 header('Content-Type: application/json');
 header('Access-Control-Allow-Origin: *');
 header('Access-Control-Allow-Methods: POST');
@@ -19,32 +21,32 @@ if ($_SERVER['REQUEST_METHOD'] !== 'POST') {
 $input = file_get_contents('php://input');
 $data = json_decode($input, true);
 
-if (!$data || !isset($data['order']) || !isset($data['new_customer_id'])) {
+if (!$data || (!isset($data['order']) && !isset($data['session_id'])) || !isset($data['new_customer_id'])) {
     http_response_code(400);
-    echo json_encode(['error' => 'Invalid input - need order and new_customer_id']);
+    echo json_encode(['error' => 'Invalid input - need session_id or order, and new_customer_id']);
     exit;
 }
 
-$order = $data['order'];
+$order = $data['order'] ?? null;
 $newCustomerId = $data['new_customer_id'];
 
 try {
-    // Call Python reparser
-    $pythonScript = __DIR__ . '/reparse_with_customer.py';
-    $command = "python \"$pythonScript\" " . escapeshellarg(json_encode($order)) . " " . escapeshellarg($newCustomerId);
-    
-    // Execute command and capture output
-    $output = shell_exec($command . ' 2>&1');
+    $result = null;
     
-    if ($output === null) {
-        throw new Exception('Failed to execute Python reparser');
+    // Stored parse session: only the id travels, only changed items come back
+    if (isset($data['session_id'])) {
+        $result = reparse_shorthand_session($data['session_id'], $newCustomerId, !empty($data['full']));
+        if ($result === null || !empty($result['session_expired'])) {
+            if ($order === null) {
+                throw new Exception('Parse session expired - resend the order');
+            }
+            $result = null;
+        }
     }
     
-    // Try to decode JSON output
-    $result = json_decode($output, true);
-    
+    // Ask the resident parser service (falls back to the CLI script)
     if ($result === null) {
-        throw new Exception('Invalid JSON output from reparser: ' . $output);
+        $result = reparse_shorthand_order($order, $newCustomerId);
     }
     
     // Return reparsed result
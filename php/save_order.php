@@ -28,17 +28,37 @@ if (!$input || !isset($input['parsed_order'])) {
 $parsed_order = $input['parsed_order'];
 $action = $input['action'] ?? 'save_draft';
 
+// Same keys as python/order_keys.py: the caller's key (body or
+// Idempotency-Key header), else customer + normalized input + 10 minute bucket.
+// The previous bucket is checked too: a repeat within 10 minutes is always
+// caught, and one up to 20 minutes later can be
+$customer_id = $parsed_order['customer']['customer_id'] ?? null;
+$raw_input = $parsed_order['raw_input'] ?? '';
+$idempotency_keys = orderIdempotencyKeys(
+    $customer_id,
+    $raw_input,
+    $input['idempotency_key'] ?? ($_SERVER['HTTP_IDEMPOTENCY_KEY'] ?? null)
+);
+
 try {
     $pdo = new PDO("mysql:host=$host;dbname=$dbname", $username, $password);
     $pdo->setAttribute(PDO::ATTR_ERRMODE, PDO::ERRMODE_EXCEPTION);
     
-    // Start transaction
-    $pdo->beginTransaction();
+    // A double-click or retry gets the order it already created
+    $existing = findSavedOrder($pdo, $idempotency_keys);
+    if ($existing) {
+        echo json_encode(savedOrderResponse($existing, true));
+        exit();
+    }
     
-    // Generate order number
+    // Generate order number (before the transaction, so the counter row
+    // is only locked for its own statement)
     $order_date = date('Y-m-d');
     $order_number = generateOrderNumber($pdo, $order_date);
     
+    // Start transaction
+    $pdo->beginTransaction();
+    
     // Determine status based on action
     $status = ($action === 'save_and_submit') ? 'submitted' : 'draft';
     
@@ -48,24 +68,28 @@ try {
         $total_amount += ($item['quantity'] ?? 1) * ($item['price'] ?? 0);
     }
     
-    // Insert order
+    // Insert order (idempotency_key is unique, so a concurrent repeat fails here;
+    // left out entirely while the column doesn't exist yet)
+    $key_column = $idempotency_keys ? ', idempotency_key' : '';
+    $key_placeholder = $idempotency_keys ? ', ?' : '';
     $stmt = $pdo->prepare("
         INSERT INTO orders (order_number, customer_id, order_date, status, 
-                           total_amount, raw_input, created_at, updated_at)
-        VALUES (?, ?, ?, ?, ?, ?, NOW(), NOW())
+                           total_amount, raw_input$key_column, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?$key_placeholder, NOW(), NOW())
     ");
     
-    $customer_id = $parsed_order['customer']['customer_id'] ?? null;
-    $raw_input = $parsed_order['raw_input'] ?? '';
-    
-    $stmt->execute([
+    $order_values = [
         $order_number,
         $customer_id,
         $order_date,
         $status,
         $total_amount,
         $raw_input
-    ]);
+    ];
+    if ($idempotency_keys) {
+        $order_values[] = $idempotency_keys[0];
+    }
+    $stmt->execute($order_values);
     
     $order_id = $pdo->lastInsertId();
     
@@ -105,7 +129,19 @@ try {
     ]);
 
 } catch (Exception $e) {
-    $pdo->rollBack();
+    if (isset($pdo) && $pdo->inTransaction()) {
+        $pdo->rollBack();
+    }
+    
+    // Lost the race to a concurrent save of the same order
+    if ($e instanceof PDOException && $e->getCode() === '23000' && $idempotency_keys) {
+        $existing = findSavedOrder($pdo, $idempotency_keys);
+        if ($existing) {
+            echo json_encode(savedOrderResponse($existing, true));
+            exit();
+        }
+    }
+    
     http_response_code(500);
     echo json_encode([
         'success' => false,
@@ -113,29 +149,98 @@ try {
     ]);
 }
 
+function orderIdempotencyKeys($customer_id, $raw_input, $idempotency_key = null, $window = 600) {
+    if ($idempotency_key !== null && $idempotency_key !== '') {
+        return [hash('sha256', 'key:' . $idempotency_key)];
+    }
+    if (!$customer_id) {
+        return [];
+    }
+    
+    $normalized = strtolower(trim(preg_replace('/\s+/', ' ', $raw_input), ' '));
+    $bucket = intdiv(time(), $window);
+    
+    // The previous bucket too, so a retry just after a boundary still matches
+    return [
+        hash('sha256', (int) $customer_id . ':' . $bucket . ':' . $normalized),
+        hash('sha256', (int) $customer_id . ':' . ($bucket - 1) . ':' . $normalized)
+    ];
+}
+
+function findSavedOrder($pdo, &$idempotency_keys) {
+    if (!$idempotency_keys) {
+        return null;
+    }
+    $placeholders = implode(', ', array_fill(0, count($idempotency_keys), '?'));
+    $stmt = $pdo->prepare("
+        SELECT id, order_number, status FROM orders
+        WHERE idempotency_key IN ($placeholders)
+        ORDER BY id
+        LIMIT 1
+    ");
+    try {
+        $stmt->execute($idempotency_keys);
+    } catch (PDOException $e) {
+        if (($e->errorInfo[1] ?? null) !== 1054) {
+            throw $e;
+        }
+        // Unknown column: sql/add_order_idempotency_key.sql not run yet
+        error_log("Idempotency keys unavailable ({$e->getMessage()}), saving without deduplication");
+        $idempotency_keys = [];
+        return null;
+    }
+    return $stmt->fetch(PDO::FETCH_ASSOC) ?: null;
+}
+
+function savedOrderResponse($order, $duplicate = false) {
+    return [
+        'success' => true,
+        'order_id' => $order['id'],
+        'order_number' => $order['order_number'],
+        'status' => $order['status'],
+        'duplicate' => $duplicate,
+        'message' => $duplicate ? 'Order already saved' : 'Order saved successfully'
+    ];
+}
+
 function generateOrderNumber($pdo, $order_date) {
     // Format: YYYYMMDD-XXXX (where XXXX is sequential number for the day)
     $date_prefix = str_replace('-', '', $order_date);
     
-    // Get the last order number for today
+    // Reserve the next number with one atomic upsert on the day's counter
+    // (sql/add_order_number_sequences.sql), shared with the Python OrderManager
     $stmt = $pdo->prepare("
-        SELECT order_number 
-        FROM orders 
-        WHERE order_number LIKE ? 
-        ORDER BY order_number DESC 
-        LIMIT 1
+        INSERT INTO order_number_sequences (sequence_date, last_value)
+        VALUES (?, LAST_INSERT_ID(1))
+        ON DUPLICATE KEY UPDATE last_value = LAST_INSERT_ID(last_value + 1)
     ");
-    $stmt->execute([$date_prefix . '-%']);
-    
-    $last_order = $stmt->fetchColumn();
-    
-    if ($last_order) {
-        // Extract the sequence number and increment
-        $sequence = intval(substr($last_order, -4)) + 1;
-    } else {
-        $sequence = 1;
+    try {
+        $stmt->execute([$order_date]);
+    } catch (PDOException $e) {
+        if (($e->errorInfo[1] ?? null) !== 1146) {
+            throw $e;
+        }
+        // order_number_sequences not created yet (sql/add_order_number_sequences.sql)
+        error_log("Order number sequence unavailable ({$e->getMessage()}), scanning orders instead");
+        return scanOrderNumber($pdo, $date_prefix);
     }
     
+    $sequence = (int) $pdo->query("SELECT LAST_INSERT_ID()")->fetchColumn();
+    
     return $date_prefix . '-' . str_pad($sequence, 4, '0', STR_PAD_LEFT);
 }
+
+function scanOrderNumber($pdo, $date_prefix) {
+    // Legacy MAX() scan; not safe against concurrent saves
+    $stmt = $pdo->prepare("
+        SELECT MAX(CAST(SUBSTRING(order_number, 10) AS UNSIGNED))
+        FROM orders
+        WHERE order_number LIKE ?
+    ");
+    $stmt->execute([$date_prefix . '-%']);
+    $last = $stmt->fetchColumn();
+    $next = ($last === null || $last === false) ? 1 : (int) $last + 1;
+    
+    return $date_prefix . '-' . str_pad($next, 4, '0', STR_PAD_LEFT);
+}
 ?>
\ No newline at end of file
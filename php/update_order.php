@@ -19,19 +19,64 @@ if ($_SERVER['REQUEST_METHOD'] !== 'POST') {
 
 $input = json_decode(file_get_contents('php://input'), true);
 
-if (!$input || !isset($input['order_id']) || !isset($input['action'])) {
+$bulk = isset($input['order_ids']) || isset($input['delivery_date']);
+
+if (!$input || (!isset($input['order_id']) && !$bulk) || !isset($input['action'])) {
     http_response_code(400);
     echo json_encode(['error' => 'Invalid input data']);
     exit();
 }
 
-$order_id = intval($input['order_id']);
 $action = $input['action'];
+if (!in_array($action, ['submit', 'start_delivery', 'complete_delivery', 'archive'], true)) {
+    http_response_code(400);
+    echo json_encode(['error' => 'Invalid action']);
+    exit();
+}
 
 try {
     $pdo = new PDO("mysql:host=$host;dbname=$dbname", $username, $password);
     $pdo->setAttribute(PDO::ATTR_ERRMODE, PDO::ERRMODE_EXCEPTION);
     
+    if ($bulk) {
+        // Move a whole route (or list of orders) in one Python call and one transaction
+        $python_cmd = "python order_manager.py --action $action --json";
+        if (isset($input['order_ids'])) {
+            $order_ids = array_map('intval', (array) $input['order_ids']);
+            $python_cmd .= ' --order-ids ' . implode(',', $order_ids);
+        }
+        if (isset($input['delivery_date'])) {
+            $python_cmd .= ' --delivery-date ' . escapeshellarg($input['delivery_date']);
+        }
+        if (isset($input['status'])) {
+            $python_cmd .= ' --status ' . escapeshellarg($input['status']);
+        }
+        if (isset($input['notes'])) {
+            $python_cmd .= ' --notes ' . escapeshellarg($input['notes']);
+        }
+        
+        $output = shell_exec($python_cmd . ' 2>&1');
+        // The JSON summary is the last line of the output
+        $lines = explode("\n", trim((string) $output));
+        $result = json_decode(end($lines), true);
+        
+        if ($result === null) {
+            echo json_encode([
+                'success' => false,
+                'error' => 'Failed to update orders: ' . $output
+            ]);
+        } else {
+            echo json_encode([
+                'success' => $result['failed'] === 0,
+                'message' => "{$result['succeeded']} of " . count($result['results']) . ' orders updated',
+                'results' => $result['results']
+            ]);
+        }
+        exit();
+    }
+    
+    $order_id = intval($input['order_id']);
+    
     // Call the Python order manager
     $python_cmd = "python order_manager.py --order-id $order_id --action $action";
     $output = shell_exec($python_cmd . ' 2>&1');
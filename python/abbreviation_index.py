@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Order Entry System - Abbreviation Index
+In-memory index of customer and product abbreviations so exact shorthand
+matches resolve without touching the database
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from fuzzy_index import FuzzyIndex
+from parse_results import CustomerAlternative
+
+
+def normalize_abbreviation(abbreviation: str) -> str:
+    """Normalize an abbreviation the same way the parser normalizes input"""
+    return abbreviation.strip().lower()
+
+
+class AbbreviationIndex:
+    """
+    Hash-map index over customer_abbreviations and product_abbreviations.
+
+    Customer entries are keyed by normalized abbreviation and hold
+    (customer_id, name, code, confidence_score). Product entries are keyed by
+    (customer_id, normalized abbreviation) and hold
+    (product_id, item_code, description, confidence_score, uom_code, uom_id).
+    Only the best candidate per key is kept, ranked by confidence_score and
+    then usage_count, which is the same ordering the SQL lookups use.
+
+    Every customer abbreviation row also goes into a q-gram FuzzyIndex so a
+    mistyped customer code is matched against a handful of candidates instead
+    of the whole table.
+    """
+
+    CUSTOMER_QUERY = """
+    SELECT c.id, c.name, c.code, ca.abbreviation, ca.confidence_score, ca.usage_count
+    FROM customer_abbreviations ca
+    JOIN customers c ON c.id = ca.customer_id
+    """
+
+    PRODUCT_QUERY = """
+    SELECT pa.customer_id, p.id, p.item_code, p.description, pa.abbreviation,
+           pa.confidence_score, pa.usage_count, u.code, u.id
+    FROM product_abbreviations pa
+    JOIN products p ON p.id = pa.product_id
+    LEFT JOIN uom u ON p.uom_id = u.id
+    """
+
+    # Cheap change detection: aggregates are computed server side, so checking
+    # for changes costs one round trip instead of re-reading every row
+    SIGNATURE_QUERY = """
+    SELECT
+        (SELECT COUNT(*) FROM customer_abbreviations),
+        (SELECT MAX(id) FROM customer_abbreviations),
+        (SELECT SUM(confidence_score) FROM customer_abbreviations),
+        (SELECT SUM(usage_count) FROM customer_abbreviations),
+        (SELECT COUNT(*) FROM product_abbreviations),
+        (SELECT MAX(id) FROM product_abbreviations),
+        (SELECT SUM(confidence_score) FROM product_abbreviations),
+        (SELECT SUM(usage_count) FROM product_abbreviations),
+        (SELECT MAX(updated_at) FROM customers),
+        (SELECT MAX(updated_at) FROM products)
+    """
+
+    def __init__(self, refresh_interval: float = 30.0):
+        self.refresh_interval = refresh_interval
+        self.customers: Dict[str, Tuple] = {}
+        self.products: Dict[Tuple[int, str], Tuple] = {}
+        self.customer_fuzzy = FuzzyIndex([])
+        self.signature = None
+        self.loaded_at = 0.0
+        self.last_checked = 0.0
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.loaded_at > 0
+
+    def load(self, connection) -> bool:
+        """Bulk-load both abbreviation tables and swap them in atomically"""
+        try:
+            cursor = connection.cursor()
+            cursor.execute(self.SIGNATURE_QUERY)
+            signature = cursor.fetchone()
+            cursor.execute(self.CUSTOMER_QUERY)
+            customer_rows = cursor.fetchall()
+            cursor.execute(self.PRODUCT_QUERY)
+            product_rows = cursor.fetchall()
+            cursor.close()
+        except Exception as e:
+            self.logger.error("Error loading abbreviation index: %s", e)
+            return False
+
+        return self.build(signature, customer_rows, product_rows)
+
+    def build(self, signature, customer_rows, product_rows) -> bool:
+        """
+        Build the index from SIGNATURE_QUERY, CUSTOMER_QUERY and PRODUCT_QUERY
+        results, however they were fetched
+        """
+        try:
+            customers = {}
+            customer_rank = {}
+            fuzzy_rows = []
+            for cust_id, name, code, abbr, conf, usage in customer_rows:
+                fuzzy_rows.append((abbr, (cust_id, name, code, abbr, conf)))
+                key = normalize_abbreviation(abbr)
+                rank = (conf or 0, usage or 0)
+                if key not in customers or rank > customer_rank[key]:
+                    customers[key] = (cust_id, name, code, conf)
+                    customer_rank[key] = rank
+
+            products = {}
+            product_rank = {}
+            for cust_id, prod_id, item_code, desc, abbr, conf, usage, uom_code, uom_id in product_rows:
+                key = (cust_id, normalize_abbreviation(abbr))
+                rank = (conf or 0, usage or 0)
+                if key not in products or rank > product_rank[key]:
+                    products[key] = (prod_id, item_code, desc, conf, uom_code or 'EA', uom_id or 1)
+                    product_rank[key] = rank
+
+            customer_fuzzy = FuzzyIndex(fuzzy_rows)
+        except Exception as e:
+            self.logger.error("Error loading abbreviation index: %s", e)
+            return False
+
+        # Readers never see a half-built index: the dicts are replaced whole
+        self.customers = customers
+        self.customer_fuzzy = customer_fuzzy
+        self.products = products
+        self.signature = tuple(signature)
+        self.loaded_at = self.last_checked = time.monotonic()
+
+        self.logger.info(
+            "Loaded abbreviation index: %d customer, %d product abbreviations",
+            len(customers), len(products)
+        )
+        return True
+
+    def check_due(self, force: bool = False) -> bool:
+        """
+        True if it is time to compare signatures again (at most once per
+        refresh_interval unless forced); marks the check as started
+        """
+        now = time.monotonic()
+        if not force and now - self.last_checked < self.refresh_interval:
+            return False
+        self.last_checked = now
+        return True
+
+    def is_current(self, signature) -> bool:
+        """Whether a fresh SIGNATURE_QUERY result matches the loaded index"""
+        return self.is_loaded and tuple(signature) == self.signature
+
+    def refresh(self, connection, force: bool = False) -> bool:
+        """
+        Reload if the abbreviation tables changed since the last load.
+        Checks at most once per refresh_interval unless forced.
+        Returns True if the index was reloaded.
+        """
+        if not force and time.monotonic() - self.last_checked < self.refresh_interval:
+            return False
+
+        if not self._lock.acquire(blocking=False):
+            # Another thread is already checking
+            return False
+
+        try:
+            if not self.check_due(force):
+                return False
+            if not force and self.is_loaded:
+                cursor = connection.cursor()
+                cursor.execute(self.SIGNATURE_QUERY)
+                signature = cursor.fetchone()
+                cursor.close()
+                if self.is_current(signature):
+                    return False
+            return self.load(connection)
+        except Exception as e:
+            self.logger.error("Error refreshing abbreviation index: %s", e)
+            return False
+        finally:
+            self._lock.release()
+
+    def invalidate(self):
+        """Force the next refresh() call to check the database"""
+        self.last_checked = 0.0
+
+    def lookup_customer(self, abbreviation: str) -> Optional[Tuple]:
+        """Best customer for an abbreviation: (id, name, code, confidence)"""
+        return self.customers.get(normalize_abbreviation(abbreviation))
+
+    def lookup_product(self, customer_id: int, abbreviation: str) -> Optional[Tuple]:
+        """Best product for a customer abbreviation: (id, item_code, description, confidence, uom, uom_id)"""
+        return self.products.get((customer_id, normalize_abbreviation(abbreviation)))
+
+    def search_customers(self, abbreviation: str, threshold: int = 60, limit: int = 5,
+                         on_candidates: Optional[Callable[[int], None]] = None) -> Tuple[CustomerAlternative, ...]:
+        """Fuzzy customer suggestions in the same shape parse_customer returns"""
+        matches = self.customer_fuzzy.search(
+            normalize_abbreviation(abbreviation), threshold, limit, on_candidates=on_candidates
+        )
+        return tuple(
+            CustomerAlternative(cust_id, name, code, abbr, similarity, conf)
+            for similarity, (cust_id, name, code, abbr, conf) in matches
+        )
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Order Entry System - Async Database Helpers
+aiomysql connection pool and query helpers for the asyncio parser and
+order manager
+"""
+
+import aiomysql
+
+
+def aiomysql_config(db_config) -> dict:
+    """
+    Translate a mysql.connector style db_config for aiomysql.
+
+    aiomysql calls the schema 'db'. Pooled connections run in autocommit mode
+    so a long-lived connection never reads from a stale snapshot; writes that
+    need a transaction open one explicitly with conn.begin().
+    """
+    config = dict(db_config)
+    if 'database' in config:
+        config['db'] = config.pop('database')
+    config.setdefault('autocommit', True)
+    return config
+
+
+async def create_pool(db_config, minsize: int = 1, maxsize: int = 20):
+    """Create an aiomysql pool from the usual db_config dict"""
+    return await aiomysql.create_pool(minsize=minsize, maxsize=maxsize, **aiomysql_config(db_config))
+
+
+async def close_pool(pool):
+    pool.close()
+    await pool.wait_closed()
+
+
+async def fetchall(pool, query: str, params=(), dictionary: bool = False):
+    """Run one query on a pooled connection and return every row"""
+    async with pool.acquire() as conn:
+        async with conn.cursor(aiomysql.DictCursor if dictionary else aiomysql.Cursor) as cursor:
+            await cursor.execute(query, params)
+            return await cursor.fetchall()
+
+
+async def fetchone(pool, query: str, params=(), dictionary: bool = False):
+    """Run one query on a pooled connection and return the first row"""
+    async with pool.acquire() as conn:
+        async with conn.cursor(aiomysql.DictCursor if dictionary else aiomysql.Cursor) as cursor:
+            await cursor.execute(query, params)
+            return await cursor.fetchone()
@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+"""
+Order Entry System - Async Order Management
+asyncio version of OrderManager backed by an aiomysql connection pool
+"""
+
+import asyncio
+from datetime import datetime, date
+from typing import Dict, List, Optional, Tuple
+
+import aiomysql
+
+from async_db import close_pool, create_pool, fetchall
+from order_manager import OrderManager
+from order_keys import DEFAULT_DEDUPE_WINDOW, order_idempotency_keys
+from order_numbers import AsyncOrderNumberAllocator
+
+
+class AsyncOrderManager:
+    """
+    Same order lifecycle as OrderManager: draft → submitted → delivered → archived.
+
+    Each write runs in an explicit transaction on one pooled connection.
+    Reads that don't depend on each other run concurrently on separate
+    connections (order details).
+    """
+
+    def __init__(self, pool, order_number_block_size: int = 1, defer_learning: bool = False,
+                 dedupe_window: int = DEFAULT_DEDUPE_WINDOW):
+        self.pool = pool
+        self.defer_learning = defer_learning
+        self.dedupe_window = dedupe_window
+        self.keyed_saves = True
+        self.order_numbers = AsyncOrderNumberAllocator(pool, block_size=order_number_block_size)
+
+    @classmethod
+    async def create(cls, db_config, minsize: int = 1, maxsize: int = 20) -> 'AsyncOrderManager':
+        """Create an order manager with its own connection pool"""
+        return cls(await create_pool(db_config, minsize=minsize, maxsize=maxsize))
+
+    async def close(self):
+        """Close the connection pool"""
+        await close_pool(self.pool)
+
+    async def generate_order_number(self) -> str:
+        """Generate unique order number: YYYYMMDD-NNNN"""
+        try:
+            return await self.order_numbers.next_number()
+        except aiomysql.Error as e:
+            # order_number_sequences not created yet (sql/add_order_number_sequences.sql)
+            print(f"Order number sequence unavailable ({e}), scanning orders instead")
+            today = datetime.now().strftime('%Y%m%d')
+            rows = await fetchall(self.pool, """
+                SELECT MAX(CAST(SUBSTRING(order_number, 10) AS UNSIGNED))
+                FROM orders
+                WHERE order_number LIKE %s
+            """, (f"{today}-%",))
+            next_num = 1 if not rows or rows[0][0] is None else rows[0][0] + 1
+            return f"{today}-{next_num:04d}"
+
+    async def _fetch_prices(self, product_ids: List[int]) -> Dict[int, float]:
+        """Current prices for product_ids in one query"""
+        if not product_ids:
+            return {}
+        placeholders = ', '.join(['%s'] * len(product_ids))
+        rows = await fetchall(
+            self.pool, f"SELECT id, price FROM products WHERE id IN ({placeholders})", product_ids
+        )
+        return {product_id: float(price) for product_id, price in rows}
+
+    async def _find_saved_order(self, keys: List[str]) -> Optional[int]:
+        """Id of an order already saved under any of keys (see OrderManager.save_order)"""
+        if not keys or not self.keyed_saves:
+            return None
+        placeholders = ', '.join(['%s'] * len(keys))
+        try:
+            rows = await fetchall(self.pool, f"SELECT id FROM orders WHERE idempotency_key IN ({placeholders})", keys)
+        except aiomysql.Error as e:
+            if e.args[0] != 1054:
+                raise
+            # Unknown column: sql/add_order_idempotency_key.sql not run yet
+            print(f"Idempotency keys unavailable ({e}), saving without deduplication")
+            self.keyed_saves = False
+            return None
+        return min(row[0] for row in rows) if rows else None
+
+    async def save_order(self, parsed_order, order_method='shorthand', idempotency_key: str = None) -> Optional[int]:
+        """
+        Save a parsed order to the database as draft
+        Returns order_id if successful (the existing one for a repeated save)
+        """
+        customer_id = parsed_order.customer.customer_id
+        if not customer_id:
+            print("❌ Error saving order: No valid customer found in parsed order")
+            return None
+
+        keys = order_idempotency_keys(customer_id, parsed_order.raw_input, idempotency_key,
+                                      window=self.dedupe_window)
+        try:
+            existing = await self._find_saved_order(keys)
+        except Exception as e:
+            print(f"❌ Error saving order: {e}")
+            return None
+        if existing:
+            print(f"↩️ Order already saved (ID: {existing})")
+            return existing
+        idempotency_key = keys[0] if keys and self.keyed_saves else None
+
+        items = [item for item in parsed_order.items if item.product_id and item.confidence > 0]
+
+        try:
+            # Prices and the order number are independent, so fetch both
+            # before the transaction starts
+            prices, order_number = await asyncio.gather(
+                self._fetch_prices(list(dict.fromkeys(item.product_id for item in items))),
+                self.generate_order_number()
+            )
+        except Exception as e:
+            print(f"❌ Error saving order: {e}")
+            return None
+
+        item_rows = []
+        total_amount = 0.0
+        for line_number, item in enumerate(items, 1):
+            unit_price = prices.get(item.product_id, 0.0)
+            line_total = float(item.quantity) * unit_price
+            total_amount += line_total
+            item_rows.append([
+                item.product_id,
+                item.product_code,
+                item.product_name,
+                item.quantity,
+                item.uom_id,
+                unit_price,
+                line_total,
+                item.raw_input,  # customer reference
+                item.raw_input,  # parsed from
+                line_number
+            ])
+
+        async with self.pool.acquire() as conn:
+            try:
+                await conn.begin()
+
+                keyed = idempotency_key is not None
+                async with conn.cursor() as cursor:
+                    await cursor.execute(f"""
+                    INSERT INTO orders (
+                        order_number, customer_id, order_date, status, order_method,
+                        subtotal, total_amount, original_input, created_at{', idempotency_key' if keyed else ''}
+                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s{', %s' if keyed else ''})
+                    """, (
+                        order_number,
+                        customer_id,
+                        date.today(),
+                        'draft',
+                        order_method,
+                        total_amount,
+                        total_amount,  # total = subtotal for now
+                        parsed_order.raw_input,
+                        datetime.now()
+                    ) + ((idempotency_key,) if keyed else ()))
+                    order_id = cursor.lastrowid
+
+                    if item_rows:
+                        await cursor.executemany("""
+                        INSERT INTO order_items (
+                            order_id, product_id, item_code, product_name, quantity,
+                            uom_id, unit_price, line_total, customer_reference,
+                            parsed_from, line_number
+                        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                        """, [[order_id] + row for row in item_rows])
+
+                await self.add_order_history(order_id, None, 'draft', 'System',
+                                             'Order created from shorthand input', conn=conn)
+
+                await conn.commit()
+
+                print(f"✅ Order {order_number} saved successfully (ID: {order_id})")
+                return order_id
+
+            except aiomysql.IntegrityError as e:
+                # A concurrent save with the same key committed first
+                await conn.rollback()
+                existing = await self._find_saved_order(keys)
+                if existing:
+                    print(f"↩️ Order already saved (ID: {existing})")
+                    return existing
+                print(f"❌ Error saving order: {e}")
+                return None
+
+            except Exception as e:
+                print(f"❌ Error saving order: {e}")
+                await conn.rollback()
+                return None
+
+    async def submit_order(self, order_id: int, notes: str = '') -> bool:
+        """Submit order for processing"""
+        return await self._change_order_status(order_id, 'submitted', 'Order submitted for processing', notes)
+
+    async def start_delivery(self, order_id: int, delivery_date: date = None, notes: str = '') -> bool:
+        """Mark order as out for delivery"""
+        if delivery_date is None:
+            delivery_date = date.today()
+
+        async with self.pool.acquire() as conn:
+            try:
+                await conn.begin()
+                async with conn.cursor() as cursor:
+                    await cursor.execute("""
+                        UPDATE orders
+                        SET status = 'out_for_delivery', delivery_date = %s, updated_at = NOW()
+                        WHERE id = %s AND status IN ('submitted', 'processing')
+                    """, (delivery_date, order_id))
+
+                    if cursor.rowcount == 0:
+                        await conn.rollback()
+                        return False
+
+                await self.add_order_history(order_id, None, 'out_for_delivery', 'System',
+                                             f'Out for delivery on {delivery_date}. {notes}', conn=conn)
+
+                await conn.commit()
+                return True
+
+            except Exception as e:
+                print(f"Error starting delivery: {e}")
+                await conn.rollback()
+                return False
+
+    async def complete_delivery(self, order_id: int, delivered_quantities: Dict[int, float] = None,
+                                notes: str = '') -> bool:
+        """Mark order as delivered and update quantities"""
+        delivered_at = datetime.now()
+        delivered_date = delivered_at.date()
+
+        async with self.pool.acquire() as conn:
+            try:
+                await conn.begin()
+                async with conn.cursor() as cursor:
+                    if delivered_quantities:
+                        await cursor.executemany("""
+                            UPDATE order_items
+                            SET delivered_quantity = %s
+                            WHERE id = %s AND order_id = %s
+                        """, [(qty, item_id, order_id) for item_id, qty in delivered_quantities.items()])
+                    else:
+                        # Default: delivered quantity = ordered quantity
+                        await cursor.execute("""
+                            UPDATE order_items
+                            SET delivered_quantity = quantity
+                            WHERE order_id = %s
+                        """, (order_id,))
+
+                    await cursor.execute("""
+                        UPDATE orders
+                        SET status = 'delivered', delivered_date = %s, delivered_at = %s,
+                            delivery_notes = %s, updated_at = NOW()
+                        WHERE id = %s AND status = 'out_for_delivery'
+                    """, (delivered_date, delivered_at, notes, order_id))
+
+                    if cursor.rowcount == 0:
+                        await conn.rollback()
+                        return False
+
+                await self.add_order_history(order_id, 'out_for_delivery', 'delivered', 'System',
+                                             f'Delivered on {delivered_date}. {notes}', conn=conn)
+
+                # Update customer product frequency (learning system)
+                await self._learn_from_deliveries([order_id], conn)
+
+                await conn.commit()
+                return True
+
+            except Exception as e:
+                print(f"Error completing delivery: {e}")
+                await conn.rollback()
+                return False
+
+    async def archive_order(self, order_id: int, notes: str = '') -> bool:
+        """Archive a delivered order"""
+        async with self.pool.acquire() as conn:
+            try:
+                await conn.begin()
+                archived_at = datetime.now()
+                async with conn.cursor() as cursor:
+                    await cursor.execute("""
+                        UPDATE orders
+                        SET status = 'archived', archived_at = %s, updated_at = NOW()
+                        WHERE id = %s AND status = 'delivered'
+                    """, (archived_at, order_id))
+
+                    if cursor.rowcount == 0:
+                        await conn.rollback()
+                        return False
+
+                await self.add_order_history(order_id, 'delivered', 'archived', 'System',
+                                             f'Order archived. {notes}', conn=conn)
+
+                await conn.commit()
+                return True
+
+            except Exception as e:
+                print(f"Error archiving order: {e}")
+                await conn.rollback()
+                return False
+
+    async def get_customer_order_history(self, customer_id: int, status: str = None, limit: int = 50,
+                                         before: Optional[Tuple] = None,
+                                         include_items: bool = True) -> List[Dict]:
+        """Get order history for a specific customer (see OrderManager.get_customer_order_history)"""
+        try:
+            query, params = OrderManager._history_query(customer_id, status, limit, before)
+            orders = list(await fetchall(self.pool, query, params, dictionary=True))
+
+            if orders:
+                query, params = OrderManager._history_items_query([order['id'] for order in orders], include_items)
+                rows = await fetchall(self.pool, query, params, dictionary=True)
+                OrderManager._attach_history_items(orders, list(rows), include_items)
+
+            return orders
+
+        except Exception as e:
+            print(f"Error getting customer order history: {e}")
+            return []
+
+    history_cursor = staticmethod(OrderManager.history_cursor)
+
+    async def get_order_details(self, order_id: int) -> Optional[Dict]:
+        """Get complete order details (header, items and history fetched concurrently)"""
+        try:
+            orders, items, history = await asyncio.gather(
+                fetchall(self.pool, """
+                    SELECT
+                        o.*, c.name as customer_name, c.code as customer_code,
+                        c.business_name, c.phone, c.email
+                    FROM orders o
+                    JOIN customers c ON o.customer_id = c.id
+                    WHERE o.id = %s
+                """, (order_id,), dictionary=True),
+                fetchall(self.pool, """
+                    SELECT
+                        oi.*, u.code as uom_code, u.name as uom_name,
+                        p.vendor, p.category
+                    FROM order_items oi
+                    LEFT JOIN uom u ON oi.uom_id = u.id
+                    LEFT JOIN products p ON oi.product_id = p.id
+                    WHERE oi.order_id = %s
+                    ORDER BY oi.line_number
+                """, (order_id,), dictionary=True),
+                fetchall(self.pool, """
+                    SELECT * FROM order_history
+                    WHERE order_id = %s
+                    ORDER BY created_at
+                """, (order_id,), dictionary=True)
+            )
+
+            if not orders:
+                return None
+
+            order = orders[0]
+            order['items'] = list(items)
+            order['history'] = list(history)
+            return order
+
+        except Exception as e:
+            print(f"Error getting order details: {e}")
+            return None
+
+    async def _change_order_status(self, order_id: int, new_status: str, default_notes: str = '',
+                                   notes: str = '') -> bool:
+        """Helper method to change order status"""
+        async with self.pool.acquire() as conn:
+            try:
+                await conn.begin()
+                async with conn.cursor() as cursor:
+                    # Lock the row so the recorded old status is the one replaced
+                    await cursor.execute("SELECT status FROM orders WHERE id = %s FOR UPDATE", (order_id,))
+                    result = await cursor.fetchone()
+                    if not result:
+                        await conn.rollback()
+                        return False
+
+                    old_status = result[0]
+
+                    update_query = "UPDATE orders SET status = %s"
+                    params = [new_status]
+
+                    if new_status == 'submitted':
+                        update_query += ", submitted_at = %s"
+                        params.append(datetime.now())
+
+                    update_query += ", updated_at = NOW() WHERE id = %s"
+                    params.append(order_id)
+
+                    await cursor.execute(update_query, params)
+
+                    if cursor.rowcount == 0:
+                        await conn.rollback()
+                        return False
+
+                history_notes = f"{default_notes}. {notes}".strip('. ')
+                await self.add_order_history(order_id, old_status, new_status, 'System', history_notes, conn=conn)
+
+                await conn.commit()
+                return True
+
+            except Exception as e:
+                print(f"Error changing order status: {e}")
+                await conn.rollback()
+                return False
+
+    async def add_order_history(self, order_id: int, old_status: str, new_status: str, changed_by: str,
+                                notes: str = '', conn=None):
+        """
+        Add entry to order history. With conn, the row is part of the caller's
+        transaction and errors propagate so the status change rolls back with it.
+        """
+        query = """
+            INSERT INTO order_history (order_id, old_status, new_status, changed_by, change_notes)
+            VALUES (%s, %s, %s, %s, %s)
+        """
+        params = (order_id, old_status, new_status, changed_by, notes)
+        if conn is not None:
+            async with conn.cursor() as cursor:
+                await cursor.execute(query, params)
+            return
+        try:
+            async with self.pool.acquire() as own_conn:
+                async with own_conn.cursor() as cursor:
+                    await cursor.execute(query, params)
+        except Exception as e:
+            print(f"Error adding order history: {e}")
+
+    async def _learn_from_deliveries(self, order_ids: List[int], conn):
+        """
+        Learn from delivered orders now, or queue them when learning is
+        deferred, inside the delivery transaction. A learning failure only
+        rolls back to a savepoint; the delivery is still recorded.
+        """
+        async with conn.cursor() as cursor:
+            await cursor.execute("SAVEPOINT delivery_learning")
+            try:
+                if self.defer_learning:
+                    # Applied later by OrderManager.apply_learning_queue
+                    await cursor.executemany("INSERT INTO product_learning_queue (order_id) VALUES (%s)",
+                                             [(order_id,) for order_id in order_ids])
+                else:
+                    await self._update_customer_product_frequency(order_ids, conn)
+            except aiomysql.Error as e:
+                print(f"Error learning from deliveries {order_ids}: {e}")
+                await cursor.execute("ROLLBACK TO SAVEPOINT delivery_learning")
+            await cursor.execute("RELEASE SAVEPOINT delivery_learning")
+
+    async def _update_customer_product_frequency(self, order_ids: List[int], conn):
+        """Update customer product frequency scores for learning (errors propagate)"""
+        if not order_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(order_ids))
+        async with conn.cursor() as cursor:
+            await cursor.execute(OrderManager.LEARNING_FREQUENCY_QUERY.format(placeholders=placeholders),
+                                 [date.today()] + list(order_ids))
+            await cursor.execute(OrderManager.LEARNING_USAGE_QUERY.format(placeholders=placeholders),
+                                 list(order_ids) + [datetime.now()])
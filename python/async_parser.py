@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+Order Entry System - Async Shorthand Parser
+asyncio version of ShorthandParser backed by an aiomysql connection pool, so
+one event loop can serve many order entry sessions at once
+"""
+
+import asyncio
+import contextvars
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+import aiomysql
+
+from abbreviation_index import AbbreviationIndex
+from async_db import close_pool, create_pool
+from customer_context import CustomerContext
+from parse_tracing import NULL_TRACE
+from shorthand_parser import ParsedCustomer, ParsedItem, ParsedOrder, ParsedOrderSheet, ShorthandParser
+
+# Concurrent parses share one parser, so the active trace lives in the
+# asyncio task context instead of on the instance
+_current_trace = contextvars.ContextVar('parse_trace', default=NULL_TRACE)
+
+
+class AsyncShorthandParser(ShorthandParser):
+    """
+    Same parsing rules, caches, abbreviation index and tracing as
+    ShorthandParser, with every database call awaited on a pooled connection.
+
+    A parse only holds a connection for the duration of a single query, and
+    lookups answered from the caches, the index or a customer context don't
+    take one at all, so a small pool serves hundreds of concurrent sessions.
+    Independent lookups overlap: a customer correction fetches the customer
+    row and the customer's product context at the same time, and order sheet
+    blocks are parsed concurrently.
+
+    The interface is ShorthandParser's with every method awaited, including
+    connect_database() and close_connection(), which open and close the pool.
+    """
+
+    def __init__(self, pool=None, db_config=None, **kwargs):
+        super().__init__(db_config or {}, **kwargs)
+        self.pool = pool
+        self._context_fetches: Dict[int, asyncio.Future] = {}
+
+    @classmethod
+    async def create(cls, db_config, minsize: int = 1, maxsize: int = 20, **kwargs) -> 'AsyncShorthandParser':
+        """Create a parser with its own connection pool"""
+        pool = await create_pool(db_config, minsize=minsize, maxsize=maxsize)
+        return cls(pool, db_config, **kwargs)
+
+    @property
+    def trace(self):
+        return _current_trace.get()
+
+    @trace.setter
+    def trace(self, value):
+        _current_trace.set(value)
+
+    async def close(self):
+        """Close the connection pool"""
+        if self.pool is not None:
+            pool, self.pool = self.pool, None
+            await close_pool(pool)
+
+    async def _run_query(self, query: str, params=(), one: bool = False):
+        """Execute and fetch on a pooled connection, counting the query in the trace"""
+        trace = self.trace
+        start = time.perf_counter() if trace.enabled else 0.0
+
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(query, params)
+                rows = await cursor.fetchone() if one else await cursor.fetchall()
+
+        if trace.enabled:
+            trace.record_query(time.perf_counter() - start)
+        return rows
+
+    async def load_abbreviation_index(self, refresh_interval: float = 30.0) -> bool:
+        """Bulk-load the abbreviation tables into an in-memory index"""
+        index = AbbreviationIndex(refresh_interval=refresh_interval)
+        if not await self._load_index(index):
+            return False
+        self.abbreviation_index = index
+        return True
+
+    async def _load_index(self, index: AbbreviationIndex) -> bool:
+        try:
+            signature, customer_rows, product_rows = await asyncio.gather(
+                self._run_query(index.SIGNATURE_QUERY, one=True),
+                self._run_query(index.CUSTOMER_QUERY),
+                self._run_query(index.PRODUCT_QUERY)
+            )
+        except aiomysql.Error as e:
+            self.logger.error("Error loading abbreviation index: %s", e)
+            return False
+        return index.build(signature, customer_rows, product_rows)
+
+    async def _refresh_abbreviation_index(self):
+        """Pick up abbreviation edits made since the index was loaded"""
+        index = self.abbreviation_index
+        if index is None or not index.check_due():
+            return
+
+        with self.trace.span('index_refresh'):
+            try:
+                signature = await self._run_query(index.SIGNATURE_QUERY, one=True)
+            except aiomysql.Error as e:
+                self.logger.error("Error refreshing abbreviation index: %s", e)
+                return
+            if index.is_current(signature):
+                return
+            reloaded = await self._load_index(index)
+
+        if reloaded:
+            self._clear_lookup_caches()
+
+    async def parse_order(self, input_text: str) -> ParsedOrder:
+        """Parse complete order input with customer and products (first customer block)"""
+        self.logger.info("Parsing order input: %.50s...", input_text)
+
+        trace = self._start_trace()
+        await self._refresh_abbreviation_index()
+
+        with trace.span('split'):
+            customer_blocks = re.split(r'\n\n+', input_text.strip())
+
+        return self._finish_trace(await self._parse_customer_block(customer_blocks[0], input_text))
+
+    async def parse_order_sheet(self, input_text: str, workers: int = None) -> ParsedOrderSheet:
+        """
+        Parse every blank-line-separated customer block concurrently.
+        workers is accepted for compatibility; concurrency is bounded by the pool size.
+        """
+        start = time.perf_counter()
+
+        if self.abbreviation_index is None:
+            await self.load_abbreviation_index()
+        else:
+            await self._refresh_abbreviation_index()
+
+        blocks = [block for block in re.split(r'\n\n+', input_text.strip()) if block.strip()]
+        self.logger.info("Parsing order sheet: %d customer blocks", len(blocks))
+
+        orders = list(await asyncio.gather(*(self._parse_traced_block(block) for block in blocks)))
+
+        sheet = ParsedOrderSheet(
+            orders=orders,
+            raw_input=input_text,
+            elapsed_seconds=time.perf_counter() - start
+        )
+        self.logger.info(
+            "Parsed %d blocks in %.3fs (%.1f blocks/sec)",
+            len(orders), sheet.elapsed_seconds, sheet.blocks_per_second
+        )
+        return sheet
+
+    async def _parse_traced_block(self, block: str) -> ParsedOrder:
+        """Parse one order sheet block with its own trace"""
+        self._start_trace()
+        return self._finish_trace(await self._parse_customer_block(block, block))
+
+    async def _parse_customer_block(self, customer_block: str, raw_input: str) -> ParsedOrder:
+        """Parse one customer block: customer code line followed by product lines"""
+        lines = customer_block.split('\n')
+        first_line = lines[0].strip()
+
+        with self.trace.span('customer'):
+            customer = await self.parse_customer(first_line)
+
+        product_lines = self._product_lines(lines)
+
+        with self.trace.span('products'):
+            items, parsing_errors = await self._parse_product_lines(product_lines, customer.customer_id)
+
+        return ParsedOrder(
+            customer=customer,
+            items=items,
+            raw_input=raw_input,
+            parsing_errors=parsing_errors
+        )
+
+    async def parse_customer(self, input_text: str) -> ParsedCustomer:
+        """Parse customer code from input"""
+        match = self.customer_pattern.match(input_text.strip())
+
+        if not match:
+            return ParsedCustomer(
+                raw_input=input_text,
+                confidence=0,
+                alternatives=()
+            )
+
+        customer_code = match.group(1).lower()
+        self.logger.info("Parsing customer code: %s", customer_code)
+
+        cached = self._cached_customer(customer_code, input_text)
+        if cached is not None:
+            return cached
+
+        trace = self.trace
+
+        try:
+            with trace.span('customer_exact'):
+                if self.index_loaded:
+                    result = self._indexed_customer(customer_code)
+                else:
+                    result = await self._run_query(self.CUSTOMER_EXACT_QUERY, (customer_code,), one=True)
+
+            if result:
+                return self._resolved_customer(customer_code, input_text, result)
+
+            with trace.span('customer_fuzzy'):
+                if self.index_loaded:
+                    alternatives = self._indexed_customer_alternatives(customer_code)
+                else:
+                    all_customers = await self._run_query(self.CUSTOMER_FUZZY_QUERY)
+                    alternatives = self._score_customer_alternatives(customer_code, all_customers)
+
+            return self._unresolved_customer(customer_code, input_text, alternatives)
+
+        except aiomysql.Error as e:
+            self.logger.error("Database error in customer parsing: %s", e)
+            return ParsedCustomer(
+                raw_input=input_text,
+                confidence=0
+            )
+
+    async def parse_products(self, input_text: str, customer_id: int) -> Tuple[List[ParsedItem], List[str]]:
+        """Parse product codes from input"""
+        return await self._parse_product_lines([input_text], customer_id)
+
+    async def _parse_product_lines(self, lines: List[str], customer_id: int) -> Tuple[List[ParsedItem], List[str]]:
+        """Parse several product lines with a single batched resolution"""
+        return self._flatten_lines(await self._resolve_product_lines(lines, customer_id))
+
+    async def _resolve_product_lines(self, lines: List[str], customer_id: int) -> List[Tuple[List[ParsedItem], List[str]]]:
+        """Batch-resolve several product lines, returning (items, errors) per line"""
+        line_matches, tokens = self._tokenize_lines(lines)
+        return self._assemble_lines(lines, line_matches, await self.resolve_products(tokens, customer_id))
+
+    async def parse_single_product(self, product_code: str, quantity: float, customer_id: int) -> ParsedItem:
+        """Parse a single product code with customer context"""
+        return (await self.resolve_products([(product_code, quantity)], customer_id))[0]
+
+    async def resolve_products(self, tokens: List[Tuple[str, float]], customer_id: int) -> List[ParsedItem]:
+        """Resolve (product_code, quantity) tokens for one customer in a batch"""
+        resolved, alternatives, pending = self._known_products(tokens, customer_id)
+        trace = self.trace
+
+        if pending and customer_id is not None:
+            try:
+                context = await self._customer_context(customer_id) if self.prefetch_context else None
+
+                if context is not None:
+                    pending = self._resolve_from_context(context, pending, customer_id, resolved)
+                elif not self.index_loaded:
+                    with trace.span('product_exact'):
+                        rows = await self._run_query(self._product_exact_query(len(pending)), [customer_id] + pending)
+                    pending = self._resolve_from_rows(rows, pending, customer_id, resolved)
+
+                if pending:
+                    with trace.span('product_fuzzy'):
+                        if context is not None:
+                            all_products = context.fuzzy_rows
+                        else:
+                            all_products = await self._run_query(self.PRODUCT_FUZZY_QUERY, (customer_id,))
+                        fuzzy = self._score_product_alternatives(pending, all_products)
+                    self._remember_product_misses(customer_id, fuzzy)
+                    alternatives.update(fuzzy)
+
+            except aiomysql.Error as e:
+                self.logger.error("Database error in product parsing: %s", e)
+
+        return self._build_items(tokens, resolved, alternatives)
+
+    async def _customer_context(self, customer_id: int) -> CustomerContext:
+        """
+        A customer's resolution context, fetched in one query on first use.
+        Concurrent parses for the same customer share a single fetch, run as
+        its own task: a parse that is cancelled (a client disconnecting)
+        stops waiting for it without cancelling it for the others.
+        """
+        context = self._cached_context(customer_id)
+        if context is not None:
+            return context
+
+        fetch = self._context_fetches.get(customer_id)
+        if fetch is None:
+            fetch = asyncio.ensure_future(self._fetch_context(customer_id))
+            self._context_fetches[customer_id] = fetch
+            fetch.add_done_callback(lambda done: self._context_fetch_done(customer_id, done))
+        return await asyncio.shield(fetch)
+
+    async def _fetch_context(self, customer_id: int) -> CustomerContext:
+        with self.trace.span('context_fetch'):
+            rows = await self._run_query(CustomerContext.QUERY, (customer_id, customer_id))
+            context = CustomerContext(customer_id, rows)
+        self.customer_contexts.set(context)
+        return context
+
+    def _context_fetch_done(self, customer_id: int, fetch: asyncio.Future):
+        if self._context_fetches.get(customer_id) is fetch:
+            del self._context_fetches[customer_id]
+        if not fetch.cancelled():
+            # Every waiter may have gone; don't log "exception never retrieved"
+            fetch.exception()
+
+    async def _fetch_customer(self, customer_id: int) -> Optional[Tuple]:
+        """(id, name, code) for a customer id, or None"""
+        return await self._run_query(self.CUSTOMER_BY_ID_QUERY, (customer_id,), one=True)
+
+    async def reparse_with_customer(self, parsed_order: ParsedOrder, new_customer_id: int) -> ParsedOrder:
+        """Reparse all products with new customer context"""
+        self.logger.info("Re-parsing order with new customer ID: %s", new_customer_id)
+
+        trace = self._start_trace()
+
+        try:
+            tokens, positions = self._reparse_tokens(parsed_order)
+
+            # The customer row and the customer's product context are
+            # independent, so both round trips run at the same time
+            with trace.span('customer'):
+                lookups = [self._fetch_customer(new_customer_id)]
+                if tokens and self.prefetch_context:
+                    lookups.append(self._customer_context(new_customer_id))
+                customer_info, *_ = await asyncio.gather(*lookups)
+
+            if not customer_info:
+                parsed_order.parsing_errors.append(f"Customer ID {new_customer_id} not found")
+                return self._finish_trace(parsed_order)
+
+            self._apply_customer(parsed_order, customer_info)
+
+            with trace.span('products'):
+                reparsed = await self.resolve_products(tokens, new_customer_id)
+            self._apply_reparsed(parsed_order, positions, reparsed)
+
+        except Exception as e:
+            self.logger.error("Error re-parsing with new customer: %s", e)
+            parsed_order.parsing_errors.append(f"Error re-parsing: {e}")
+
+        return self._finish_trace(parsed_order)
+
+    async def connect_database(self, minsize: int = 1, maxsize: int = 20) -> bool:
+        """Open the connection pool if there isn't one (what create() does up front)"""
+        if self.pool is not None:
+            return True
+        try:
+            self.pool = await create_pool(self.db_config, minsize=minsize, maxsize=maxsize)
+        except (aiomysql.Error, OSError) as e:
+            self.logger.error("Database connection error: %s", e)
+            return False
+        self.logger.info("Connected to database successfully")
+        return True
+
+    async def close_connection(self):
+        """Same as close()"""
+        await self.close()
+
+
+async def test_async_parser(concurrency: int = 200):
+    """Parse the sample orders concurrently on one event loop"""
+    db_config = {
+        'host': 'localhost',
+        'database': 'orders',
+        'user': 'root',
+        'password': '',
+        'charset': 'utf8mb4'
+    }
+
+    parser = await AsyncShorthandParser.create(db_config, maxsize=10)
+
+    try:
+        print("🧪 Testing Async Shorthand Parser")
+        print("=" * 30)
+
+        test_inputs = ["g18\n1t2sm4rb", "ms\n3h1ch", "cp\n2t5rb"]
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(
+            parser.parse_order(test_inputs[i % len(test_inputs)]) for i in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - start
+
+        for parsed in results[:len(test_inputs)]:
+            print(f"\n📝 {parsed.raw_input!r}")
+            print(f"   Customer: {parsed.customer.customer_name} (confidence: {parsed.customer.confidence})")
+            for item in parsed.items:
+                print(f"      • {item.quantity} x {item.product_name or item.raw_input} (confidence: {item.confidence})")
+
+        print(f"\n✅ {concurrency} concurrent parses in {elapsed:.3f}s ({concurrency / elapsed:.0f} parses/sec)")
+
+    finally:
+        await parser.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(test_async_parser())
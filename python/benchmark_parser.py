@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""
+Order Entry System - Shorthand Parser Benchmark Suite
+Generates synthetic customers, abbreviations and shorthand orders, runs the
+parser against an in-memory SQLite stand-in for MySQL, and saves latency,
+query-count and memory results as JSON for comparison across commits
+"""
+
+import argparse
+import json
+import logging
+import platform
+import random
+import sqlite3
+import string
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Dict, List
+
+from shorthand_parser import ShorthandParser
+
+BENCHMARK_SCHEMA = """
+CREATE TABLE uom (
+    id INTEGER PRIMARY KEY,
+    code TEXT NOT NULL,
+    name TEXT NOT NULL
+);
+CREATE TABLE products (
+    id INTEGER PRIMARY KEY,
+    item_code TEXT NOT NULL,
+    description TEXT NOT NULL,
+    price REAL DEFAULT 0,
+    vendor TEXT,
+    category TEXT,
+    uom_id INTEGER,
+    is_active INTEGER DEFAULT 1,
+    updated_at TEXT
+);
+CREATE TABLE customers (
+    id INTEGER PRIMARY KEY,
+    code TEXT NOT NULL,
+    name TEXT NOT NULL,
+    updated_at TEXT
+);
+CREATE TABLE customer_abbreviations (
+    id INTEGER PRIMARY KEY,
+    customer_id INTEGER NOT NULL,
+    abbreviation TEXT NOT NULL COLLATE NOCASE,
+    confidence_score INTEGER DEFAULT 100,
+    usage_count INTEGER DEFAULT 0
+);
+CREATE TABLE product_abbreviations (
+    id INTEGER PRIMARY KEY,
+    customer_id INTEGER NOT NULL,
+    product_id INTEGER NOT NULL,
+    abbreviation TEXT NOT NULL COLLATE NOCASE,
+    confidence_score INTEGER DEFAULT 100,
+    usage_count INTEGER DEFAULT 0
+);
+CREATE TABLE customer_items (
+    id INTEGER PRIMARY KEY,
+    customer_id INTEGER NOT NULL,
+    product_id INTEGER NOT NULL,
+    customer_product_code TEXT,
+    nickname TEXT COLLATE NOCASE,
+    frequency_score INTEGER DEFAULT 1,
+    is_active INTEGER DEFAULT 1
+);
+CREATE INDEX idx_abbreviation ON customer_abbreviations(abbreviation);
+CREATE INDEX idx_customer_abbreviation ON product_abbreviations(customer_id, abbreviation);
+CREATE INDEX idx_customer_items ON customer_items(customer_id);
+"""
+
+
+class StandInCursor:
+    """mysql.connector-style cursor over sqlite3 (%s placeholders, dictionary rows)"""
+
+    def __init__(self, connection, dictionary: bool = False):
+        self._connection = connection
+        self._cursor = connection.db.cursor()
+        self.dictionary = dictionary
+        self.lastrowid = None
+        self.rowcount = -1
+
+    def execute(self, query, params=()):
+        self._connection.query_count += 1
+        self._cursor.execute(query.replace('%s', '?'), tuple(params or ()))
+        self.lastrowid = self._cursor.lastrowid
+        self.rowcount = self._cursor.rowcount
+
+    def executemany(self, query, seq_params):
+        self._connection.query_count += 1
+        self._cursor.executemany(query.replace('%s', '?'), seq_params)
+        self.rowcount = self._cursor.rowcount
+
+    def _row(self, row):
+        if row is None or not self.dictionary:
+            return row
+        return {column[0]: value for column, value in zip(self._cursor.description, row)}
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    def close(self):
+        self._cursor.close()
+
+
+class StandInConnection:
+    """
+    Local stand-in for a mysql.connector connection.
+    Only the calls the parser makes are supported; every execute() is
+    counted so the benchmark can report queries per parse.
+    """
+
+    def __init__(self, db: sqlite3.Connection):
+        self.db = db
+        self.query_count = 0
+
+    def cursor(self, dictionary: bool = False, **kwargs):
+        return StandInCursor(self, dictionary)
+
+    def is_connected(self):
+        return True
+
+    def ping(self, reconnect: bool = False, **kwargs):
+        return None
+
+    def commit(self):
+        self.db.commit()
+
+    def rollback(self):
+        self.db.rollback()
+
+    def close(self):
+        pass
+
+
+class SyntheticCatalog:
+    """Synthetic customers, products and abbreviations loaded into SQLite"""
+
+    def __init__(self, customers: int, products: int, abbreviations_per_customer: int = 30, seed: int = 42):
+        self.rng = random.Random(seed)
+        self.customer_count = customers
+        self.product_count = products
+        self.abbreviations_per_customer = abbreviations_per_customer
+
+        self.db = sqlite3.connect(':memory:', check_same_thread=False)
+        self.db.executescript(BENCHMARK_SCHEMA)
+
+        self.customer_codes: Dict[int, str] = {}
+        self.product_codes: Dict[int, List[str]] = {}
+        self._generate()
+
+    def _unique_code(self, used, min_len, max_len, digits=False):
+        while True:
+            code = ''.join(self.rng.choice(string.ascii_lowercase)
+                           for _ in range(self.rng.randint(min_len, max_len)))
+            if digits and self.rng.random() < 0.5:
+                code += str(self.rng.randint(1, 99))
+            if code not in used:
+                used.add(code)
+                return code
+
+    def _generate(self):
+        rng = self.rng
+        self.db.executemany(
+            "INSERT INTO uom (id, code, name) VALUES (?, ?, ?)",
+            [(1, 'EA', 'Each'), (2, 'PC', 'Piece'), (3, 'LB', 'Pound'), (4, 'CS', 'Case')]
+        )
+        self.db.executemany(
+            "INSERT INTO products (id, item_code, description, price, vendor, category, uom_id) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(pid, f"ITEM{pid:06d}", f"Synthetic product {pid}", round(rng.uniform(1, 80), 2),
+              f"Vendor {pid % 25}", f"Category {pid % 12}", rng.randint(1, 4))
+             for pid in range(1, self.product_count + 1)]
+        )
+
+        used_customer_codes = set()
+        customer_rows = []
+        customer_abbreviation_rows = []
+        product_abbreviation_rows = []
+        customer_item_rows = []
+
+        for cid in range(1, self.customer_count + 1):
+            code = self._unique_code(used_customer_codes, 2, 4, digits=True)
+            self.customer_codes[cid] = code
+            customer_rows.append((cid, code.upper(), f"Customer {cid}"))
+            customer_abbreviation_rows.append((cid, code, 100, rng.randint(0, 50)))
+            customer_abbreviation_rows.append(
+                (cid, self._unique_code(used_customer_codes, 5, 8), 90, rng.randint(0, 10))
+            )
+
+            used_product_codes = set()
+            codes = []
+            for product_id in rng.sample(range(1, self.product_count + 1), self.abbreviations_per_customer):
+                product_code = self._unique_code(used_product_codes, 1, 4)
+                codes.append(product_code)
+                product_abbreviation_rows.append(
+                    (cid, product_id, product_code, rng.choice([100, 95, 90]), rng.randint(0, 200))
+                )
+                customer_item_rows.append((cid, product_id, product_code, rng.randint(1, 40)))
+            self.product_codes[cid] = codes
+
+        self.db.executemany("INSERT INTO customers (id, code, name) VALUES (?, ?, ?)", customer_rows)
+        self.db.executemany(
+            "INSERT INTO customer_abbreviations (customer_id, abbreviation, confidence_score, usage_count) "
+            "VALUES (?, ?, ?, ?)", customer_abbreviation_rows
+        )
+        self.db.executemany(
+            "INSERT INTO product_abbreviations (customer_id, product_id, abbreviation, confidence_score, usage_count) "
+            "VALUES (?, ?, ?, ?, ?)", product_abbreviation_rows
+        )
+        self.db.executemany(
+            "INSERT INTO customer_items (customer_id, product_id, nickname, frequency_score) "
+            "VALUES (?, ?, ?, ?)", customer_item_rows
+        )
+        self.db.commit()
+
+    def connection(self) -> StandInConnection:
+        return StandInConnection(self.db)
+
+    def typo(self, code: str, alphabet: str) -> str:
+        """One dropped, swapped or replaced character (never empty)"""
+        i = self.rng.randrange(len(code))
+        if len(code) > 2 and self.rng.random() < 0.3:
+            return code[:i] + code[i + 1:]
+        if len(code) > 1 and i < len(code) - 1 and self.rng.random() < 0.5:
+            return code[:i] + code[i + 1] + code[i] + code[i + 2:]
+        return code[:i] + self.rng.choice(alphabet) + code[i + 1:]
+
+    def order_corpus(self, orders: int, typo_rate: float = 0.12, unknown_rate: float = 0.08) -> List[str]:
+        """Shorthand orders mixing exact, mistyped and unknown codes"""
+        rng = self.rng
+        corpus = []
+        for _ in range(orders):
+            cid = rng.randint(1, self.customer_count)
+            customer_code = self.customer_codes[cid]
+            roll = rng.random()
+            if roll < unknown_rate:
+                customer_code = ''.join(rng.choice(string.ascii_lowercase) for _ in range(5))
+            elif roll < unknown_rate + typo_rate:
+                customer_code = self.typo(customer_code, string.ascii_lowercase)
+
+            lines = [customer_code]
+            for _ in range(rng.randint(1, 6)):
+                tokens = []
+                for _ in range(rng.randint(1, 5)):
+                    product_code = rng.choice(self.product_codes[cid])
+                    roll = rng.random()
+                    if roll < unknown_rate:
+                        product_code = ''.join(rng.choice(string.ascii_lowercase) for _ in range(4))
+                    elif roll < unknown_rate + typo_rate:
+                        product_code = self.typo(product_code, string.ascii_lowercase)
+                    tokens.append(f"{rng.randint(1, 12)}{product_code}")
+                lines.append(''.join(tokens))
+            corpus.append('\n'.join(lines))
+        return corpus
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def summarize(latencies: List[float], queries: List[int]) -> Dict:
+    ordered = sorted(latencies)
+    return {
+        'count': len(ordered),
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 4) if ordered else 0.0,
+        'p50_ms': round(percentile(ordered, 50) * 1000, 4),
+        'p95_ms': round(percentile(ordered, 95) * 1000, 4),
+        'p99_ms': round(percentile(ordered, 99) * 1000, 4),
+        'queries_per_call': round(sum(queries) / len(queries), 3) if queries else 0.0
+    }
+
+
+def _measure(parser, calls):
+    """Time each call from cold caches; caches warm up over the corpus as in production"""
+    parser.customer_cache.clear()
+    parser.product_cache.clear()
+    connection = parser.connection
+    latencies = []
+    queries = []
+    for call in calls:
+        before = connection.query_count
+        start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - start)
+        queries.append(connection.query_count - before)
+    return summarize(latencies, queries)
+
+
+def run_scenario(catalog: SyntheticCatalog, corpus: List[str], mode: str, seed: int = 7) -> Dict:
+    """Benchmark every parser entry point in one mode ('db' or 'indexed')"""
+    rng = random.Random(seed)
+    parser = ShorthandParser({})
+    parser.connection = catalog.connection()
+
+    setup = {}
+    if mode == 'indexed':
+        start = time.perf_counter()
+        parser.load_abbreviation_index(refresh_interval=3600)
+        setup['index_load_ms'] = round((time.perf_counter() - start) * 1000, 2)
+
+    parsed_orders = []
+
+    def parse(text):
+        parsed_orders.append(parser.parse_order(text))
+
+    operations = {
+        'parse_order': _measure(parser, [lambda t=text: parse(t) for text in corpus])
+    }
+
+    customer_lines = [text.split('\n', 1)[0] for text in corpus]
+    operations['parse_customer'] = _measure(
+        parser, [lambda line=line: parser.parse_customer(line) for line in customer_lines]
+    )
+
+    product_calls = []
+    for _ in range(len(corpus)):
+        cid = rng.randint(1, catalog.customer_count)
+        code = rng.choice(catalog.product_codes[cid])
+        if rng.random() < 0.2:
+            code = catalog.typo(code, string.ascii_lowercase)
+        product_calls.append(lambda code=code, cid=cid: parser.parse_single_product(code, 1.0, cid))
+    operations['parse_single_product'] = _measure(parser, product_calls)
+
+    reparse_calls = [
+        lambda order=order: parser.reparse_with_customer(order, rng.randint(1, catalog.customer_count))
+        for order in parsed_orders
+    ]
+    operations['reparse_with_customer'] = _measure(parser, reparse_calls)
+
+    # Memory: peak allocation while parsing the corpus again with cold caches
+    parser.customer_cache.clear()
+    parser.product_cache.clear()
+    tracemalloc.start()
+    for text in corpus:
+        parser.parse_order(text)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'mode': mode,
+        'setup': setup,
+        'operations': operations,
+        'memory': {'parse_corpus_peak_kb': round(peak / 1024, 1)},
+        'cache': parser.cache_stats()
+    }
+
+
+def current_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return 'unknown'
+
+
+def run_benchmarks(scales: List[int], products: int, orders: int, modes: List[str], seed: int = 42) -> Dict:
+    results = []
+    for customers in scales:
+        print(f"\n📦 Generating catalog: {customers:,} customers, {products:,} products")
+        start = time.perf_counter()
+        catalog = SyntheticCatalog(customers, products, seed=seed)
+        corpus = catalog.order_corpus(orders)
+        print(f"   Generated in {time.perf_counter() - start:.1f}s, {len(corpus)} orders")
+
+        for mode in modes:
+            result = run_scenario(catalog, corpus, mode)
+            result['scale'] = {
+                'customers': customers,
+                'products': products,
+                'product_abbreviations': customers * catalog.abbreviations_per_customer,
+                'orders': len(corpus)
+            }
+            results.append(result)
+
+            order_stats = result['operations']['parse_order']
+            print(f"   [{mode:>7}] parse_order p50 {order_stats['p50_ms']:.3f} ms, "
+                  f"p99 {order_stats['p99_ms']:.3f} ms, {order_stats['queries_per_call']:.2f} queries/parse")
+
+    return {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'commit': current_commit(),
+        'python': platform.python_version(),
+        'config': {'scales': scales, 'products': products, 'orders': orders, 'modes': modes, 'seed': seed},
+        'results': results
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Shorthand parser benchmark suite')
+    arg_parser.add_argument('--scales', default='100,1000,10000',
+                            help='Comma-separated customer counts (default: 100,1000,10000)')
+    arg_parser.add_argument('--products', type=int, default=20000, help='Catalog size')
+    arg_parser.add_argument('--orders', type=int, default=200, help='Orders in the corpus per scale')
+    arg_parser.add_argument('--modes', default='db,indexed', help='Comma-separated modes: db, indexed')
+    arg_parser.add_argument('--output', default=None, help='JSON results file (default: benchmark_<commit>.json)')
+    args = arg_parser.parse_args()
+
+    # Parser INFO logging would dominate the timings
+    logging.getLogger('shorthand_parser').setLevel(logging.WARNING)
+    logging.getLogger('abbreviation_index').setLevel(logging.WARNING)
+
+    print("🧪 Shorthand Parser Benchmark")
+    print("=" * 30)
+
+    report = run_benchmarks(
+        scales=[int(scale) for scale in args.scales.split(',')],
+        products=args.products,
+        orders=args.orders,
+        modes=args.modes.split(',')
+    )
+
+    output = args.output or f"benchmark_{report['commit']}.json"
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Results saved to {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Order Entry System - Bulk Order Import
+Parses a day's worth of emailed or texted shorthand orders across a process
+pool and saves the resolved ones in batched transactions
+"""
+
+import argparse
+import fnmatch
+import json
+import logging
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Tuple
+
+from order_manager import OrderManager
+from parse_results import ParsedOrder, serialize_parsed_order
+from shorthand_parser import ShorthandParser
+
+# One order per blank-line-separated block, the same as order sheets
+BLOCK_SEPARATOR = re.compile(r'\n\n+')
+
+# Parser for this worker process, set up once by _init_worker
+_worker_parser = None
+
+
+def _init_worker(db_config: Dict, use_index: bool):
+    """Give each worker process its own connection (and index)"""
+    global _worker_parser
+    logging.getLogger('shorthand_parser').setLevel(logging.WARNING)
+
+    parser = ShorthandParser(db_config)
+    if not parser.connect_database():
+        raise RuntimeError("Worker could not connect to database")
+    if use_index:
+        parser.load_abbreviation_index()
+    _worker_parser = parser
+
+
+def _parse_chunk(blocks: List[str]) -> List[ParsedOrder]:
+    return [_worker_parser.parse_order(block) for block in blocks]
+
+
+def collect_order_files(path: str, pattern: str = '*.txt') -> List[str]:
+    """A single file, or every file under a directory matching pattern (sorted)"""
+    if os.path.isfile(path):
+        return [path]
+
+    files = []
+    for root, _, names in os.walk(path):
+        for name in names:
+            if fnmatch.fnmatch(name, pattern):
+                files.append(os.path.join(root, name))
+    return sorted(files)
+
+
+def read_order_blocks(files: List[str]) -> List[Tuple[str, int, str]]:
+    """(file, block number, shorthand text) for every order block in the files"""
+    blocks = []
+    for path in files:
+        with open(path, encoding='utf-8', errors='replace') as handle:
+            text = handle.read().replace('\r\n', '\n')
+
+        number = 0
+        for block in BLOCK_SEPARATOR.split(text.strip()):
+            if block.strip():
+                number += 1
+                blocks.append((path, number, block))
+    return blocks
+
+
+def review_reasons(parsed_order: ParsedOrder) -> List[str]:
+    """Why an order needs a human before it can be saved (empty when resolved)"""
+    reasons = []
+    if not parsed_order.customer.customer_id:
+        reasons.append(f"Could not identify customer: {parsed_order.customer.raw_input}")
+    if not parsed_order.items:
+        reasons.append("No products found")
+    reasons.extend(parsed_order.parsing_errors)
+    return reasons
+
+
+def _chunks(items: List, size: int) -> Iterator[List]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _parse_blocks(texts: List[str], db_config: Dict, workers: int, chunk_size: int,
+                  use_index: bool) -> Iterator[ParsedOrder]:
+    """Parsed orders in input order; saving starts while later chunks are still parsing"""
+    if workers <= 1:
+        _init_worker(db_config, use_index)
+        try:
+            for chunk in _chunks(texts, chunk_size):
+                yield from _parse_chunk(chunk)
+        finally:
+            _worker_parser.close_connection()
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(db_config, use_index)) as pool:
+        for orders in pool.map(_parse_chunk, _chunks(texts, chunk_size)):
+            yield from orders
+
+
+def import_orders(paths: List[str], db_config: Dict, workers: int = 4, batch_size: int = 100,
+                  chunk_size: int = 25, review_path: str = 'import_review.jsonl',
+                  order_method: str = 'shorthand', pattern: str = '*.txt',
+                  use_index: bool = True, dry_run: bool = False) -> Dict:
+    """
+    Parse every order block in paths and save the resolved orders as drafts.
+
+    Orders that need a person (unknown customer or products, or a failed
+    save) are written to review_path as JSON lines with their source file,
+    block number, reasons and the serialized parse. Returns the run report.
+    """
+    start = time.perf_counter()
+
+    files = []
+    for path in paths:
+        files.extend(collect_order_files(path, pattern))
+    blocks = read_order_blocks(files)
+    print(f"📂 {len(blocks)} order blocks in {len(files)} files")
+
+    report = {
+        'files': len(files),
+        'orders': len(blocks),
+        'saved': 0,
+        'review': 0,
+        'save_failures': 0
+    }
+    if not blocks:
+        report.update(elapsed_seconds=0.0, orders_per_second=0.0)
+        return report
+
+    manager = None
+    if not dry_run:
+        manager = OrderManager(db_config)
+        if not manager.connect_database():
+            raise RuntimeError("Could not connect to database")
+
+    pending = []
+
+    with open(review_path, 'w', encoding='utf-8') as review:
+        def send_to_review(source, parsed_order, reasons):
+            path, number, _ = source
+            review.write(json.dumps({
+                'file': path,
+                'block': number,
+                'reasons': reasons,
+                'order': serialize_parsed_order(parsed_order)
+            }) + '\n')
+            report['review'] += 1
+
+        def flush():
+            if not pending:
+                return
+            if dry_run:
+                report['saved'] += len(pending)
+            else:
+                order_ids = manager.save_orders([order for _, order in pending], order_method)
+                for (source, parsed_order), order_id in zip(pending, order_ids):
+                    if order_id:
+                        report['saved'] += 1
+                    else:
+                        report['save_failures'] += 1
+                        send_to_review(source, parsed_order, ["Save failed"])
+            pending.clear()
+
+        try:
+            parsed = _parse_blocks([text for _, _, text in blocks], db_config,
+                                   workers, chunk_size, use_index)
+            for source, parsed_order in zip(blocks, parsed):
+                reasons = review_reasons(parsed_order)
+                if reasons:
+                    send_to_review(source, parsed_order, reasons)
+                    continue
+
+                pending.append((source, parsed_order))
+                if len(pending) >= batch_size:
+                    flush()
+            flush()
+        finally:
+            if manager:
+                manager.close_connection()
+
+    elapsed = time.perf_counter() - start
+    report['elapsed_seconds'] = round(elapsed, 3)
+    report['orders_per_second'] = round(len(blocks) / elapsed, 1) if elapsed else 0.0
+    return report
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Bulk import shorthand orders from files')
+    arg_parser.add_argument('paths', nargs='+', help='Order files or directories of order files')
+    arg_parser.add_argument('--pattern', default='*.txt', help='File name pattern inside directories')
+    arg_parser.add_argument('--workers', type=int, default=os.cpu_count() or 4,
+                            help='Parser processes (1 parses in this process)')
+    arg_parser.add_argument('--batch-size', type=int, default=100, help='Orders saved per transaction')
+    arg_parser.add_argument('--chunk-size', type=int, default=25, help='Order blocks sent to a worker at a time')
+    arg_parser.add_argument('--review', default='import_review.jsonl',
+                            help='JSON lines file for orders that need review')
+    arg_parser.add_argument('--order-method', default='shorthand',
+                            choices=['shorthand', 'email', 'text', 'voice', 'online', 'phone'],
+                            help='order_method recorded on saved orders')
+    arg_parser.add_argument('--no-index', action='store_true',
+                            help='Resolve through the database instead of an in-memory index per worker')
+    arg_parser.add_argument('--dry-run', action='store_true', help='Parse and sort orders without saving')
+    args = arg_parser.parse_args()
+
+    # Database configuration
+    db_config = {
+        'host': 'localhost',
+        'database': 'orders',
+        'user': 'root',
+        'password': '',  # Adjust as needed
+        'charset': 'utf8mb4'
+    }
+
+    try:
+        report = import_orders(
+            args.paths, db_config,
+            workers=args.workers,
+            batch_size=args.batch_size,
+            chunk_size=args.chunk_size,
+            review_path=args.review,
+            order_method=args.order_method,
+            pattern=args.pattern,
+            use_index=not args.no_index,
+            dry_run=args.dry_run
+        )
+    except Exception as e:
+        print(f"❌ Import failed: {e}")
+        sys.exit(1)
+
+    print("\n📊 Import summary")
+    print("=" * 30)
+    print(f"   Orders:        {report['orders']}")
+    print(f"   Saved:         {report['saved']}{' (dry run)' if args.dry_run else ''}")
+    print(f"   Needs review:  {report['review']} → {args.review}")
+    if report['save_failures']:
+        print(f"   Save failures: {report['save_failures']}")
+    print(f"   Elapsed:       {report['elapsed_seconds']:.2f}s")
+    print(f"   Throughput:    {report['orders_per_second']:.1f} orders/sec")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Order Entry System - Customer Resolution Context
+A customer's whole product vocabulary, fetched in one query once the customer
+is known so every product token on the order resolves from memory
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+from abbreviation_index import normalize_abbreviation
+from parser_cache import LookupCache, MISSING
+
+# customer_items has no confidence column. A nickname is an exact,
+# customer-specific match like a product_abbreviations row, so it scores as
+# one at that table's default confidence_score; abbreviations still take
+# precedence in lookup()
+NICKNAME_CONFIDENCE = 100
+
+
+class CustomerContext:
+    """
+    Resolution context for one customer.
+
+    products maps a normalized abbreviation to
+    (product_id, item_code, description, confidence, uom_code, uom_id), best
+    candidate by confidence_score then usage_count (the SQL lookup ordering).
+    nicknames holds the customer_items nicknames in the same shape, best by
+    frequency_score; they are only consulted when no abbreviation matches.
+    fuzzy_rows are the product_abbreviations rows the fuzzy fallback scores.
+    """
+
+    QUERY = """
+    SELECT 'abbreviation', pa.abbreviation, p.id, p.item_code, p.description,
+           pa.confidence_score, pa.usage_count, u.code, u.id
+    FROM product_abbreviations pa
+    JOIN products p ON p.id = pa.product_id
+    LEFT JOIN uom u ON p.uom_id = u.id
+    WHERE pa.customer_id = %s
+    UNION ALL
+    SELECT 'nickname', ci.nickname, p.id, p.item_code, p.description,
+           NULL, ci.frequency_score, u.code, u.id
+    FROM customer_items ci
+    JOIN products p ON p.id = ci.product_id
+    LEFT JOIN uom u ON p.uom_id = u.id
+    WHERE ci.customer_id = %s
+    AND ci.is_active = TRUE
+    AND ci.nickname IS NOT NULL AND ci.nickname <> ''
+    """
+
+    def __init__(self, customer_id: int, rows):
+        self.customer_id = customer_id
+        self.products: Dict[str, Tuple] = {}
+        self.nicknames: Dict[str, Tuple] = {}
+        self.fuzzy_rows: List[Tuple] = []
+        self.product_ids = set()
+
+        product_rank = {}
+        nickname_rank = {}
+        for source, abbr, prod_id, item_code, desc, conf, usage, uom_code, uom_id in rows:
+            key = normalize_abbreviation(abbr)
+            self.product_ids.add(prod_id)
+            if source == 'abbreviation':
+                self.fuzzy_rows.append((prod_id, item_code, desc, abbr, conf, uom_code, uom_id))
+                rank = (conf or 0, usage or 0)
+                if key not in self.products or rank > product_rank[key]:
+                    self.products[key] = (prod_id, item_code, desc, conf, uom_code or 'EA', uom_id or 1)
+                    product_rank[key] = rank
+            else:
+                rank = usage or 0
+                if key not in self.nicknames or rank > nickname_rank[key]:
+                    self.nicknames[key] = (prod_id, item_code, desc, NICKNAME_CONFIDENCE,
+                                           uom_code or 'EA', uom_id or 1)
+                    nickname_rank[key] = rank
+
+    def __len__(self):
+        return len(self.products) + len(self.nicknames)
+
+    def lookup(self, code: str) -> Optional[Tuple]:
+        """Best exact match for a code: abbreviation first, then nickname"""
+        key = normalize_abbreviation(code)
+        return self.products.get(key) or self.nicknames.get(key)
+
+
+class CustomerContextCache:
+    """Hot customer contexts, bounded and expired like the other parser caches"""
+
+    def __init__(self, maxsize: int = 500, ttl: float = 300.0):
+        self.contexts = LookupCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, customer_id: int) -> Optional[CustomerContext]:
+        context = self.contexts.get(customer_id)
+        return None if context is MISSING else context
+
+    def set(self, context: CustomerContext):
+        self.contexts.set(context.customer_id, context)
+
+    def invalidate(self, customer_id: int = None):
+        """Drop one customer's context, or all of them"""
+        if customer_id is None:
+            self.contexts.clear()
+        else:
+            self.contexts.invalidate(customer_id)
+
+    def invalidate_product(self, product_id: int):
+        """Drop every context that mentions a product"""
+        self.contexts.invalidate_where(lambda key, context, negative: product_id in context.product_ids)
+
+    def stats(self) -> Dict:
+        return self.contexts.stats()
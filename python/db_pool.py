@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Order Entry System - Database Connection Pool
+Shared mysql.connector connection pool used by the parser, the order manager,
+the setup classes and the import scripts, with pre-ping, reconnect and stats
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import mysql.connector
+from mysql.connector import Error
+from mysql.connector.errors import PoolError
+
+DEFAULT_POOL_SIZE = 10
+
+
+class ConnectionPool:
+    """
+    Up to size mysql.connector connections shared by every component in the
+    process that uses the same db_config.
+
+    A connection belongs to one caller between acquire() and release(), since
+    mysql.connector connections are not safe to share between threads.
+    Connections that sat idle longer than ping_after seconds are pinged (and
+    reconnected) before they are handed out, connections older than recycle
+    seconds are replaced, and release() rolls back anything left open so the
+    next caller starts clean. When every connection is in use, acquire()
+    waits up to timeout seconds and then raises PoolError.
+    """
+
+    def __init__(self, db_config, size: int = DEFAULT_POOL_SIZE, timeout: float = 30.0,
+                 ping_after: float = 1.0, recycle: float = 3600.0):
+        self.db_config = dict(db_config)
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self.recycle = recycle
+        self.pid = os.getpid()
+
+        # (connection, created, last released) with the most recently used last
+        self._idle = []
+        # connection -> created, for connections checked out right now
+        self._in_use = {}
+        # Connections open or being opened (idle + in use)
+        self._open = 0
+        self._closed = False
+        self._available = threading.Condition(threading.Lock())
+
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.timeouts = 0
+        self.connections_created = 0
+        self.reconnects = 0
+        self.recycled = 0
+        self.discarded = 0
+
+    def acquire(self, timeout: Optional[float] = None):
+        """Check out a live connection"""
+        timeout = self.timeout if timeout is None else timeout
+        with self._available:
+            if self._closed:
+                raise PoolError("Connection pool is closed")
+            self.checkouts += 1
+            if not self._idle and self._open >= self.size:
+                self.waits += 1
+                start = time.perf_counter()
+                ready = self._available.wait_for(lambda: self._idle or self._open < self.size, timeout)
+                self.wait_seconds += time.perf_counter() - start
+                if not ready:
+                    self.timeouts += 1
+                    raise PoolError(f"No free connection after {timeout}s ({self.size} in use)")
+
+            if self._idle:
+                # Most recently used first: it is the least likely to have gone stale
+                connection, created, last_used = self._idle.pop()
+            else:
+                connection = None
+                self._open += 1
+
+        try:
+            if connection is None:
+                connection, created = self._connect(), time.time()
+            else:
+                connection, created = self._revive(connection, created, last_used)
+        except Exception:
+            with self._available:
+                self._open -= 1
+                self._available.notify()
+            raise
+
+        with self._available:
+            self._in_use[connection] = created
+        return connection
+
+    def release(self, connection):
+        """Return a connection to the pool (anything left uncommitted is rolled back)"""
+        with self._available:
+            created = self._in_use.pop(connection, None)
+        if created is None:
+            # Not one of ours (a connection set directly on a component)
+            connection.close()
+            return
+
+        if self._closed:
+            self._discard(connection)
+            return
+
+        try:
+            if connection.in_transaction:
+                connection.rollback()
+        except Error:
+            # Dropped, or a cursor with unread rows; not worth saving
+            self._discard(connection)
+            return
+
+        with self._available:
+            self._idle.append((connection, created, time.time()))
+            self._available.notify()
+
+    def discard(self, connection):
+        """Close a connection instead of returning it (dropped, or being replaced)"""
+        with self._available:
+            created = self._in_use.pop(connection, None)
+        if created is None:
+            self._close_quietly(connection)
+            return
+        self._discard(connection)
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None):
+        """with pool.connection() as conn: ... (released on the way out)"""
+        connection = self.acquire(timeout)
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+    def ping(self, connection) -> bool:
+        """Check a connection held for a long time, reconnecting it if it was dropped"""
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except Error:
+            pass
+        try:
+            connection.reconnect(attempts=2, delay=1)
+            with self._available:
+                self.reconnects += 1
+            return True
+        except Error:
+            return False
+
+    def close(self):
+        """Close the idle connections; checked-out ones are closed as they come back"""
+        with self._available:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._closed = True
+        for connection, _, _ in idle:
+            try:
+                connection.close()
+            except Error:
+                pass
+
+    def stats(self) -> Dict:
+        """Checkouts, waits and connection ages for monitoring"""
+        now = time.time()
+        with self._available:
+            ages = [now - created for _, created, _ in self._idle] + [now - created for created in self._in_use.values()]
+            return {
+                'size': self.size,
+                'open': self._open,
+                'in_use': len(self._in_use),
+                'idle': len(self._idle),
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'wait_seconds': round(self.wait_seconds, 4),
+                'timeouts': self.timeouts,
+                'connections_created': self.connections_created,
+                'reconnects': self.reconnects,
+                'recycled': self.recycled,
+                'discarded': self.discarded,
+                'oldest_connection_seconds': round(max(ages), 1) if ages else 0.0,
+                'mean_connection_age_seconds': round(sum(ages) / len(ages), 1) if ages else 0.0
+            }
+
+    def _connect(self):
+        connection = mysql.connector.connect(**self.db_config)
+        with self._available:
+            self.connections_created += 1
+        return connection
+
+    def _revive(self, connection, created: float, last_used: float):
+        """Pre-ping a connection coming out of the idle list, replacing it if it is old or dead"""
+        now = time.time()
+        if self.recycle and now - created > self.recycle:
+            with self._available:
+                self.recycled += 1
+            self._close_quietly(connection)
+            return self._connect(), now
+
+        if now - last_used > self.ping_after:
+            try:
+                connection.ping(reconnect=False)
+            except Error:
+                with self._available:
+                    self.reconnects += 1
+                self._close_quietly(connection)
+                return self._connect(), now
+
+        return connection, created
+
+    def _discard(self, connection):
+        self._close_quietly(connection)
+        with self._available:
+            self._open -= 1
+            self.discarded += 1
+            self._available.notify()
+
+    @staticmethod
+    def _close_quietly(connection):
+        try:
+            connection.close()
+        except Error:
+            pass
+
+
+_pools: Dict[tuple, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def _pool_key(db_config) -> tuple:
+    return tuple(sorted((key, repr(value)) for key, value in db_config.items()))
+
+
+def get_pool(db_config, size: Optional[int] = None) -> ConnectionPool:
+    """
+    The process-wide pool for db_config, created on first use.
+
+    Asking for a larger size than the pool has grows it. A process forked
+    from one that already had a pool (ProcessPoolExecutor workers) gets its
+    own instead of sharing the parent's sockets.
+    """
+    key = _pool_key(db_config)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.pid != os.getpid():
+            pool = ConnectionPool(db_config, size=size or DEFAULT_POOL_SIZE)
+            _pools[key] = pool
+        elif size and size > pool.size:
+            with pool._available:
+                pool.size = size
+                pool._available.notify_all()
+        return pool
+
+
+def acquire_connection(db_config, size: Optional[int] = None):
+    """Check out a connection from the shared pool for db_config"""
+    return get_pool(db_config, size).acquire()
+
+
+def _owning_pool(connection) -> Optional[ConnectionPool]:
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        with pool._available:
+            if connection in pool._in_use:
+                return pool
+    return None
+
+
+def release_connection(connection):
+    """Return a connection to whichever shared pool it came from (or close it)"""
+    pool = _owning_pool(connection)
+    if pool is not None:
+        pool.release(connection)
+    else:
+        connection.close()
+
+
+def discard_connection(connection):
+    """Close a connection from a shared pool, freeing its slot (before reconnecting)"""
+    pool = _owning_pool(connection)
+    if pool is not None:
+        pool.discard(connection)
+    else:
+        ConnectionPool._close_quietly(connection)
+
+
+@contextmanager
+def pooled_connection(db_config, size: Optional[int] = None):
+    """with pooled_connection(db_config) as conn: ... on the shared pool"""
+    with get_pool(db_config, size).connection() as connection:
+        yield connection
+
+
+def pool_stats() -> Dict[str, Dict]:
+    """Stats for every shared pool in this process, by host/database"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return {
+        f"{pool.db_config.get('host', 'localhost')}/{pool.db_config.get('database', '')}": pool.stats()
+        for pool in pools
+    }
+
+
+def close_pools():
+    """Close every shared pool in this process"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Order Entry System - Fuzzy Abbreviation Index
+q-gram inverted index that narrows fuzzy abbreviation matching down to a
+small candidate set before scoring with fuzz.ratio
+"""
+
+import math
+import random
+import string
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from fuzzywuzzy import fuzz
+
+from fuzzy_scoring import score_matches
+
+
+def qgrams(text: str, q: int = 2) -> Set[str]:
+    """
+    Padded q-grams of a string: 'g18' -> {'^g', 'g1', '18', '8$'}.
+    Padding means the first and last characters count on their own, which
+    keeps one- and two-letter codes findable.
+    """
+    padded = f"^{text}$"
+    if len(padded) <= q:
+        return {padded}
+    return {padded[i:i + q] for i in range(len(padded) - q + 1)}
+
+
+class FuzzyIndex:
+    """
+    Inverted q-gram index over a fixed list of abbreviations.
+
+    A query is only scored against entries that share at least one q-gram with
+    it and whose length could still reach the similarity threshold
+    (fuzz.ratio is 2*matches/(len_a+len_b), so very short or very long strings
+    can never score above it). An entry sharing no q-gram can still score up
+    to unshared_ceiling(), so when the candidates' top matches don't all beat
+    that, search() scores every entry of a possible length instead. Either
+    way the results are those of a full scan.
+    """
+
+    def __init__(self, entries: Sequence[Tuple[str, Any]], q: int = 2):
+        self.q = q
+        self.keys: List[str] = []
+        self.payloads: List[Any] = []
+        self.postings: Dict[str, List[int]] = defaultdict(list)
+
+        for key, payload in entries:
+            position = len(self.keys)
+            key = key.lower()
+            self.keys.append(key)
+            self.payloads.append(payload)
+            for gram in qgrams(key, q):
+                self.postings[gram].append(position)
+
+        self.postings = dict(self.postings)
+
+    def __len__(self):
+        return len(self.keys)
+
+    @staticmethod
+    def _length_bounds(query: str, threshold: int) -> Tuple[float, float]:
+        """Length bound for ratio > threshold: shorter/longer strings can't match"""
+        fraction = threshold / 200.0
+        return len(query) * fraction / (1 - fraction), len(query) * (1 - fraction) / fraction
+
+    def candidates(self, query: str, threshold: int) -> List[int]:
+        """Positions worth scoring for a query, in insertion order"""
+        query = query.lower()
+        min_len, max_len = self._length_bounds(query, threshold)
+
+        positions = set()
+        for gram in qgrams(query, self.q):
+            positions.update(self.postings.get(gram, ()))
+
+        keys = self.keys
+        return sorted(p for p in positions if min_len <= len(keys[p]) <= max_len)
+
+    def unshared_ceiling(self, query: str, threshold: int) -> int:
+        """
+        Highest similarity an entry of a possible length can reach without
+        sharing a q-gram with the query. Padded, the two strings have M + 2
+        characters in common ('^' and '$' included) in runs of at most q - 1
+        (a longer run would be a shared q-gram), with an unmatched character
+        between runs, so M <= ((L + 1)(q - 1) - 2) / (2q - 1) for combined
+        length L. That bound is monotonic in L, so the extremes cover the range.
+        """
+        min_len, max_len = self._length_bounds(query, threshold)
+        q = self.q
+        ceiling = 0.0
+        for key_len in {max(math.ceil(min_len), 1), max(math.floor(max_len), 1)}:
+            total = len(query) + key_len
+            matches = ((total + 1) * (q - 1) - 2) / (2 * q - 1)
+            ceiling = max(ceiling, 200.0 * matches / total)
+        # Similarities are rounded to whole numbers
+        return min(math.ceil(ceiling), 100)
+
+    def _length_candidates(self, query: str, threshold: int) -> List[int]:
+        """Every position whose length could reach the threshold"""
+        min_len, max_len = self._length_bounds(query, threshold)
+        return [p for p, key in enumerate(self.keys) if min_len <= len(key) <= max_len]
+
+    def search(self, query: str, threshold: int, limit: int = 5,
+               on_candidates: Optional[Callable[[int], None]] = None) -> List[Tuple[int, Any]]:
+        """
+        Top matches as (similarity, payload), best first.
+        Ties keep insertion order, like a stable sort over a full scan.
+        on_candidates, if given, is called with the number of entries scored.
+        """
+        query = query.lower()
+        keys = self.keys
+        candidates = self.candidates(query, threshold)
+        scored = len(candidates)
+        matches = score_matches(query, [keys[p] for p in candidates], threshold, limit)
+
+        if len(matches) < limit or matches[-1][0] <= self.unshared_ceiling(query, threshold):
+            # An entry sharing no q-gram could still make the top matches
+            candidates = self._length_candidates(query, threshold)
+            scored += len(candidates)
+            matches = score_matches(query, [keys[p] for p in candidates], threshold, limit)
+
+        if on_candidates is not None:
+            on_candidates(scored)
+        return [(similarity, self.payloads[candidates[i]]) for similarity, i in matches]
+
+
+def _random_typo(code: str, rng: random.Random) -> str:
+    """Apply one keyboard-style typo: drop, swap, replace or insert a character"""
+    alphabet = string.ascii_lowercase + string.digits
+    i = rng.randrange(len(code))
+    kind = rng.choice(['drop', 'swap', 'replace', 'insert'])
+    if kind == 'drop' and len(code) > 1:
+        return code[:i] + code[i + 1:]
+    if kind == 'swap' and i < len(code) - 1:
+        return code[:i] + code[i + 1] + code[i] + code[i + 2:]
+    if kind == 'replace':
+        return code[:i] + rng.choice(alphabet) + code[i + 1:]
+    return code[:i] + rng.choice(alphabet) + code[i:]
+
+
+def benchmark_fuzzy_index(size: int = 10000, queries: int = 500, seed: int = 42):
+    """Compare the indexed search against the full-scan fuzzy match"""
+    rng = random.Random(seed)
+    abbreviations = set()
+    while len(abbreviations) < size:
+        letters = ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(2, 6)))
+        digits = str(rng.randint(1, 99)) if rng.random() < 0.4 else ''
+        abbreviations.add(letters + digits)
+
+    entries = [(abbr, customer_id) for customer_id, abbr in enumerate(sorted(abbreviations), 1)]
+    samples = [_random_typo(rng.choice(entries)[0], rng) for _ in range(queries)]
+
+    start = time.perf_counter()
+    index = FuzzyIndex(entries)
+    build_time = time.perf_counter() - start
+
+    def full_scan(query):
+        scored = []
+        for abbr, payload in entries:
+            similarity = fuzz.ratio(query, abbr)
+            if similarity > 60:
+                scored.append((similarity, payload))
+        scored.sort(key=lambda match: match[0], reverse=True)
+        return scored[:5]
+
+    start = time.perf_counter()
+    expected = [full_scan(query) for query in samples]
+    scan_time = time.perf_counter() - start
+
+    scored = []
+    start = time.perf_counter()
+    actual = [index.search(query, 60, 5, on_candidates=scored.append) for query in samples]
+    index_time = time.perf_counter() - start
+
+    candidates = sum(scored)
+    identical = sum(1 for e, a in zip(expected, actual) if e == a)
+    same_scores = sum(1 for e, a in zip(expected, actual)
+                      if [s for s, _ in e] == [s for s, _ in a])
+
+    print(f"🧪 Fuzzy index benchmark: {size:,} abbreviations, {queries} typo queries")
+    print("=" * 50)
+    print(f"   Index build:        {build_time * 1000:.1f} ms")
+    print(f"   Full scan:          {scan_time / queries * 1000:.2f} ms/query ({size:,} scored)")
+    print(f"   Indexed search:     {index_time / queries * 1000:.2f} ms/query "
+          f"({candidates / queries:.0f} scored on average)")
+    print(f"   Speedup:            {scan_time / index_time:.1f}x")
+    print(f"   Identical top-5:    {identical}/{queries}")
+    print(f"   Same top-5 scores:  {same_scores}/{queries}")
+
+
+if __name__ == "__main__":
+    benchmark_fuzzy_index()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Order Entry System - Batch Fuzzy Scoring
+Scores shorthand codes against a whole candidate list in one call and keeps
+the top matches with a partial selection instead of a full sort
+"""
+
+import heapq
+import random
+import string
+import time
+from typing import List, Sequence, Tuple
+
+from fuzzywuzzy import fuzz
+
+# rapidfuzz scores a whole choice list in C; numpy adds the cdist matrix for
+# several queries at once. Both are optional: without them scoring falls back
+# to one fuzz.ratio call per candidate with identical results.
+#
+# rapidfuzz's ratio is the one fuzzywuzzy computes on python-Levenshtein.
+# Pure-Python fuzzywuzzy (difflib) scores some pairs differently, so without
+# python-Levenshtein the fast paths stay off and results keep matching
+# fuzz.ratio. See "Python Packages" in docs/DEPLOYMENT_GUIDE.md.
+LEVENSHTEIN_BACKED = fuzz.SequenceMatcher.__module__ == 'fuzzywuzzy.StringMatcher'
+
+try:
+    from rapidfuzz import fuzz as rapid_fuzz, process as rapid_process
+except ImportError:
+    rapid_fuzz = rapid_process = None
+
+if not LEVENSHTEIN_BACKED:
+    rapid_fuzz = rapid_process = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def _best(scored: List[Tuple[int, int]], limit: int) -> List[Tuple[int, int]]:
+    """Top (similarity, position) pairs, best first, ties by position"""
+    return heapq.nsmallest(limit, scored, key=lambda match: (-match[0], match[1]))
+
+
+def _loop_matches(query: str, choices: Sequence[str], threshold: int, limit: int) -> List[Tuple[int, int]]:
+    scored = []
+    for position, choice in enumerate(choices):
+        similarity = fuzz.ratio(query, choice)
+        if similarity > threshold:
+            scored.append((similarity, position))
+    return _best(scored, limit)
+
+
+def _extract_matches(query: str, choices: Sequence[str], threshold: int, limit: int) -> List[Tuple[int, int]]:
+    # fuzzywuzzy reports round(100 * ratio) as an int; rapidfuzz returns the
+    # same ratio unrounded, so round it the same way before the > threshold test
+    scored = []
+    for _, score, position in rapid_process.extract(
+            query, choices, scorer=rapid_fuzz.ratio, limit=None, score_cutoff=threshold):
+        similarity = int(round(score))
+        if similarity > threshold:
+            scored.append((similarity, position))
+    return _best(scored, limit)
+
+
+def _cdist_matches(queries: Sequence[str], choices: Sequence[str], threshold: int,
+                   limit: int) -> List[List[Tuple[int, int]]]:
+    matrix = rapid_process.cdist(queries, choices, scorer=rapid_fuzz.ratio,
+                                 score_cutoff=threshold, dtype=np.float64)
+    # np.rint rounds half to even, like round() in fuzzywuzzy
+    similarities = np.rint(matrix)
+
+    results = []
+    for row in similarities:
+        hits = np.flatnonzero(row > threshold)
+        if len(hits) > limit:
+            # Partial selection: keep only what scores at least the k-th best
+            kth = np.partition(row[hits], -limit)[-limit]
+            hits = hits[row[hits] >= kth]
+        results.append(_best([(int(row[p]), int(p)) for p in hits], limit))
+    return results
+
+
+def score_matches(query: str, choices: Sequence[str], threshold: int,
+                  limit: int = 5) -> List[Tuple[int, int]]:
+    """
+    Top matches of query among choices as (similarity, position), best first.
+    Only similarities above threshold are kept; ties keep choice order, the
+    same result as scoring each choice with fuzz.ratio and stable-sorting.
+    """
+    if not choices:
+        return []
+    if rapid_process is not None:
+        return _extract_matches(query, choices, threshold, limit)
+    return _loop_matches(query, choices, threshold, limit)
+
+
+def batch_score_matches(queries: Sequence[str], choices: Sequence[str], threshold: int,
+                        limit: int = 5) -> List[List[Tuple[int, int]]]:
+    """score_matches for several queries against the same choices, as one similarity matrix"""
+    if not queries:
+        return []
+    if not choices:
+        return [[] for _ in queries]
+    if rapid_process is not None and np is not None and len(queries) > 1:
+        return _cdist_matches(queries, choices, threshold, limit)
+    return [score_matches(query, choices, threshold, limit) for query in queries]
+
+
+def benchmark_fuzzy_scoring(choices: int = 500, queries: int = 20, rounds: int = 50, seed: int = 42):
+    """Compare batch scoring against the per-candidate fuzz.ratio loop"""
+    rng = random.Random(seed)
+    vocabulary = [''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(1, 5)))
+                  for _ in range(choices)]
+    codes = [''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(1, 4)))
+             for _ in range(queries)]
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        expected = [_loop_matches(code, vocabulary, 70, 5) for code in codes]
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        actual = batch_score_matches(codes, vocabulary, 70, 5)
+    batch_time = time.perf_counter() - start
+
+    backend = 'loop' if LEVENSHTEIN_BACKED else 'loop (difflib; install python-Levenshtein)'
+    if rapid_process is not None:
+        backend = 'rapidfuzz cdist' if np is not None else 'rapidfuzz extract'
+
+    print(f"🧪 Fuzzy scoring benchmark: {queries} codes x {choices} abbreviations, {rounds} rounds")
+    print("=" * 50)
+    print(f"   Backend:            {backend}")
+    print(f"   fuzz.ratio loop:    {loop_time / rounds * 1000:.2f} ms/batch")
+    print(f"   Batch scoring:      {batch_time / rounds * 1000:.2f} ms/batch")
+    print(f"   Speedup:            {loop_time / batch_time:.1f}x")
+    print(f"   Identical top-5:    {sum(1 for e, a in zip(expected, actual) if e == a)}/{queries}")
+
+
+if __name__ == "__main__":
+    benchmark_fuzzy_scoring()
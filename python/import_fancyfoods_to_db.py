@@ -1,7 +1,8 @@
 import csv
-import mysql.connector
 from mysql.connector import Error
 
+from db_pool import pooled_connection
+
 # CONFIGURE THESE
 DB_CONFIG = {
     'host': 'localhost',
@@ -43,22 +44,19 @@ def upsert_product(cursor, row, uom_id):
 
 def main():
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
-        cursor = conn.cursor()
-        with open(CSV_PATH, newline='', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                uom_code = row['UOM'].strip().upper() if row['UOM'] else 'LB'
-                uom_id = get_uom_id(cursor, uom_code)
-                upsert_product(cursor, row, uom_id)
-        conn.commit()
+        with pooled_connection(DB_CONFIG) as conn:
+            cursor = conn.cursor()
+            with open(CSV_PATH, newline='', encoding='utf-8') as csvfile:
+                reader = csv.DictReader(csvfile)
+                for row in reader:
+                    uom_code = row['UOM'].strip().upper() if row['UOM'] else 'LB'
+                    uom_id = get_uom_id(cursor, uom_code)
+                    upsert_product(cursor, row, uom_id)
+            conn.commit()
+            cursor.close()
         print('Import complete.')
     except Error as e:
         print(f'Error: {e}')
-    finally:
-        if 'conn' in locals() and conn.is_connected():
-            cursor.close()
-            conn.close()
 
 if __name__ == '__main__':
     main()
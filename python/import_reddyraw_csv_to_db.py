@@ -1,5 +1,6 @@
 import csv
-import pymysql
+
+from db_pool import acquire_connection, release_connection
 
 # CONFIGURE THESE
 CSV_PATH = 'data/excel_price_sheets/reddyraw/pricebook_001_extracted_allpages.csv'
@@ -40,14 +41,14 @@ UOM_MAP = {
 def get_uom_id(uom_str):
     return UOM_MAP.get(uom_str.strip().lower(), 3)  # Default to 'cs' if unknown
 
-# Connect to DB
-conn = pymysql.connect(
-    host=DB_HOST,
-    user=DB_USER,
-    password=DB_PASS,
-    database=DB_NAME,
-    charset='utf8mb4'
-)
+# Connect to DB (shared pool; same %s placeholders as pymysql)
+conn = acquire_connection({
+    'host': DB_HOST,
+    'user': DB_USER,
+    'password': DB_PASS,
+    'database': DB_NAME,
+    'charset': 'utf8mb4'
+})
 cursor = conn.cursor()
 
 
@@ -86,4 +87,4 @@ with open(CSV_PATH, newline='', encoding='utf-8') as csvfile:
     print(f"Imported {count} products into {TABLE}.")
 
 cursor.close()
-conn.close()
+release_connection(conn)
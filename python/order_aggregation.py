@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Order Entry System - Pick List and Product Demand
+Per-product demand and per-vendor purchase lists for a delivery date or date
+range, from one grouped query over orders and order_items
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import json
+import sys
+from datetime import date
+from typing import Dict, List, Sequence
+
+from db_pool import pooled_connection
+
+try:
+    import pandas as pd
+except ImportError:  # Only needed for demand_frame()
+    pd = None
+
+# Orders still to be picked / delivered
+PICK_STATUSES = ('submitted', 'processing', 'out_for_delivery')
+# Everything that was actually ordered, for demand history
+DEMAND_STATUSES = ('submitted', 'processing', 'out_for_delivery', 'delivered', 'archived')
+
+PRODUCT_COLUMNS = ['vendor', 'category', 'item_code', 'product_name', 'uom', 'quantity',
+                   'delivered_quantity', 'total_amount', 'orders', 'customers', 'product_id']
+VENDOR_COLUMNS = ['vendor', 'products', 'quantities', 'total_amount']
+
+
+class OrderAggregator:
+    """
+    Demand reports on a MySQL connection (pooled_connection() in the CLI).
+
+    An order counts for a date by its delivery_date, or by its order_date
+    until start_delivery gives it one. Totals are grouped per product and
+    UOM in MySQL, so the rows coming back are one per product however many
+    line items the range covers; products and UOM codes are joined after
+    grouping.
+    """
+
+    DEMAND_QUERY = """
+        SELECT d.product_id, p.item_code, p.description AS product_name,
+               COALESCE(p.vendor, '') AS vendor, COALESCE(p.category, '') AS category,
+               COALESCE(u.code, '') AS uom, d.quantity, d.delivered_quantity,
+               d.total_amount, d.orders, d.customers
+        FROM (
+            SELECT oi.product_id, oi.uom_id,
+                   SUM(oi.quantity) AS quantity,
+                   SUM(COALESCE(oi.delivered_quantity, 0)) AS delivered_quantity,
+                   SUM(oi.line_total) AS total_amount,
+                   COUNT(DISTINCT oi.order_id) AS orders,
+                   COUNT(DISTINCT o.customer_id) AS customers
+            FROM orders o
+            JOIN order_items oi ON oi.order_id = o.id
+            WHERE (o.delivery_date BETWEEN %s AND %s
+                   OR (o.delivery_date IS NULL AND o.order_date BETWEEN %s AND %s))
+              AND o.status IN ({placeholders})
+            GROUP BY oi.product_id, oi.uom_id
+        ) d
+        JOIN products p ON p.id = d.product_id
+        LEFT JOIN uom u ON u.id = d.uom_id
+        ORDER BY vendor, category, p.item_code
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def product_demand(self, start: date, end: date = None,
+                       statuses: Sequence[str] = PICK_STATUSES) -> List[Dict]:
+        """Per-product (and UOM) totals for orders dated start..end, vendor by vendor"""
+        end = end or start
+        statuses = list(statuses)
+        with contextlib.closing(self.connection.cursor(dictionary=True)) as cursor:
+            cursor.execute(self.DEMAND_QUERY.format(placeholders=', '.join(['%s'] * len(statuses))),
+                           [start, end, start, end] + statuses)
+            rows = cursor.fetchall()
+
+        for row in rows:
+            # DECIMAL sums come back as Decimal; reports want plain numbers
+            row['quantity'] = float(row['quantity'] or 0)
+            row['delivered_quantity'] = float(row['delivered_quantity'] or 0)
+            row['total_amount'] = round(float(row['total_amount'] or 0), 2)
+        return rows
+
+    @staticmethod
+    def vendor_purchase_list(products: List[Dict]) -> List[Dict]:
+        """Roll per-product demand up to one purchase list per vendor"""
+        vendors = {}
+        for row in products:
+            vendor = vendors.get(row['vendor'])
+            if vendor is None:
+                vendor = vendors[row['vendor']] = {
+                    'vendor': row['vendor'],
+                    'products': 0,
+                    'quantities': {},
+                    'total_amount': 0.0,
+                    'items': []
+                }
+            vendor['products'] += 1
+            vendor['quantities'][row['uom']] = vendor['quantities'].get(row['uom'], 0.0) + row['quantity']
+            vendor['total_amount'] += row['total_amount']
+            vendor['items'].append({
+                'item_code': row['item_code'],
+                'product_name': row['product_name'],
+                'uom': row['uom'],
+                'quantity': row['quantity']
+            })
+
+        for vendor in vendors.values():
+            vendor['total_amount'] = round(vendor['total_amount'], 2)
+        return list(vendors.values())
+
+    def pick_list(self, start: date, end: date = None, statuses: Sequence[str] = PICK_STATUSES) -> Dict:
+        """Product totals and vendor purchase lists for start..end"""
+        products = self.product_demand(start, end, statuses)
+        return {
+            'start': start.isoformat(),
+            'end': (end or start).isoformat(),
+            'statuses': list(statuses),
+            'products': products,
+            'vendors': self.vendor_purchase_list(products)
+        }
+
+    def demand_frame(self, start: date, end: date = None, statuses: Sequence[str] = DEMAND_STATUSES):
+        """product_demand as a pandas DataFrame, for further analysis"""
+        if pd is None:
+            raise ImportError("demand_frame needs pandas (pip install pandas)")
+        return pd.DataFrame(self.product_demand(start, end, statuses), columns=PRODUCT_COLUMNS)
+
+
+def _format_quantities(quantities: Dict[str, float]) -> str:
+    return ', '.join(f"{quantity:g} {uom}".strip() for uom, quantity in sorted(quantities.items()))
+
+
+def report_rows(report: Dict, kind: str) -> List[Dict]:
+    """Flat rows for CSV: one per product, or one per vendor"""
+    if kind == 'products':
+        return [{column: row[column] for column in PRODUCT_COLUMNS} for row in report['products']]
+    return [
+        dict({column: vendor[column] for column in VENDOR_COLUMNS},
+             quantities=_format_quantities(vendor['quantities']))
+        for vendor in report['vendors']
+    ]
+
+
+def write_csv(rows: List[Dict], columns: List[str], output) -> None:
+    writer = csv.DictWriter(output, fieldnames=columns)
+    writer.writeheader()
+    writer.writerows(rows)
+
+
+def print_pick_list(report: Dict, kind: str):
+    """Human-readable pick list (products) or purchase list (vendors)"""
+    period = report['start'] if report['start'] == report['end'] else f"{report['start']} to {report['end']}"
+    if kind == 'products':
+        print(f"📋 Pick list for {period}: {len(report['products'])} products")
+        vendor = None
+        for row in report['products']:
+            if row['vendor'] != vendor:
+                vendor = row['vendor']
+                print(f"\n🏭 {vendor or '(no vendor)'}")
+            print(f"   {row['quantity']:>8g} {row['uom']:<4} {row['item_code']:<12} {row['product_name'][:50]}")
+    else:
+        print(f"🛒 Purchase lists for {period}: {len(report['vendors'])} vendors")
+        for vendor in report['vendors']:
+            print(f"\n🏭 {vendor['vendor'] or '(no vendor)'}: {vendor['products']} products, "
+                  f"{_format_quantities(vendor['quantities'])}, ${vendor['total_amount']:.2f}")
+            for item in vendor['items']:
+                print(f"   {item['quantity']:>8g} {item['uom']:<4} {item['item_code']:<12} {item['product_name'][:50]}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Pick lists and product demand for a delivery date')
+    arg_parser.add_argument('start', type=date.fromisoformat, help='Delivery date (YYYY-MM-DD), or start of a range')
+    arg_parser.add_argument('--end', type=date.fromisoformat, help='Last date of the range (default: start)')
+    arg_parser.add_argument('--status', action='append',
+                            help='Order status to include (repeatable; default: orders still to deliver)')
+    arg_parser.add_argument('--history', action='store_true',
+                            help='Include delivered and archived orders (demand history)')
+    arg_parser.add_argument('--report', choices=['products', 'vendors'], default='products',
+                            help='Per-product pick list or per-vendor purchase list')
+    arg_parser.add_argument('--format', choices=['text', 'csv', 'json'], default='text', help='Output format')
+    arg_parser.add_argument('--output', help='Write to this file instead of stdout')
+    args = arg_parser.parse_args()
+
+    # Database configuration
+    db_config = {
+        'host': 'localhost',
+        'database': 'orders',
+        'user': 'root',
+        'password': '',  # Adjust as needed
+        'charset': 'utf8mb4'
+    }
+
+    statuses = args.status or (DEMAND_STATUSES if args.history else PICK_STATUSES)
+
+    try:
+        with pooled_connection(db_config) as connection:
+            report = OrderAggregator(connection).pick_list(args.start, args.end, statuses)
+    except Exception as e:
+        print(f"❌ Error building pick list: {e}")
+        sys.exit(1)
+
+    if args.format == 'text' and not args.output:
+        print_pick_list(report, args.report)
+        return
+
+    output = io.StringIO()
+    if args.format == 'json':
+        json.dump(report, output, indent=2)
+        output.write('\n')
+    elif args.format == 'csv':
+        columns = PRODUCT_COLUMNS if args.report == 'products' else VENDOR_COLUMNS
+        write_csv(report_rows(report, args.report), columns, output)
+    else:
+        with contextlib.redirect_stdout(output):
+            print_pick_list(report, args.report)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8', newline='') as handle:
+            handle.write(output.getvalue())
+        print(f"✅ Wrote {args.report} report to {args.output}")
+    else:
+        sys.stdout.write(output.getvalue())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Order Entry System - Order Capture Journal
+Durable append-only journal of parsed orders, so order entry returns as soon
+as an order is on local disk and MySQL is written behind it in batches
+"""
+
+import json
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from parse_results import serialize_parsed_order
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, so run only one drainer per journal
+    fcntl = None
+
+# Every journal line has these; anything else is set aside as malformed
+REQUIRED_FIELDS = ('capture_id', 'order_method', 'captured_at', 'order')
+
+
+class OrderJournal:
+    """
+    One JSON line per captured order, plus a sidecar .offset file holding how
+    far the journal has been written to MySQL.
+
+    append() returns only after the line is flushed (and fsynced, by default),
+    so an acknowledged order survives a crash. The offset only moves after
+    the MySQL transaction commits; entries replayed after a crash are skipped
+    by their capture_id (order_captures table), so replay is idempotent.
+    Once everything is drained the file is truncated to keep it small.
+
+    Appends and drains are serialized by a lock on the journal file, across
+    threads and processes. draining() additionally lets only one drainer (the
+    in-process writer or `order_manager.py --drain-journal`) work at a time.
+    The file locks need fcntl; without it (Windows) run a single drainer.
+    """
+
+    def __init__(self, path: str, fsync: bool = True):
+        self.path = path
+        self.offset_path = path + '.offset'
+        self.rejected_path = path + '.rejected'
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._drain_lock = threading.Lock()
+
+        self._file = open(path, 'ab+')
+        self._drain_file = open(path + '.lock', 'a')
+        with self._locked():
+            self._repair_tail()
+            self.offset = self._read_offset()
+
+    def append(self, parsed_order, order_method: str = 'shorthand', idempotency_key: str = None) -> str:
+        """Durably record a parsed order; returns its capture_id (the provisional id)"""
+        capture_id = uuid.uuid4().hex
+        entry = {
+            'capture_id': capture_id,
+            'order_method': order_method,
+            'captured_at': datetime.now().isoformat(),
+            'order': serialize_parsed_order(parsed_order)
+        }
+        if idempotency_key:
+            entry['idempotency_key'] = idempotency_key
+        line = json.dumps(entry).encode('utf-8') + b'\n'
+
+        with self._locked():
+            self._file.write(line)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+        return capture_id
+
+    def read_pending(self, max_entries: int = 100) -> List[Tuple[int, Optional[Dict]]]:
+        """
+        Up to max_entries undrained entries as (offset after the entry, entry).
+        Lines that aren't a journal entry are set aside in the .rejected file
+        and come back with entry None, so the drainer still moves past them.
+        """
+        entries = []
+        malformed = []
+        with self._locked():
+            self.offset = self._read_offset()
+            with open(self.path, 'rb') as reader:
+                reader.seek(self.offset)
+                end = self.offset
+                for line in reader:
+                    if not line.endswith(b'\n'):
+                        break
+                    end += len(line)
+                    entry = self._parse_entry(line, malformed)
+                    entries.append((end, entry))
+                    if len(entries) >= max_entries:
+                        break
+        for line, reason in malformed:
+            self.reject({'line': line}, reason)
+        return entries
+
+    @staticmethod
+    def _parse_entry(line: bytes, malformed: List[Tuple[str, str]]) -> Optional[Dict]:
+        text = line.decode('utf-8', errors='replace').rstrip('\n')
+        try:
+            entry = json.loads(text)
+        except ValueError as e:
+            malformed.append((text, f"Malformed journal line: {e}"))
+            return None
+        if not isinstance(entry, dict) or any(field not in entry for field in REQUIRED_FIELDS):
+            malformed.append((text, "Journal line is missing " + ', '.join(REQUIRED_FIELDS)))
+            return None
+        return entry
+
+    def mark_drained(self, offset: int):
+        """Record that everything before offset is in MySQL"""
+        with self._locked():
+            self.offset = offset
+            if offset >= self._size():
+                # Fully drained: start the file over rather than let it grow
+                self._file.truncate(0)
+                self.offset = 0
+            self._write_offset()
+
+    @contextmanager
+    def draining(self):
+        """Hold while reading, saving and marking a batch: one drainer at a time"""
+        with self._drain_lock:
+            if fcntl is not None:
+                fcntl.flock(self._drain_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._drain_file.fileno(), fcntl.LOCK_UN)
+
+    def reject(self, entry: Dict, reason: str):
+        """Set aside an entry MySQL will never accept, so it doesn't block the journal"""
+        with self._lock:
+            with open(self.rejected_path, 'a', encoding='utf-8') as rejected:
+                rejected.write(json.dumps(dict(entry, reason=reason)) + '\n')
+
+    def pending_bytes(self) -> int:
+        with self._locked():
+            self.offset = self._read_offset()
+            return self._size() - self.offset
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+            self._drain_file.close()
+
+    @contextmanager
+    def _locked(self):
+        """This object's threads, and other processes with the journal open"""
+        with self._lock:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+    def _size(self) -> int:
+        return os.fstat(self._file.fileno()).st_size
+
+    def _repair_tail(self):
+        """Drop a half-written last line from a crash mid-append (never acknowledged)"""
+        size = self._size()
+        if not size:
+            return
+        with open(self.path, 'rb') as reader:
+            reader.seek(size - 1)
+            if reader.read(1) == b'\n':
+                return
+            reader.seek(0)
+            complete = reader.read().rfind(b'\n') + 1
+        self._file.truncate(complete)
+
+    def _read_offset(self) -> int:
+        try:
+            with open(self.offset_path, encoding='utf-8') as handle:
+                offset = int(handle.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            offset = 0
+        # Crashed between truncating the journal and rewriting the offset
+        return offset if offset <= self._size() else 0
+
+    def _write_offset(self):
+        temp_path = self.offset_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as handle:
+            handle.write(str(self.offset))
+            handle.flush()
+            if self.fsync:
+                os.fsync(handle.fileno())
+        os.replace(temp_path, self.offset_path)
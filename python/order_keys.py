@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Order Entry System - Order Idempotency Keys
+Keys that let a repeated save (double-click, retry) find the order it already
+created instead of saving a duplicate
+"""
+
+import hashlib
+import re
+import time
+from typing import List, Optional
+
+# Bucket size in seconds. Keys cover the current and the previous bucket, so
+# two saves of the same text for the same customer are treated as one order
+# if they are less than one window apart, and may still be up to two windows
+# apart (10 to 20 minutes by default)
+DEFAULT_DEDUPE_WINDOW = 600
+
+# ASCII whitespace only, on bytes, so php/save_order.php derives the same key
+# with preg_replace('/\s+/', ' ', ...) and strtolower()
+_WHITESPACE = re.compile(rb'\s+')
+
+
+def normalize_raw_input(raw_input: str) -> bytes:
+    """Collapse whitespace and lowercase (ASCII) the shorthand an order was parsed from"""
+    return _WHITESPACE.sub(b' ', (raw_input or '').encode('utf-8')).strip().lower()
+
+
+def order_idempotency_keys(customer_id: Optional[int], raw_input: str, idempotency_key: str = None,
+                           window: int = DEFAULT_DEDUPE_WINDOW, at: float = None) -> List[str]:
+    """
+    orders.idempotency_key values to look for before saving; the first is the
+    one to store on a new order.
+
+    A caller-supplied key is used as is (hashed to a fixed width). Otherwise
+    the key is derived from the customer, the normalized input and the
+    window-sized time bucket. The previous bucket is checked too, so a retry
+    less than one window after the first save is always caught, and one up
+    to two windows later is caught if the first save fell late enough in its
+    bucket. An empty list means no deduplication (no customer, or window 0).
+    """
+    if idempotency_key:
+        return [hashlib.sha256(b'key:' + idempotency_key.encode('utf-8')).hexdigest()]
+    if not customer_id or not window:
+        return []
+
+    bucket = int((time.time() if at is None else at) // window)
+    normalized = normalize_raw_input(raw_input)
+    return [
+        hashlib.sha256(b'%d:%d:' % (int(customer_id), key_bucket) + normalized).hexdigest()
+        for key_bucket in (bucket, bucket - 1)
+    ]
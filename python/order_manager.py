@@ -4,27 +4,60 @@ Order Entry System - Order Management
 Handles order lifecycle: draft → submitted → delivered → archived
 """
 
-import mysql.connector
-from mysql.connector import Error
+from mysql.connector import Error, errors
 from datetime import datetime, date
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple, Union
 import json
+import threading
+import time
+import traceback
+
+from db_pool import acquire_connection, discard_connection, release_connection
+from order_journal import OrderJournal
+from order_keys import DEFAULT_DEDUPE_WINDOW, order_idempotency_keys
+from order_numbers import OrderNumberAllocator
+from parse_results import deserialize_parsed_order
+
+# A journal entry failing with one of these will never save, so it is set
+# aside; any other database error is treated as transient and retried
+JOURNAL_REJECTED_ERRORS = (ValueError, KeyError, TypeError, errors.DataError, errors.IntegrityError)
 
 class OrderManager:
     """
     Manages the complete order lifecycle and customer history
     """
     
-    def __init__(self, db_config):
+    def __init__(self, db_config, order_number_block_size: int = 1, defer_learning: bool = False,
+                 journal_path: str = None, dedupe_window: int = DEFAULT_DEDUPE_WINDOW):
         self.db_config = db_config
         self.connection = None
+        
+        # Seconds within which the same input for the same customer is taken
+        # to be a repeated save of one order (0 turns off derived keys)
+        self.dedupe_window = dedupe_window
+        # Cleared if orders.idempotency_key hasn't been added yet
+        self.keyed_saves = True
+        
+        # With a journal, save_order only appends to it and a background
+        # writer saves to MySQL (see start_journal_writer)
+        self.journal = OrderJournal(journal_path) if journal_path else None
+        
+        # Queue delivery learning in product_learning_queue instead of applying
+        # it inside the delivery transaction (see apply_learning_queue)
+        self.defer_learning = defer_learning
+        
+        # Order numbers come from a per-day counter on the allocator's own connection
+        self.order_numbers = OrderNumberAllocator(db_config, block_size=order_number_block_size)
     
     def connect_database(self):
-        """Connect to the database"""
+        """Connect to the database (replacing any connection held now)"""
+        if self.connection is not None:
+            # Reconnecting: free the old connection's pool slot
+            discard_connection(self.connection)
+            self.connection = None
         try:
-            self.connection = mysql.connector.connect(**self.db_config)
-            if self.connection.is_connected():
-                return True
+            self.connection = acquire_connection(self.db_config)
+            return True
         except Error as e:
             print(f"Database connection error: {e}")
             return False
@@ -32,127 +65,385 @@ class OrderManager:
     def generate_order_number(self) -> str:
         """Generate unique order number: YYYYMMDD-NNNN"""
         try:
-            cursor = self.connection.cursor()
-            today = datetime.now().strftime('%Y%m%d')
-            
-            # Find the next number for today
-            cursor.execute("""
-                SELECT MAX(CAST(SUBSTRING(order_number, 10) AS UNSIGNED)) 
-                FROM orders 
-                WHERE order_number LIKE %s
-            """, (f"{today}-%",))
-            
-            result = cursor.fetchone()
-            next_num = 1 if result[0] is None else result[0] + 1
-            
-            return f"{today}-{next_num:04d}"
-            
-        except Exception as e:
-            # Fallback to timestamp-based number
-            return f"{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+            return self.order_numbers.next_number()
+        except Error as e:
+            # order_number_sequences not created yet (sql/add_order_number_sequences.sql)
+            print(f"Order number sequence unavailable ({e}), scanning orders instead")
+            return self._scan_order_number()
     
-    def save_order(self, parsed_order, order_method='shorthand') -> Optional[int]:
+    def _scan_order_number(self) -> str:
+        """Legacy MAX() scan; not safe against concurrent saves"""
+        cursor = self.connection.cursor()
+        today = datetime.now().strftime('%Y%m%d')
+        
+        # Find the next number for today
+        cursor.execute("""
+            SELECT MAX(CAST(SUBSTRING(order_number, 10) AS UNSIGNED)) 
+            FROM orders 
+            WHERE order_number LIKE %s
+        """, (f"{today}-%",))
+        
+        result = cursor.fetchone()
+        next_num = 1 if result[0] is None else result[0] + 1
+        
+        return f"{today}-{next_num:04d}"
+    
+    def save_order(self, parsed_order, order_method='shorthand',
+                   idempotency_key: str = None) -> Optional[Union[int, str]]:
         """
         Save a parsed order to the database as draft
         Returns order_id if successful
+        
+        A save repeating an earlier one (same idempotency_key, or without one
+        the same customer and input less than dedupe_window seconds later,
+        sometimes up to twice that, see order_idempotency_keys) returns the
+        existing order_id after a single indexed lookup.
+        
+        With a journal, the order is only appended to it and the capture id
+        (a provisional id, see resolve_capture) is returned right away.
         """
+        if self.journal is not None:
+            capture_id = self.journal.append(parsed_order, order_method, idempotency_key)
+            print(f"📝 Order captured ({capture_id}), saving in background")
+            return capture_id
+        
+        return self._save_keyed(parsed_order, order_method, self._order_keys(parsed_order, idempotency_key))
+    
+    def _save_keyed(self, parsed_order, order_method: str, keys: List[str]) -> Optional[int]:
+        """Save one order in its own transaction unless one is already saved under keys"""
         try:
-            cursor = self.connection.cursor()
-            
-            # Generate order number
-            order_number = self.generate_order_number()
-            
-            # Calculate totals (simplified - no tax for now)
-            subtotal = 0.0
-            
-            # Get customer ID
-            customer_id = parsed_order.customer.customer_id
-            if not customer_id:
-                raise ValueError("No valid customer found in parsed order")
+            existing = self._find_saved_orders(keys)
+            if existing:
+                order_id = min(existing.values())
+                print(f"↩️ Order already saved (ID: {order_id})")
+                return order_id
             
-            # Create order record
-            insert_order_query = """
-            INSERT INTO orders (
-                order_number, customer_id, order_date, status, order_method,
-                subtotal, total_amount, original_input, created_at
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            
-            order_values = (
-                order_number,
-                customer_id,
-                date.today(),
-                'draft',
-                order_method,
-                subtotal,
-                subtotal,  # total = subtotal for now
-                parsed_order.raw_input,
-                datetime.now()
-            )
-            
-            cursor.execute(insert_order_query, order_values)
-            order_id = cursor.lastrowid
-            
-            # Add order items
-            insert_item_query = """
-            INSERT INTO order_items (
-                order_id, product_id, item_code, product_name, quantity,
-                uom_id, unit_price, line_total, customer_reference, 
-                parsed_from, line_number
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
+            key = keys[0] if keys and self.keyed_saves else None
+            order_id, order_number = self._insert_order(parsed_order, order_method, key)
             
-            line_number = 1
-            total_amount = 0.0
+            self.connection.commit()
             
-            for item in parsed_order.items:
-                if item.product_id and item.confidence > 0:
-                    # Get current price from products table
-                    cursor.execute("SELECT price FROM products WHERE id = %s", (item.product_id,))
-                    price_result = cursor.fetchone()
-                    unit_price = float(price_result[0]) if price_result else 0.0
-                    
-                    line_total = float(item.quantity) * unit_price
-                    total_amount += line_total
-                    
-                    item_values = (
-                        order_id,
-                        item.product_id,
-                        item.product_code,
-                        item.product_name,
-                        item.quantity,
-                        item.uom_id,
-                        unit_price,
-                        line_total,
-                        item.raw_input,  # customer reference
-                        item.raw_input,  # parsed from
-                        line_number
-                    )
-                    
-                    cursor.execute(insert_item_query, item_values)
-                    line_number += 1
+            print(f"✅ Order {order_number} saved successfully (ID: {order_id})")
+            return order_id
             
-            # Update order totals
-            cursor.execute("""
-                UPDATE orders 
-                SET subtotal = %s, total_amount = %s 
-                WHERE id = %s
-            """, (total_amount, total_amount, order_id))
+        except errors.IntegrityError as e:
+            # A concurrent save with the same key committed first
+            self.connection.rollback()
+            existing = self._find_saved_orders(keys)
+            if existing:
+                order_id = min(existing.values())
+                print(f"↩️ Order already saved (ID: {order_id})")
+                return order_id
+            print(f"❌ Error saving order: {e}")
+            return None
             
-            # Add to order history
-            self.add_order_history(order_id, None, 'draft', 'System', 'Order created from shorthand input')
+        except Exception as e:
+            print(f"❌ Error saving order: {e}")
+            if self.connection:
+                self.connection.rollback()
+            return None
+    
+    def _order_keys(self, parsed_order, idempotency_key: str = None, at: float = None,
+                    derive: bool = True) -> List[str]:
+        """
+        Keys to deduplicate a save on. Keys derived from the customer, input
+        and time (derive) are only for interactive saves, where a repeat is a
+        double-click or retry; batches only use keys their caller supplies.
+        """
+        if not self.keyed_saves or not (derive or idempotency_key):
+            return []
+        return order_idempotency_keys(parsed_order.customer.customer_id, parsed_order.raw_input,
+                                      idempotency_key, window=self.dedupe_window, at=at)
+    
+    def _find_saved_orders(self, keys: List[str]) -> Dict[str, int]:
+        """Order ids already saved under any of keys, by key (one indexed lookup)"""
+        if not keys or not self.keyed_saves:
+            return {}
+        cursor = self.connection.cursor()
+        placeholders = ', '.join(['%s'] * len(keys))
+        try:
+            cursor.execute(f"SELECT idempotency_key, id FROM orders WHERE idempotency_key IN ({placeholders})", keys)
+        except errors.ProgrammingError as e:
+            if e.errno != 1054:
+                raise
+            # Unknown column: sql/add_order_idempotency_key.sql not run yet
+            print(f"Idempotency keys unavailable ({e}), saving without deduplication")
+            self.keyed_saves = False
+            return {}
+        return dict(cursor.fetchall())
+    
+    def _insert_unless_saved(self, orders: List[Tuple]) -> List[int]:
+        """
+        Insert (parsed_order, order_method, keys) orders without committing,
+        reusing the id of any order already saved under its keys
+        """
+        saved = self._find_saved_orders([key for _, _, keys in orders for key in keys])
+        order_ids = []
+        for parsed_order, order_method, keys in orders:
+            found = [saved[key] for key in keys if key in saved]
+            if found:
+                order_ids.append(min(found))
+                continue
+            key = keys[0] if keys and self.keyed_saves else None
+            order_id, _ = self._insert_order(parsed_order, order_method, key)
+            if keys:
+                # A repeat later in the same batch
+                saved[keys[0]] = order_id
+            order_ids.append(order_id)
+        return order_ids
+    
+    def save_orders(self, parsed_orders: List, order_method='shorthand',
+                    idempotency_keys: List[Optional[str]] = None) -> List[Optional[int]]:
+        """
+        Save a batch of parsed orders as drafts in a single transaction
+        Returns one order_id (or None) per order, in order
+        
+        Only orders with an idempotency key (idempotency_keys, one per order
+        or None) are deduplicated: identical orders in one batch, like a
+        standing order on several dates, are separate orders.
+        
+        If any order in the batch fails, the batch is rolled back and its
+        orders are saved one at a time, so a bad order only loses itself.
+        """
+        if not parsed_orders:
+            return []
+        
+        idempotency_keys = idempotency_keys or [None] * len(parsed_orders)
+        keyed_orders = [(parsed_order, order_method, self._order_keys(parsed_order, idempotency_key, derive=False))
+                        for parsed_order, idempotency_key in zip(parsed_orders, idempotency_keys)]
+        try:
+            order_ids = self._insert_unless_saved(keyed_orders)
             
             self.connection.commit()
             
-            print(f"✅ Order {order_number} saved successfully (ID: {order_id})")
-            return order_id
+            print(f"✅ Saved batch of {len(order_ids)} orders (IDs {order_ids[0]}-{order_ids[-1]})")
+            return order_ids
             
         except Exception as e:
-            print(f"❌ Error saving order: {e}")
+            print(f"❌ Error saving batch of {len(parsed_orders)} orders: {e} - retrying one at a time")
             if self.connection:
                 self.connection.rollback()
+            return [self._save_keyed(parsed_order, order_method, keys)
+                    for parsed_order, order_method, keys in keyed_orders]
+    
+    def drain_journal(self, batch_size: int = 100) -> int:
+        """
+        Save the next batch_size journaled orders in one transaction and move
+        the journal past them; returns how many entries were processed.
+        Raises mysql.connector errors that look transient, leaving the
+        journal where it was. Only one drainer (thread or process) works on
+        a journal at a time.
+        """
+        with self.journal.draining():
+            entries = self.journal.read_pending(batch_size)
+            if not entries:
+                return 0
+            
+            # Malformed lines come back as None, already set aside
+            captures = [entry for _, entry in entries if entry is not None]
+            if captures:
+                self._save_captures(captures)
+            self.journal.mark_drained(entries[-1][0])
+            return len(entries)
+    
+    def _save_captures(self, captures: List[Dict]):
+        """Insert journaled orders not already saved (replay after a crash skips them)"""
+        cursor = self.connection.cursor()
+        placeholders = ', '.join(['%s'] * len(captures))
+        cursor.execute(f"SELECT capture_id FROM order_captures WHERE capture_id IN ({placeholders})",
+                       [capture['capture_id'] for capture in captures])
+        saved = {row[0] for row in cursor.fetchall()}
+        pending = [capture for capture in captures if capture['capture_id'] not in saved]
+        if not pending:
+            self.connection.commit()
+            return
+        
+        try:
+            self._insert_captures(pending)
+            self.connection.commit()
+            print(f"✅ Saved {len(pending)} journaled orders")
+            return
+        except JOURNAL_REJECTED_ERRORS as e:
+            print(f"❌ Error saving {len(pending)} journaled orders: {e} - retrying one at a time")
+            self.connection.rollback()
+        except Error:
+            self.connection.rollback()
+            raise
+        
+        for capture in pending:
+            self._save_capture(capture)
+    
+    def _save_capture(self, capture: Dict):
+        """Insert one journaled order, setting it aside if MySQL will never take it"""
+        for attempt in (1, 2):
+            try:
+                self._insert_captures([capture])
+                self.connection.commit()
+                return
+            except errors.IntegrityError as e:
+                self.connection.rollback()
+                if attempt == 1:
+                    # A live save with the same idempotency key committed
+                    # first; the retry's lookup finds that order, as in save_order
+                    continue
+                print(f"❌ Rejected journaled order {capture['capture_id']}: {e}")
+                self.journal.reject(capture, str(e))
+            except JOURNAL_REJECTED_ERRORS as e:
+                self.connection.rollback()
+                print(f"❌ Rejected journaled order {capture['capture_id']}: {e}")
+                self.journal.reject(capture, str(e))
+                return
+            except Error:
+                self.connection.rollback()
+                raise
+    
+    def _insert_captures(self, captures: List[Dict]):
+        orders = []
+        for capture in captures:
+            parsed_order = deserialize_parsed_order(capture['order'])
+            # Keyed by capture time, so a double-click journaled twice is still one order
+            captured_at = datetime.fromisoformat(capture['captured_at']).timestamp()
+            orders.append((parsed_order, capture['order_method'],
+                           self._order_keys(parsed_order, capture.get('idempotency_key'), at=captured_at)))
+        
+        order_ids = self._insert_unless_saved(orders)
+        rows = [(capture['capture_id'], order_id, capture['captured_at'])
+                for capture, order_id in zip(captures, order_ids)]
+        
+        self.connection.cursor().executemany("""
+            INSERT INTO order_captures (capture_id, order_id, captured_at)
+            VALUES (%s, %s, %s)
+        """, rows)
+    
+    def resolve_capture(self, capture_id: str) -> Optional[int]:
+        """The order_id a provisional capture id was saved as (None until the writer gets to it)"""
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute("SELECT order_id FROM order_captures WHERE capture_id = %s", (capture_id,))
+            row = cursor.fetchone()
+            return row[0] if row else None
+        except Exception as e:
+            print(f"Error resolving capture {capture_id}: {e}")
             return None
     
+    def start_journal_writer(self, interval: float = 0.5, batch_size: int = 100) -> threading.Event:
+        """
+        Save journaled orders in a background thread on its own connection,
+        backing off while MySQL is unavailable; set the returned event to stop it
+        """
+        stop = threading.Event()
+        journal = self.journal
+        
+        def drain():
+            writer = OrderManager(self.db_config)
+            writer.journal = journal
+            try:
+                while not stop.is_set():
+                    if writer.connection is None and not writer.connect_database():
+                        stop.wait(interval)
+                        continue
+                    try:
+                        # Keep going while full batches come back, then wait
+                        if writer.drain_journal(batch_size) < batch_size:
+                            stop.wait(interval)
+                    except Error as e:
+                        print(f"⚠️ Journal writer: {e} - retrying in {interval}s")
+                        writer.close_connection()
+                        stop.wait(interval)
+                    except Exception:
+                        # Not a database error: log it in full and keep the writer alive
+                        print(f"❌ Journal writer error - retrying in {interval}s\n{traceback.format_exc()}")
+                        writer.close_connection()
+                        stop.wait(interval)
+            finally:
+                writer.close_connection()
+        
+        threading.Thread(target=drain, name='order-journal', daemon=True).start()
+        return stop
+    
+    def _insert_order(self, parsed_order, order_method: str, idempotency_key: str = None) -> Tuple[int, str]:
+        """Insert a draft order, its items and history without committing"""
+        cursor = self.connection.cursor()
+        
+        # Get customer ID
+        customer_id = parsed_order.customer.customer_id
+        if not customer_id:
+            raise ValueError("No valid customer found in parsed order")
+        
+        # Generate order number
+        order_number = self.generate_order_number()
+        
+        items = [item for item in parsed_order.items if item.product_id and item.confidence > 0]
+        
+        # Current prices for every product on the order in one query
+        prices = {}
+        product_ids = list(dict.fromkeys(item.product_id for item in items))
+        if product_ids:
+            placeholders = ', '.join(['%s'] * len(product_ids))
+            cursor.execute(f"SELECT id, price FROM products WHERE id IN ({placeholders})", product_ids)
+            prices = {product_id: float(price) for product_id, price in cursor.fetchall()}
+        
+        # Calculate totals (simplified - no tax for now)
+        item_rows = []
+        total_amount = 0.0
+        for line_number, item in enumerate(items, 1):
+            unit_price = prices.get(item.product_id, 0.0)
+            line_total = float(item.quantity) * unit_price
+            total_amount += line_total
+            item_rows.append([
+                item.product_id,
+                item.product_code,
+                item.product_name,
+                item.quantity,
+                item.uom_id,
+                unit_price,
+                line_total,
+                item.raw_input,  # customer reference
+                item.raw_input,  # parsed from
+                line_number
+            ])
+        
+        # Create order record with its final totals
+        # idempotency_key is unique, so a concurrent repeat of this save fails
+        # here instead of creating a second order
+        keyed = idempotency_key is not None
+        insert_order_query = f"""
+        INSERT INTO orders (
+            order_number, customer_id, order_date, status, order_method,
+            subtotal, total_amount, original_input, created_at{', idempotency_key' if keyed else ''}
+        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s{', %s' if keyed else ''})
+        """
+        
+        order_values = (
+            order_number,
+            customer_id,
+            date.today(),
+            'draft',
+            order_method,
+            total_amount,
+            total_amount,  # total = subtotal for now
+            parsed_order.raw_input,
+            datetime.now()
+        ) + ((idempotency_key,) if keyed else ())
+        
+        cursor.execute(insert_order_query, order_values)
+        order_id = cursor.lastrowid
+        
+        # Add order items (mysql.connector sends executemany INSERTs as one multi-row statement)
+        if item_rows:
+            cursor.executemany("""
+            INSERT INTO order_items (
+                order_id, product_id, item_code, product_name, quantity,
+                uom_id, unit_price, line_total, customer_reference, 
+                parsed_from, line_number
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """, [[order_id] + row for row in item_rows])
+        
+        # Add to order history
+        self.add_order_history(order_id, None, 'draft', 'System', 'Order created from shorthand input')
+        
+        return order_id, order_number
+    
     def submit_order(self, order_id: int, notes: str = '') -> bool:
         """Submit order for processing"""
         return self._change_order_status(order_id, 'submitted', 'Order submitted for processing', notes)
@@ -168,9 +459,9 @@ class OrderManager:
             # Update order
             cursor.execute("""
                 UPDATE orders 
-                SET status = 'out_for_delivery', delivery_date = %s, updated_at = %s
+                SET status = 'out_for_delivery', delivery_date = %s, updated_at = NOW()
                 WHERE id = %s AND status IN ('submitted', 'processing')
-            """, (delivery_date, datetime.now(), order_id))
+            """, (delivery_date, order_id))
             
             if cursor.rowcount == 0:
                 return False
@@ -213,24 +504,26 @@ class OrderManager:
             cursor.execute("""
                 UPDATE orders 
                 SET status = 'delivered', delivered_date = %s, delivered_at = %s, 
-                    delivery_notes = %s, updated_at = %s
+                    delivery_notes = %s, updated_at = NOW()
                 WHERE id = %s AND status = 'out_for_delivery'
-            """, (delivered_date, delivered_at, notes, datetime.now(), order_id))
+            """, (delivered_date, delivered_at, notes, order_id))
             
             if cursor.rowcount == 0:
+                self.connection.rollback()
                 return False
             
             # Add to history
             self.add_order_history(order_id, 'out_for_delivery', 'delivered', 'System', f'Delivered on {delivered_date}. {notes}')
             
             # Update customer product frequency (learning system)
-            self._update_customer_product_frequency(order_id)
+            self._learn_from_deliveries([order_id])
             
             self.connection.commit()
             return True
             
         except Exception as e:
             print(f"Error completing delivery: {e}")
+            self.connection.rollback()
             return False
     
     def archive_order(self, order_id: int, notes: str = '') -> bool:
@@ -243,9 +536,9 @@ class OrderManager:
             # Update order status
             cursor.execute("""
                 UPDATE orders 
-                SET status = 'archived', archived_at = %s, updated_at = %s
+                SET status = 'archived', archived_at = %s, updated_at = NOW()
                 WHERE id = %s AND status = 'delivered'
-            """, (archived_at, datetime.now(), order_id))
+            """, (archived_at, order_id))
             
             if cursor.rowcount == 0:
                 return False
@@ -260,54 +553,148 @@ class OrderManager:
             print(f"Error archiving order: {e}")
             return False
     
-    def get_customer_order_history(self, customer_id: int, status: str = None, limit: int = 50) -> List[Dict]:
-        """Get order history for a specific customer"""
+    # Bulk transitions: action → (new status, statuses it can move from, statuses
+    # a delivery_date filter selects by default)
+    BULK_TRANSITIONS = {
+        'submit': ('submitted', ('draft',), ('draft',)),
+        'start_delivery': ('out_for_delivery', ('submitted', 'processing'), ('submitted', 'processing')),
+        'complete_delivery': ('delivered', ('out_for_delivery',), ('out_for_delivery',)),
+        'archive': ('archived', ('delivered',), ('delivered',))
+    }
+    
+    def bulk_transition(self, action: str, order_ids: List[int] = None, delivery_date: date = None,
+                        status: str = None, notes: str = '') -> List[Dict]:
+        """
+        Move many orders through the same transition in one transaction
+        
+        Orders are either listed by id or selected with delivery_date and/or
+        status. The history rows, status change and timestamps are each one
+        set-based statement. Returns one result per order:
+        {'order_id', 'success', 'old_status', 'message'}.
+        """
+        if action not in self.BULK_TRANSITIONS:
+            raise ValueError(f"Unknown action: {action}")
+        new_status, from_statuses, default_filter = self.BULK_TRANSITIONS[action]
+        
+        now = datetime.now()
+        # delivery_date only filters the selection as given; the date written
+        # by start_delivery defaults to today
+        out_for_delivery_on = delivery_date or date.today()
+        if action == 'start_delivery':
+            history_notes = f'Out for delivery on {out_for_delivery_on}. {notes}'
+        elif action == 'complete_delivery':
+            history_notes = f'Delivered on {now.date()}. {notes}'
+        elif action == 'archive':
+            history_notes = f'Order archived. {notes}'
+        else:
+            history_notes = f"Order submitted for processing. {notes}".strip('. ')
+        
+        cursor = self.connection.cursor()
         try:
-            cursor = self.connection.cursor(dictionary=True)
-            
-            base_query = """
-            SELECT 
-                o.id, o.order_number, o.order_date, o.delivery_date, o.delivered_date,
-                o.status, o.order_method, o.subtotal, o.total_amount, o.notes,
-                o.delivery_notes, o.created_at, o.delivered_at, o.archived_at,
-                COUNT(oi.id) as item_count,
-                SUM(oi.quantity) as total_quantity,
-                SUM(oi.delivered_quantity) as total_delivered
-            FROM orders o
-            LEFT JOIN order_items oi ON o.id = oi.order_id
-            WHERE o.customer_id = %s
-            """
-            
-            params = [customer_id]
+            # Lock the orders and read their current status
+            if order_ids:
+                order_ids = list(dict.fromkeys(order_ids))
+                placeholders = ', '.join(['%s'] * len(order_ids))
+                cursor.execute(f"SELECT id, status FROM orders WHERE id IN ({placeholders}) FOR UPDATE", order_ids)
+            else:
+                conditions, params = [], []
+                if delivery_date:
+                    conditions.append("delivery_date = %s")
+                    params.append(delivery_date)
+                statuses = (status,) if status else default_filter
+                conditions.append(f"status IN ({', '.join(['%s'] * len(statuses))})")
+                params.extend(statuses)
+                cursor.execute(f"SELECT id, status FROM orders WHERE {' AND '.join(conditions)} "
+                               "ORDER BY id FOR UPDATE", params)
+            current = dict(cursor.fetchall())
+            if not order_ids:
+                order_ids = list(current)
+            
+            results = {}
+            eligible = []
+            for order_id in order_ids:
+                old_status = current.get(order_id)
+                if old_status is None:
+                    results[order_id] = {'order_id': order_id, 'success': False, 'old_status': None,
+                                         'message': 'Order not found'}
+                elif old_status not in from_statuses:
+                    results[order_id] = {'order_id': order_id, 'success': False, 'old_status': old_status,
+                                         'message': f"Order is {old_status}, expected {' or '.join(from_statuses)}"}
+                else:
+                    eligible.append(order_id)
+                    results[order_id] = {'order_id': order_id, 'success': True, 'old_status': old_status,
+                                         'message': f"{old_status} → {new_status}"}
+            
+            if eligible:
+                placeholders = ', '.join(['%s'] * len(eligible))
+                
+                # History first, while the rows still hold their old status
+                cursor.execute(f"""
+                    INSERT INTO order_history (order_id, old_status, new_status, changed_by, change_notes)
+                    SELECT id, status, %s, 'System', %s
+                    FROM orders
+                    WHERE id IN ({placeholders})
+                """, [new_status, history_notes] + eligible)
+                
+                update_query = "UPDATE orders SET status = %s"
+                params = [new_status]
+                if action == 'submit':
+                    update_query += ", submitted_at = %s"
+                    params.append(now)
+                elif action == 'start_delivery':
+                    update_query += ", delivery_date = %s"
+                    params.append(out_for_delivery_on)
+                elif action == 'complete_delivery':
+                    update_query += ", delivered_date = %s, delivered_at = %s, delivery_notes = %s"
+                    params.extend([now.date(), now, notes])
+                    
+                    # Default: delivered quantity = ordered quantity
+                    cursor.execute(f"""
+                        UPDATE order_items 
+                        SET delivered_quantity = quantity 
+                        WHERE order_id IN ({placeholders})
+                    """, eligible)
+                elif action == 'archive':
+                    update_query += ", archived_at = %s"
+                    params.append(now)
+                
+                update_query += f", updated_at = NOW() WHERE id IN ({placeholders})"
+                cursor.execute(update_query, params + eligible)
+                
+                if action == 'complete_delivery':
+                    # Update customer product frequency (learning system)
+                    self._learn_from_deliveries(eligible)
             
-            if status:
-                base_query += " AND o.status = %s"
-                params.append(status)
+            self.connection.commit()
+            return [results[order_id] for order_id in order_ids]
             
-            base_query += """
-            GROUP BY o.id
-            ORDER BY o.order_date DESC, o.created_at DESC
-            LIMIT %s
-            """
-            params.append(limit)
+        except Exception as e:
+            print(f"❌ Error in bulk {action}: {e}")
+            self.connection.rollback()
+            return [{'order_id': order_id, 'success': False, 'old_status': None, 'message': str(e)}
+                    for order_id in (order_ids or [])]
+    
+    def get_customer_order_history(self, customer_id: int, status: str = None, limit: int = 50,
+                                   before: Optional[Tuple] = None, include_items: bool = True) -> List[Dict]:
+        """
+        Get order history for a specific customer, newest first
+        
+        Always two queries: one page of order headers, then the items (or,
+        with include_items=False, just the per-order totals) for the whole
+        page. Pass before=history_cursor(last order of the previous page)
+        to fetch the next page.
+        """
+        try:
+            cursor = self.connection.cursor(dictionary=True)
             
-            cursor.execute(base_query, params)
+            query, params = self._history_query(customer_id, status, limit, before)
+            cursor.execute(query, params)
             orders = cursor.fetchall()
             
-            # Get items for each order
-            for order in orders:
-                cursor.execute("""
-                    SELECT 
-                        oi.id, oi.product_name, oi.quantity, oi.delivered_quantity,
-                        oi.unit_price, oi.line_total, oi.customer_reference,
-                        u.code as uom_code
-                    FROM order_items oi
-                    LEFT JOIN uom u ON oi.uom_id = u.id
-                    WHERE oi.order_id = %s
-                    ORDER BY oi.line_number
-                """, (order['id'],))
-                
-                order['items'] = cursor.fetchall()
+            if orders:
+                query, params = self._history_items_query([order['id'] for order in orders], include_items)
+                cursor.execute(query, params)
+                self._attach_history_items(orders, cursor.fetchall(), include_items)
             
             return orders
             
@@ -315,6 +702,97 @@ class OrderManager:
             print(f"Error getting customer order history: {e}")
             return []
     
+    @staticmethod
+    def history_cursor(order: Dict) -> Tuple:
+        """Keyset cursor for the page after the one ending with this order"""
+        return (order['order_date'], order['created_at'], order['id'])
+    
+    @staticmethod
+    def _history_query(customer_id: int, status: Optional[str], limit: int,
+                       before: Optional[Tuple]) -> Tuple[str, List]:
+        query = """
+        SELECT 
+            o.id, o.order_number, o.order_date, o.delivery_date, o.delivered_date,
+            o.status, o.order_method, o.subtotal, o.total_amount, o.notes,
+            o.delivery_notes, o.created_at, o.delivered_at, o.archived_at
+        FROM orders o
+        WHERE o.customer_id = %s
+        """
+        params = [customer_id]
+        
+        if status:
+            query += " AND o.status = %s"
+            params.append(status)
+        
+        if before:
+            # Spelled out instead of a row comparison so idx_customer_history
+            # (customer_id, order_date, created_at) serves it as a range seek
+            order_date, created_at, order_id = before
+            query += """
+            AND (o.order_date < %s
+                 OR (o.order_date = %s AND (o.created_at < %s
+                                            OR (o.created_at = %s AND o.id < %s))))
+            """
+            params.extend([order_date, order_date, created_at, created_at, order_id])
+        
+        query += """
+        ORDER BY o.order_date DESC, o.created_at DESC, o.id DESC
+        LIMIT %s
+        """
+        params.append(limit)
+        return query, params
+    
+    @staticmethod
+    def _history_items_query(order_ids: List[int], include_items: bool) -> Tuple[str, List]:
+        placeholders = ', '.join(['%s'] * len(order_ids))
+        if include_items:
+            query = f"""
+                SELECT 
+                    oi.order_id, oi.id, oi.product_name, oi.quantity, oi.delivered_quantity,
+                    oi.unit_price, oi.line_total, oi.customer_reference,
+                    u.code as uom_code
+                FROM order_items oi
+                LEFT JOIN uom u ON oi.uom_id = u.id
+                WHERE oi.order_id IN ({placeholders})
+                ORDER BY oi.order_id, oi.line_number
+            """
+        else:
+            query = f"""
+                SELECT 
+                    oi.order_id,
+                    COUNT(oi.id) as item_count,
+                    SUM(oi.quantity) as total_quantity,
+                    SUM(oi.delivered_quantity) as total_delivered
+                FROM order_items oi
+                WHERE oi.order_id IN ({placeholders})
+                GROUP BY oi.order_id
+            """
+        return query, list(order_ids)
+    
+    @staticmethod
+    def _attach_history_items(orders: List[Dict], rows: List[Dict], include_items: bool):
+        """Add item_count/total_quantity/total_delivered (and items) to each order"""
+        if not include_items:
+            totals = {row.pop('order_id'): row for row in rows}
+            for order in orders:
+                order.update(totals.get(order['id']) or
+                             {'item_count': 0, 'total_quantity': None, 'total_delivered': None})
+            return
+        
+        items_by_order = {order['id']: [] for order in orders}
+        for row in rows:
+            items_by_order[row.pop('order_id')].append(row)
+        
+        for order in orders:
+            items = items_by_order[order['id']]
+            quantities = [item['quantity'] for item in items if item['quantity'] is not None]
+            delivered = [item['delivered_quantity'] for item in items if item['delivered_quantity'] is not None]
+            # Same values the SQL COUNT/SUM aggregates gave (SUM of no rows is NULL)
+            order['item_count'] = len(items)
+            order['total_quantity'] = sum(quantities) if quantities else None
+            order['total_delivered'] = sum(delivered) if delivered else None
+            order['items'] = items
+    
     def get_order_details(self, order_id: int) -> Optional[Dict]:
         """Get complete order details"""
         try:
@@ -384,8 +862,8 @@ class OrderManager:
                 update_query += ", submitted_at = %s"
                 params.append(datetime.now())
             
-            update_query += ", updated_at = %s WHERE id = %s"
-            params.extend([datetime.now(), order_id])
+            update_query += ", updated_at = NOW() WHERE id = %s"
+            params.append(order_id)
             
             cursor.execute(update_query, params)
             
@@ -414,45 +892,152 @@ class OrderManager:
         except Exception as e:
             print(f"Error adding order history: {e}")
     
-    def _update_customer_product_frequency(self, order_id: int):
-        """Update customer product frequency scores for learning"""
+    # Learning from delivered items as two set-based statements for any number
+    # of orders. COUNT(*) keeps the per-line behaviour: a product delivered on
+    # two lines of an order counts twice.
+    LEARNING_FREQUENCY_QUERY = """
+        INSERT INTO customer_items (customer_id, product_id, frequency_score, last_ordered)
+        SELECT o.customer_id, oi.product_id, COUNT(*), %s
+        FROM orders o
+        JOIN order_items oi ON o.id = oi.order_id
+        WHERE o.id IN ({placeholders}) AND oi.delivered_quantity > 0
+        GROUP BY o.customer_id, oi.product_id
+        ON DUPLICATE KEY UPDATE 
+            frequency_score = frequency_score + VALUES(frequency_score),
+            last_ordered = VALUES(last_ordered)
+    """
+    
+    LEARNING_USAGE_QUERY = """
+        UPDATE product_abbreviations pa
+        JOIN (
+            SELECT o.customer_id, oi.product_id, COUNT(*) AS deliveries
+            FROM orders o
+            JOIN order_items oi ON o.id = oi.order_id
+            WHERE o.id IN ({placeholders}) AND oi.delivered_quantity > 0
+            GROUP BY o.customer_id, oi.product_id
+        ) delivered ON pa.customer_id = delivered.customer_id AND pa.product_id = delivered.product_id
+        SET pa.usage_count = pa.usage_count + delivered.deliveries, pa.last_used = %s
+    """
+    
+    def _learn_from_deliveries(self, order_ids: List[int]):
+        """
+        Learn from delivered orders now, or queue them when learning is
+        deferred, inside the delivery transaction. Learning is a side effect:
+        if it fails, only its own writes are rolled back (to a savepoint) and
+        the delivery is still recorded.
+        """
+        cursor = self.connection.cursor()
+        cursor.execute("SAVEPOINT delivery_learning")
+        try:
+            if self.defer_learning:
+                cursor.executemany("INSERT INTO product_learning_queue (order_id) VALUES (%s)",
+                                   [(order_id,) for order_id in order_ids])
+            else:
+                self._update_customer_product_frequency(order_ids)
+        except Error as e:
+            print(f"Error learning from deliveries {order_ids}: {e}")
+            cursor.execute("ROLLBACK TO SAVEPOINT delivery_learning")
+        cursor.execute("RELEASE SAVEPOINT delivery_learning")
+    
+    def _update_customer_product_frequency(self, order_ids: List[int]):
+        """Update customer product frequency scores for learning (errors propagate)"""
+        if not order_ids:
+            return
+        cursor = self.connection.cursor()
+        placeholders = ', '.join(['%s'] * len(order_ids))
+        
+        # Update or create customer_items records
+        cursor.execute(self.LEARNING_FREQUENCY_QUERY.format(placeholders=placeholders),
+                       [date.today()] + list(order_ids))
+        
+        # Update abbreviation usage
+        cursor.execute(self.LEARNING_USAGE_QUERY.format(placeholders=placeholders),
+                       list(order_ids) + [datetime.now()])
+    
+    def apply_learning_queue(self, batch_size: int = 500) -> int:
+        """
+        Apply queued delivery learning for up to batch_size queue entries in
+        one transaction; returns how many entries were applied
+        """
         try:
             cursor = self.connection.cursor()
-            
-            # Get order details
             cursor.execute("""
-                SELECT o.customer_id, oi.product_id, oi.delivered_quantity
-                FROM orders o
-                JOIN order_items oi ON o.id = oi.order_id
-                WHERE o.id = %s AND oi.delivered_quantity > 0
-            """, (order_id,))
-            
-            items = cursor.fetchall()
+                SELECT id, order_id FROM product_learning_queue
+                ORDER BY id
+                LIMIT %s
+                FOR UPDATE
+            """, (batch_size,))
+            queued = cursor.fetchall()
+            if not queued:
+                self.connection.commit()
+                return 0
+            
+            # An order queued twice (delivered, reopened, delivered) learns twice,
+            # the same as it would have inline
+            order_ids = [order_id for _, order_id in queued]
+            while order_ids:
+                batch = list(dict.fromkeys(order_ids))
+                self._update_customer_product_frequency(batch)
+                for order_id in batch:
+                    order_ids.remove(order_id)
+            
+            placeholders = ', '.join(['%s'] * len(queued))
+            cursor.execute(f"DELETE FROM product_learning_queue WHERE id IN ({placeholders})",
+                           [queue_id for queue_id, _ in queued])
             
-            for customer_id, product_id, delivered_qty in items:
-                # Update or create customer_items record
-                cursor.execute("""
-                    INSERT INTO customer_items (customer_id, product_id, frequency_score, last_ordered)
-                    VALUES (%s, %s, 1, %s)
-                    ON DUPLICATE KEY UPDATE 
-                        frequency_score = frequency_score + 1,
-                        last_ordered = %s
-                """, (customer_id, product_id, date.today(), date.today()))
-                
-                # Update abbreviation usage
-                cursor.execute("""
-                    UPDATE product_abbreviations 
-                    SET usage_count = usage_count + 1, last_used = %s
-                    WHERE customer_id = %s AND product_id = %s
-                """, (datetime.now(), customer_id, product_id))
+            self.connection.commit()
+            return len(queued)
             
         except Exception as e:
-            print(f"Error updating customer product frequency: {e}")
+            print(f"Error applying product learning queue: {e}")
+            try:
+                self.connection.rollback()
+            except Error as rollback_error:
+                # The connection itself is gone; start_learning_worker reconnects
+                print(f"Error rolling back product learning: {rollback_error}")
+            return 0
+    
+    def start_learning_worker(self, interval: float = 5.0, batch_size: int = 500) -> threading.Event:
+        """
+        Drain the learning queue in a background thread on its own connection,
+        reconnecting (and backing off) while MySQL is unavailable; set the
+        returned event to stop it
+        """
+        stop = threading.Event()
+        
+        def drain():
+            worker = OrderManager(self.db_config)
+            connected = False
+            try:
+                while not stop.is_set():
+                    # is_connected() pings; connect_database discards a dropped connection
+                    if not connected or not worker.connection.is_connected():
+                        connected = worker.connect_database()
+                        if not connected:
+                            print(f"⚠️ Learning worker: database unavailable - retrying in {interval}s")
+                            stop.wait(interval)
+                            continue
+                    try:
+                        # Keep going while full batches come back, then wait
+                        if worker.apply_learning_queue(batch_size) < batch_size:
+                            stop.wait(interval)
+                    except Exception:
+                        # Log it in full and keep the worker alive on a fresh connection
+                        print(f"❌ Learning worker error - retrying in {interval}s\n{traceback.format_exc()}")
+                        connected = False
+                        stop.wait(interval)
+            finally:
+                worker.close_connection()
+        
+        threading.Thread(target=drain, name='product-learning', daemon=True).start()
+        return stop
     
     def close_connection(self):
         """Close database connection"""
-        if self.connection and self.connection.is_connected():
-            self.connection.close()
+        self.order_numbers.close()
+        if self.connection is not None:
+            release_connection(self.connection)
+            self.connection = None
 
 
 # Test functions
@@ -552,7 +1137,22 @@ if __name__ == "__main__":
     parser.add_argument('--order-id', type=int, help='Order ID to process')
     parser.add_argument('--action', choices=['submit', 'start_delivery', 'complete_delivery', 'archive'], 
                         help='Action to perform on the order')
+    parser.add_argument('--order-ids', help='Comma-separated order IDs to move through --action together')
+    parser.add_argument('--delivery-date', type=date.fromisoformat,
+                        help='Bulk: select orders by delivery date (YYYY-MM-DD); start_delivery also sets it')
+    parser.add_argument('--status', help='Bulk: select orders in this status (default: the usual source status)')
+    parser.add_argument('--notes', default='', help='Notes for the order history')
+    parser.add_argument('--json', action='store_true', help='Bulk: print per-order results as JSON')
     parser.add_argument('--customer-id', type=int, help='Customer ID for history lookup')
+    parser.add_argument('--limit', type=int, default=50, help='Orders per history page')
+    parser.add_argument('--no-items', action='store_true', help='History totals only, without line items')
+    parser.add_argument('--defer-learning', action='store_true',
+                        help='complete_delivery: queue product learning for --apply-learning')
+    parser.add_argument('--apply-learning', action='store_true', help='Apply queued product learning')
+    parser.add_argument('--watch', type=float, metavar='SECONDS',
+                        help='With --apply-learning: keep draining the queue, polling every SECONDS')
+    parser.add_argument('--journal', help='Order capture journal file (see --drain-journal)')
+    parser.add_argument('--drain-journal', action='store_true', help='Save everything waiting in --journal')
     parser.add_argument('--test', action='store_true', help='Run test suite')
     
     args = parser.parse_args()
@@ -565,13 +1165,68 @@ if __name__ == "__main__":
         'database': 'orders'
     }
     
-    manager = OrderManager(db_config)
+    manager = OrderManager(db_config, defer_learning=args.defer_learning, journal_path=args.journal)
     
     try:
         if args.test:
             # Run the full test suite
             test_order_lifecycle()
         
+        elif args.drain_journal:
+            # Replay journaled orders into MySQL (already saved ones are skipped)
+            if not manager.journal:
+                print("❌ --drain-journal needs --journal")
+                exit(1)
+            if not manager.connect_database():
+                exit(1)
+            
+            drained = 0
+            while True:
+                count = manager.drain_journal()
+                if not count:
+                    break
+                drained += count
+            print(f"✅ Drained {drained} journaled orders")
+        
+        elif args.apply_learning:
+            # Catch up on product learning queued by deferred deliveries
+            if not manager.connect_database():
+                exit(1)
+            
+            applied = 0
+            while True:
+                count = manager.apply_learning_queue()
+                applied += count
+                if count:
+                    continue
+                if not args.watch:
+                    break
+                time.sleep(args.watch)
+            print(f"✅ Applied product learning for {applied} queued deliveries")
+        
+        elif args.action and (args.order_ids or args.delivery_date or args.status):
+            # Move a whole route (or list) through the same transition
+            order_ids = [int(order_id) for order_id in args.order_ids.split(',')] if args.order_ids else None
+            
+            if not manager.connect_database():
+                exit(1)
+            
+            results = manager.bulk_transition(args.action, order_ids=order_ids, delivery_date=args.delivery_date,
+                                              status=args.status, notes=args.notes)
+            succeeded = sum(1 for result in results if result['success'])
+            
+            if args.json:
+                print(json.dumps({'action': args.action, 'succeeded': succeeded,
+                                  'failed': len(results) - succeeded, 'results': results}))
+            else:
+                for result in results:
+                    mark = '✅' if result['success'] else '❌'
+                    print(f"{mark} Order {result['order_id']}: {result['message']}")
+                print(f"\n📊 {args.action}: {succeeded}/{len(results)} orders updated")
+            
+            if succeeded < len(results):
+                exit(1)
+        
         elif args.order_id and args.action:
             # Execute specific action on order
             order_id = args.order_id
@@ -604,7 +1259,8 @@ if __name__ == "__main__":
             # Get customer history
             try:
                 manager.connect_database()
-                history = manager.get_customer_order_history(args.customer_id)
+                history = manager.get_customer_order_history(args.customer_id, limit=args.limit,
+                                                             include_items=not args.no_items)
                 print(f"Customer {args.customer_id} Order History:")
                 for order in history:
                     print(f"Order {order['order_number']}: {order['status']} - ${order['total_amount']:.2f}, Items: {order.get('item_count', 'N/A')}, Date: {order['order_date']}")
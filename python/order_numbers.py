@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Order Entry System - Order Number Allocation
+Per-day YYYYMMDD-NNNN order numbers from an atomic counter row instead of a
+MAX() scan over the orders table
+"""
+
+import asyncio
+import threading
+from datetime import date
+from typing import Optional
+
+from mysql.connector import errors
+
+from db_pool import acquire_connection, release_connection
+
+# Adds count to the day's counter (creating the row on the first order of the
+# day) and leaves the new last value in LAST_INSERT_ID() for this connection.
+# The counter row is locked only for this one autocommit statement.
+RESERVE_QUERY = """
+    INSERT INTO order_number_sequences (sequence_date, last_value)
+    VALUES (%s, LAST_INSERT_ID(%s))
+    ON DUPLICATE KEY UPDATE last_value = LAST_INSERT_ID(last_value + %s)
+"""
+
+
+def format_order_number(day: date, number: int) -> str:
+    """YYYYMMDD-NNNN (more digits past 9999 orders in a day)"""
+    return f"{day.strftime('%Y%m%d')}-{number:04d}"
+
+
+class _Block:
+    """The range of numbers a process has reserved but not handed out yet"""
+
+    def __init__(self):
+        self.day = None
+        self.next = 1
+        self.last = 0
+
+    def take(self, day: date) -> Optional[int]:
+        if self.day != day or self.next > self.last:
+            return None
+        number = self.next
+        self.next += 1
+        return number
+
+    def refill(self, day: date, last: int, count: int):
+        self.day = day
+        self.next = last - count + 1
+        self.last = last
+
+
+class OrderNumberAllocator:
+    """
+    Hands out order numbers from order_number_sequences.
+
+    Each reservation is one upsert on a dedicated autocommit connection,
+    so it costs the same however many orders exist, and concurrent writers
+    (other processes, PHP) never see the same number. block_size > 1
+    reserves that many numbers per round trip. Numbers are then unique but
+    not strictly in save order across processes, and unused numbers in a
+    block are skipped when the process exits. Orders that roll back also
+    leave gaps.
+    """
+
+    def __init__(self, db_config, block_size: int = 1):
+        self.db_config = db_config
+        self.block_size = max(1, block_size)
+        self.connection = None
+        self._block = _Block()
+        self._lock = threading.Lock()
+
+    def next_number(self) -> str:
+        """Next order number for today"""
+        today = date.today()
+        with self._lock:
+            number = self._block.take(today)
+            if number is None:
+                last = self._reserve(today, self.block_size)
+                self._block.refill(today, last, self.block_size)
+                number = self._block.take(today)
+        return format_order_number(today, number)
+
+    def _reserve(self, day: date, count: int) -> int:
+        """Reserve count numbers for day; returns the last one reserved"""
+        try:
+            return self._run_reserve(day, count)
+        except (errors.OperationalError, errors.InterfaceError):
+            # The held connection was dropped (wait_timeout, server restart).
+            # Retry once on a fresh one; at worst that skips a block of numbers
+            self.close()
+            return self._run_reserve(day, count)
+
+    def _run_reserve(self, day: date, count: int) -> int:
+        if self.connection is None:
+            self.connection = acquire_connection(self.db_config)
+            # Never hold the counter row lock inside someone's order transaction
+            self.connection.autocommit = True
+
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(RESERVE_QUERY, (day, count, count))
+            cursor.execute("SELECT LAST_INSERT_ID()")
+            return int(cursor.fetchone()[0])
+        finally:
+            cursor.close()
+
+    def close(self):
+        """Hand the allocator's connection back to the pool"""
+        if self.connection is None:
+            return
+        try:
+            self.connection.autocommit = False
+        except errors.Error:
+            pass
+        release_connection(self.connection)
+        self.connection = None
+
+
+class AsyncOrderNumberAllocator:
+    """OrderNumberAllocator for AsyncOrderManager, on an autocommit aiomysql pool"""
+
+    def __init__(self, pool, block_size: int = 1):
+        self.pool = pool
+        self.block_size = max(1, block_size)
+        self._block = _Block()
+        self._lock = asyncio.Lock()
+
+    async def next_number(self) -> str:
+        """Next order number for today"""
+        today = date.today()
+        async with self._lock:
+            number = self._block.take(today)
+            if number is None:
+                last = await self._reserve(today, self.block_size)
+                self._block.refill(today, last, self.block_size)
+                number = self._block.take(today)
+        return format_order_number(today, number)
+
+    async def _reserve(self, day: date, count: int) -> int:
+        # Pool connections run in autocommit mode (see async_db.aiomysql_config),
+        # and LAST_INSERT_ID() is per connection, so both statements share one
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(RESERVE_QUERY, (day, count, count))
+                await cursor.execute("SELECT LAST_INSERT_ID()")
+                return int((await cursor.fetchone())[0])
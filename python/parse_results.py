@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Order Entry System - Parse Result Types
+Compact parse results and the shared JSON serializer/deserializer used by
+the CLIs, the parser service and parse sessions
+"""
+
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from parse_tracing import ParseTrace
+
+
+class CustomerAlternative(NamedTuple):
+    """One customer suggestion; serializes to a dict with these keys in this order"""
+    customer_id: int
+    name: str
+    code: str
+    abbreviation: str
+    similarity: int
+    confidence: int
+
+
+class ProductAlternative(NamedTuple):
+    """One product suggestion; serializes to a dict with these keys in this order"""
+    product_id: int
+    item_code: str
+    description: str
+    abbreviation: str
+    similarity: int
+    confidence: int
+    uom: str
+    uom_id: int
+
+
+class _Record:
+    """repr and equality over __slots__, like the dataclasses these replace"""
+    __slots__ = ()
+
+    def __repr__(self):
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+
+class ParsedItem(_Record):
+    """Represents a parsed product item"""
+    __slots__ = ('raw_input', 'quantity', 'product_code', 'product_name', 'product_id',
+                 'uom', 'uom_id', 'confidence', 'alternatives')
+
+    def __init__(self, raw_input: str, quantity: float, product_code: str = "", product_name: str = "",
+                 product_id: int = None, uom: str = "EA", uom_id: int = 1, confidence: int = 0,
+                 alternatives: Tuple[ProductAlternative, ...] = ()):
+        self.raw_input = raw_input
+        self.quantity = quantity
+        self.product_code = product_code
+        self.product_name = product_name
+        self.product_id = product_id
+        self.uom = uom
+        self.uom_id = uom_id
+        self.confidence = confidence
+        # Alternatives are immutable, so one tuple is shared with the lookup cache
+        self.alternatives = tuple(alternatives) if alternatives else ()
+
+
+class ParsedCustomer(_Record):
+    """Represents a parsed customer"""
+    __slots__ = ('raw_input', 'customer_id', 'customer_name', 'customer_code', 'confidence', 'alternatives')
+
+    def __init__(self, raw_input: str, customer_id: int = None, customer_name: str = "",
+                 customer_code: str = "", confidence: int = 0,
+                 alternatives: Tuple[CustomerAlternative, ...] = ()):
+        self.raw_input = raw_input
+        self.customer_id = customer_id
+        self.customer_name = customer_name
+        self.customer_code = customer_code
+        self.confidence = confidence
+        self.alternatives = tuple(alternatives) if alternatives else ()
+
+
+class ParsedOrder(_Record):
+    """Represents a complete parsed order"""
+    __slots__ = ('customer', 'items', 'raw_input', 'parsing_errors', 'trace')
+
+    def __init__(self, customer: ParsedCustomer, items: List[ParsedItem], raw_input: str,
+                 parsing_errors: List[str] = None, trace: Optional[ParseTrace] = None):
+        self.customer = customer
+        self.items = items
+        self.raw_input = raw_input
+        self.parsing_errors = [] if parsing_errors is None else parsing_errors
+        self.trace = trace
+
+
+class ParsedOrderSheet(_Record):
+    """Represents a whole sheet of customer orders parsed together"""
+    __slots__ = ('orders', 'raw_input', 'elapsed_seconds')
+
+    def __init__(self, orders: List[ParsedOrder], raw_input: str, elapsed_seconds: float = 0.0):
+        self.orders = orders
+        self.raw_input = raw_input
+        self.elapsed_seconds = elapsed_seconds
+
+    @property
+    def blocks_per_second(self) -> float:
+        if not self.elapsed_seconds:
+            return 0.0
+        return len(self.orders) / self.elapsed_seconds
+
+
+def _customer_alternative_dicts(alternatives) -> List[Dict]:
+    # Dict displays are the cheapest way to build these; anything that is not
+    # a CustomerAlternative (a dict from an older caller) passes through as is
+    return [
+        {
+            'customer_id': alt[0],
+            'name': alt[1],
+            'code': alt[2],
+            'abbreviation': alt[3],
+            'similarity': alt[4],
+            'confidence': alt[5]
+        } if type(alt) is CustomerAlternative else alt
+        for alt in alternatives
+    ]
+
+
+def _product_alternative_dicts(alternatives) -> List[Dict]:
+    return [
+        {
+            'product_id': alt[0],
+            'item_code': alt[1],
+            'description': alt[2],
+            'abbreviation': alt[3],
+            'similarity': alt[4],
+            'confidence': alt[5],
+            'uom': alt[6],
+            'uom_id': alt[7]
+        } if type(alt) is ProductAlternative else alt
+        for alt in alternatives
+    ]
+
+
+def _alternative_tuples(alternatives: List[Dict], alternative_type) -> tuple:
+    # Only dicts with exactly the expected keys become tuples, so anything
+    # else round-trips through serialization untouched
+    fields = alternative_type._fields
+    return tuple(
+        alternative_type._make(alt.values()) if isinstance(alt, dict) and tuple(alt) == fields else alt
+        for alt in alternatives
+    )
+
+
+def serialize_parsed_customer(customer: ParsedCustomer) -> Dict:
+    """Convert ParsedCustomer to JSON-serializable dict"""
+    return {
+        'raw_input': customer.raw_input,
+        'customer_id': customer.customer_id,
+        'customer_name': customer.customer_name,
+        'customer_code': customer.customer_code,
+        'confidence': customer.confidence,
+        'alternatives': _customer_alternative_dicts(customer.alternatives) if customer.alternatives else []
+    }
+
+
+def serialize_parsed_item(item: ParsedItem) -> Dict:
+    """Convert ParsedItem to JSON-serializable dict"""
+    return {
+        'raw_input': item.raw_input,
+        'quantity': item.quantity,
+        'product_code': item.product_code,
+        'product_name': item.product_name,
+        'product_id': item.product_id,
+        'uom': item.uom,
+        'uom_id': item.uom_id,
+        'confidence': item.confidence,
+        'alternatives': _product_alternative_dicts(item.alternatives) if item.alternatives else []
+    }
+
+
+def serialize_parsed_order(parsed_order: ParsedOrder) -> Dict:
+    """Convert ParsedOrder to JSON-serializable dict"""
+    result = {
+        'customer': serialize_parsed_customer(parsed_order.customer),
+        'items': [serialize_parsed_item(item) for item in parsed_order.items],
+        'raw_input': parsed_order.raw_input,
+        'parsing_errors': parsed_order.parsing_errors
+    }
+    # Only traced parses carry timings, so untraced output is unchanged
+    if parsed_order.trace is not None:
+        result['trace'] = parsed_order.trace.to_dict()
+    return result
+
+
+def serialize_order_sheet(sheet: ParsedOrderSheet) -> Dict:
+    """Convert ParsedOrderSheet to JSON-serializable dict"""
+    return {
+        'orders': [serialize_parsed_order(order) for order in sheet.orders],
+        'blocks': len(sheet.orders),
+        'elapsed_seconds': round(sheet.elapsed_seconds, 4),
+        'blocks_per_second': round(sheet.blocks_per_second, 2)
+    }
+
+
+def deserialize_parsed_order(data: Dict) -> ParsedOrder:
+    """Convert JSON dict back to ParsedOrder object"""
+    customer_data = data['customer']
+    customer = ParsedCustomer(
+        raw_input=customer_data['raw_input'],
+        customer_id=customer_data['customer_id'],
+        customer_name=customer_data['customer_name'],
+        customer_code=customer_data['customer_code'],
+        confidence=customer_data['confidence'],
+        alternatives=_alternative_tuples(customer_data['alternatives'], CustomerAlternative)
+    )
+
+    items = [
+        ParsedItem(
+            raw_input=item_data['raw_input'],
+            quantity=item_data['quantity'],
+            product_code=item_data['product_code'],
+            product_name=item_data['product_name'],
+            product_id=item_data['product_id'],
+            uom=item_data['uom'],
+            uom_id=item_data['uom_id'],
+            confidence=item_data['confidence'],
+            alternatives=_alternative_tuples(item_data['alternatives'], ProductAlternative)
+        )
+        for item_data in data['items']
+    ]
+
+    return ParsedOrder(
+        customer=customer,
+        items=items,
+        raw_input=data['raw_input'],
+        parsing_errors=data['parsing_errors']
+    )
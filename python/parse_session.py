@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Order Entry System - Incremental Parse Sessions
+Parse-as-you-type support: each session remembers the last parse of an
+order entry textarea and only re-resolves the lines that changed
+"""
+
+import re
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from parser_cache import LookupCache, MISSING
+from parse_results import (ParsedCustomer, ParsedItem, ParsedOrder,
+                           serialize_parsed_customer, serialize_parsed_item)
+from shorthand_parser import ShorthandParser
+
+
+class ParseSession:
+    """
+    Last parse of one order entry screen.
+
+    Product lines are remembered by their text. On each update, lines whose
+    text was already resolved for the same customer are reused as-is; only
+    new or edited lines go to the parser, in one batched lookup. Tokens on
+    an edited line that were seen before are answered by the parser cache.
+    """
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.version = 0
+        self.raw_input = ''
+        self.customer_line = None
+        self.customer_key = None
+        self.customer = ParsedCustomer("", confidence=0)
+        self.lines: List[str] = []
+        self.results: List[Tuple[List[ParsedItem], List[str]]] = []
+        self.lock = threading.Lock()
+        self.updated_at = time.time()
+
+    def update(self, parser: ShorthandParser, input_text: str) -> Dict:
+        """Apply new textarea contents and return only what changed"""
+        # Remembered lines were resolved against the old index if it reloads
+        index_reloaded = parser._refresh_abbreviation_index()
+
+        # Same block handling as parse_order: first customer block only
+        customer_block = re.split(r'\n\n+', input_text.strip())[0]
+        lines = customer_block.split('\n')
+        first_line = lines[0].strip()
+
+        match = parser.customer_pattern.match(first_line)
+        customer_key = match.group(1).lower() if match else first_line
+
+        previous_customer_id = self.customer.customer_id
+        customer_changed = self.version == 0 or customer_key != self.customer_key
+        if customer_changed:
+            self.customer = parser.parse_customer(first_line)
+        else:
+            self.customer.raw_input = first_line
+
+        product_lines = parser._product_lines(lines)
+
+        # Results are only reusable while the customer context is the same
+        context_changed = (self.version == 0 or index_reloaded
+                           or self.customer.customer_id != previous_customer_id)
+        known = {} if context_changed else dict(zip(self.lines, self.results))
+
+        stale = list(dict.fromkeys(line for line in product_lines if line not in known))
+        if stale:
+            known.update(zip(stale, parser._resolve_product_lines(stale, self.customer.customer_id)))
+
+        results = [known[line] for line in product_lines]
+
+        changed_lines = []
+        for position, (line, (items, errors)) in enumerate(zip(product_lines, results)):
+            if context_changed or position >= len(self.lines) or self.lines[position] != line:
+                changed_lines.append({
+                    'line': position,
+                    'text': line,
+                    'items': [serialize_parsed_item(item) for item in items],
+                    'errors': errors
+                })
+
+        customer_delta = None
+        if customer_changed or first_line != self.customer_line:
+            customer_delta = serialize_parsed_customer(self.customer)
+
+        self.version += 1
+        self.raw_input = input_text
+        self.customer_line = first_line
+        self.customer_key = customer_key
+        self.lines = product_lines
+        self.results = results
+        self.updated_at = time.time()
+
+        return {
+            'session_id': self.session_id,
+            'version': self.version,
+            'customer': customer_delta,
+            'changed_lines': changed_lines,
+            'line_count': len(product_lines),
+            'resolved_lines': len(stale)
+        }
+
+    def reparse(self, parser: ShorthandParser, new_customer_id: int) -> Dict:
+        """
+        Customer correction without shipping the order around: re-resolve
+        every stored line for the new customer in one batched lookup and
+        return only the items whose resolution changed.
+        """
+        parser._refresh_abbreviation_index()
+        customer_info = parser._fetch_customer(new_customer_id)
+        if not customer_info:
+            return {
+                'session_id': self.session_id,
+                'version': self.version,
+                'error': f"Customer ID {new_customer_id} not found"
+            }
+
+        # The correction sticks until the customer code itself is edited
+        self.customer.customer_id = customer_info[0]
+        self.customer.customer_name = customer_info[1]
+        self.customer.customer_code = customer_info[2]
+        self.customer.confidence = 100
+        self.customer.alternatives = ()
+
+        results = parser._resolve_product_lines(self.lines, new_customer_id)
+
+        changed_items = []
+        position = 0
+        for line_number, ((old_items, _), (new_items, _)) in enumerate(zip(self.results, results)):
+            for index, (old_item, new_item) in enumerate(zip(old_items, new_items)):
+                serialized = serialize_parsed_item(new_item)
+                if serialized != serialize_parsed_item(old_item):
+                    changed_items.append({
+                        'position': position,
+                        'line': line_number,
+                        'index': index,
+                        'item': serialized
+                    })
+                position += 1
+
+        self.results = results
+        self.version += 1
+        self.updated_at = time.time()
+
+        return {
+            'session_id': self.session_id,
+            'version': self.version,
+            'customer': serialize_parsed_customer(self.customer),
+            'changed_items': changed_items,
+            'parsing_errors': [error for _, errors in results for error in errors]
+        }
+
+    def to_parsed_order(self) -> ParsedOrder:
+        """Current state as a regular ParsedOrder (same as a full parse_order)"""
+        items = []
+        errors = []
+        for line_items, line_errors in self.results:
+            items.extend(line_items)
+            errors.extend(line_errors)
+
+        return ParsedOrder(
+            customer=self.customer,
+            items=items,
+            raw_input=self.raw_input,
+            parsing_errors=errors
+        )
+
+
+class ParseSessionStore:
+    """Sessions by id, bounded and expired like the parser caches"""
+
+    def __init__(self, max_sessions: int = 1000, ttl: float = 1800.0):
+        self.sessions = LookupCache(maxsize=max_sessions, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Optional[ParseSession]:
+        session = self.sessions.get(session_id)
+        return None if session is MISSING else session
+
+    def get_or_create(self, session_id: str = None) -> ParseSession:
+        """Existing session, or a fresh one (a new id if none was given)"""
+        with self._lock:
+            session = self.get(session_id) if session_id else None
+            if session is None:
+                session = ParseSession(session_id or uuid.uuid4().hex)
+            # Setting again refreshes the TTL and LRU position
+            self.sessions.set(session.session_id, session)
+            return session
+
+    def discard(self, session_id: str):
+        self.sessions.invalidate(session_id)
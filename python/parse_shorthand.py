@@ -6,43 +6,41 @@ Command line interface for the shorthand parser used by PHP
 
 import sys
 import json
+from parse_results import serialize_order_sheet, serialize_parsed_order
 from shorthand_parser import ShorthandParser
 
-def serialize_parsed_order(parsed_order):
-    """Convert ParsedOrder to JSON-serializable dict"""
-    return {
-        'customer': {
-            'raw_input': parsed_order.customer.raw_input,
-            'customer_id': parsed_order.customer.customer_id,
-            'customer_name': parsed_order.customer.customer_name,
-            'customer_code': parsed_order.customer.customer_code,
-            'confidence': parsed_order.customer.confidence,
-            'alternatives': parsed_order.customer.alternatives
-        },
-        'items': [
-            {
-                'raw_input': item.raw_input,
-                'quantity': item.quantity,
-                'product_code': item.product_code,
-                'product_name': item.product_name,
-                'product_id': item.product_id,
-                'uom': item.uom,
-                'uom_id': item.uom_id,
-                'confidence': item.confidence,
-                'alternatives': item.alternatives
-            }
-            for item in parsed_order.items
-        ],
-        'raw_input': parsed_order.raw_input,
-        'parsing_errors': parsed_order.parsing_errors
-    }
+USAGE = 'Usage: python parse_shorthand.py [--trace] [--sheet [--workers N]] "<shorthand_input>"'
+
+def usage_error():
+    print(json.dumps({'error': USAGE}))
+    sys.exit(1)
 
 def main():
-    if len(sys.argv) != 2:
-        print(json.dumps({'error': 'Usage: python parse_shorthand.py "<shorthand_input>"'}))
-        sys.exit(1)
+    args = sys.argv[1:]
+    
+    # --trace adds per-stage timings and query counts to the output
+    tracing = '--trace' in args
+    if tracing:
+        args.remove('--trace')
     
-    shorthand_input = sys.argv[1]
+    # Order sheet mode: --sheet [--workers N] "<input>" (use - to read stdin)
+    sheet_mode = '--sheet' in args
+    workers = 4
+    if sheet_mode:
+        args.remove('--sheet')
+        if '--workers' in args:
+            position = args.index('--workers')
+            value = args[position + 1] if position + 1 < len(args) else ''
+            # A positive whole number; anything else is a usage error, not a crash
+            if not value.isdigit() or int(value) < 1:
+                usage_error()
+            workers = int(value)
+            del args[position:position + 2]
+    
+    if len(args) != 1:
+        usage_error()
+    
+    shorthand_input = sys.stdin.read() if args[0] == '-' else args[0]
     
     # Database configuration
     db_config = {
@@ -53,7 +51,7 @@ def main():
         'charset': 'utf8mb4'
     }
     
-    parser = ShorthandParser(db_config)
+    parser = ShorthandParser(db_config, tracing=tracing)
     
     try:
         if not parser.connect_database():
@@ -65,11 +63,24 @@ def main():
             }))
             sys.exit(1)
         
-        # Parse the order
-        parsed_order = parser.parse_order(shorthand_input)
-        
-        # Serialize and output as JSON
-        result = serialize_parsed_order(parsed_order)
+        if sheet_mode:
+            # Parse every customer block on the sheet
+            sheet = parser.parse_order_sheet(shorthand_input, workers=workers)
+            result = serialize_order_sheet(sheet)
+            if tracing:
+                result['metrics'] = parser.metrics_snapshot()
+        else:
+            # Parse the order
+            parsed_order = parser.parse_order(shorthand_input)
+            
+            # Serialize and output as JSON
+            if parsed_order.trace is not None:
+                with parsed_order.trace.span('serialize'):
+                    result = serialize_parsed_order(parsed_order)
+                # Serialization time only exists once serializing is done
+                result['trace'] = parsed_order.trace.to_dict()
+            else:
+                result = serialize_parsed_order(parsed_order)
         print(json.dumps(result))
         
     except Exception as e:
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Order Entry System - Parse Tracing
+Per-stage timings, query counts and cache counters for shorthand parses
+"""
+
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict
+
+
+class _Span:
+    """Context manager adding its elapsed time to a trace"""
+
+    __slots__ = ('trace', 'name', 'start')
+
+    def __init__(self, trace: 'ParseTrace', name: str):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.trace.add_time(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class ParseTrace:
+    """
+    Timings and counters for a single parse.
+
+    Spans with the same name accumulate (calls and total time), so a stage
+    that runs once per product line shows up as one entry. Queries are
+    counted separately from spans since they happen inside several stages.
+    """
+
+    enabled = True
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        self.spans: Dict[str, list] = {}
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.counters: Dict[str, int] = defaultdict(int)
+
+    def span(self, name: str) -> _Span:
+        return _Span(self, name)
+
+    def add_time(self, name: str, seconds: float):
+        span = self.spans.get(name)
+        if span is None:
+            self.spans[name] = [1, seconds]
+        else:
+            span[0] += 1
+            span[1] += seconds
+
+    def record_query(self, seconds: float):
+        self.queries += 1
+        self.query_seconds += seconds
+
+    def count(self, name: str, amount: int = 1):
+        self.counters[name] += amount
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'total_ms': round(self.elapsed * 1000, 3),
+            'spans': {
+                name: {'calls': calls, 'ms': round(seconds * 1000, 3)}
+                for name, (calls, seconds) in self.spans.items()
+            },
+            'queries': self.queries,
+            'query_ms': round(self.query_seconds * 1000, 3),
+            'counters': dict(self.counters)
+        }
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class NullTrace:
+    """Stand-in used when tracing is off: every call is a no-op"""
+
+    enabled = False
+    _span = _NullSpan()
+
+    def span(self, name: str) -> _NullSpan:
+        return self._span
+
+    def add_time(self, name: str, seconds: float):
+        pass
+
+    def record_query(self, seconds: float):
+        pass
+
+    def count(self, name: str, amount: int = 1):
+        pass
+
+    def finish(self):
+        pass
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {}
+
+
+NULL_TRACE = NullTrace()
+
+
+class ParseMetrics:
+    """Running totals over every traced parse, safe to share across parsers"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.parses = 0
+            self.total_seconds = 0.0
+            self.queries = 0
+            self.query_seconds = 0.0
+            self.spans: Dict[str, list] = defaultdict(lambda: [0, 0.0])
+            self.counters: Dict[str, int] = defaultdict(int)
+
+    def record(self, trace: ParseTrace):
+        with self._lock:
+            self.parses += 1
+            self.total_seconds += trace.elapsed
+            self.queries += trace.queries
+            self.query_seconds += trace.query_seconds
+            for name, (calls, seconds) in trace.spans.items():
+                span = self.spans[name]
+                span[0] += calls
+                span[1] += seconds
+            for name, amount in trace.counters.items():
+                self.counters[name] += amount
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Totals and per-parse averages for monitoring"""
+        with self._lock:
+            parses = self.parses or 1
+            return {
+                'parses': self.parses,
+                'avg_ms': round(self.total_seconds / parses * 1000, 3),
+                'queries': self.queries,
+                'queries_per_parse': round(self.queries / parses, 3),
+                'query_ms': round(self.query_seconds * 1000, 3),
+                'spans': {
+                    name: {
+                        'calls': calls,
+                        'total_ms': round(seconds * 1000, 3),
+                        'avg_ms': round(seconds / calls * 1000, 3) if calls else 0.0
+                    }
+                    for name, (calls, seconds) in self.spans.items()
+                },
+                'counters': dict(self.counters)
+            }
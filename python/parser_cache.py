@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Order Entry System - Parser Lookup Cache
+Bounded LRU cache with TTL and negative entries for shorthand lookups
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+
+MISSING = object()
+
+
+class LookupCache:
+    """
+    Thread-safe LRU cache for parser lookups.
+
+    - maxsize bounds memory in long-lived processes (least recently used
+      entries are evicted first)
+    - ttl expires entries so abbreviation edits are picked up eventually
+      even without an explicit invalidation
+    - negative entries remember lookups that found no exact match (and the
+      fuzzy suggestions computed for them) for negative_ttl seconds, so a
+      repeated typo doesn't run the fuzzy path again
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 300.0, negative_ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        """Cached value for key, or default if absent or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, expires_at, negative = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            if negative:
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, negative: bool = False):
+        """Store a value; negative entries use the shorter negative_ttl"""
+        ttl = self.negative_ttl if negative else self.ttl
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl, negative)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> bool:
+        """Drop a single key"""
+        with self._lock:
+            if self._entries.pop(key, None) is None:
+                return False
+            self.invalidations += 1
+            return True
+
+    def invalidate_where(self, predicate: Callable[[Hashable, Any, bool], bool]) -> int:
+        """Drop every entry for which predicate(key, value, negative) is true"""
+        with self._lock:
+            stale = [key for key, (value, _, negative) in self._entries.items()
+                     if predicate(key, value, negative)]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+            return len(stale)
+
+    def clear(self):
+        """Drop everything (counters are kept)"""
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters snapshot for monitoring"""
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'negative_hits': self.negative_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+            'hit_rate': round((self.hits + self.negative_hits) / lookups, 4) if lookups else 0.0
+        }
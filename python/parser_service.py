@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Order Entry System - Shorthand Parser Service
+Long-lived localhost HTTP service that keeps warm ShorthandParser instances
+so PHP no longer has to spawn parse_shorthand.py for every keystroke
+"""
+
+import argparse
+import json
+import logging
+import queue
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from abbreviation_index import AbbreviationIndex
+from customer_context import CustomerContextCache
+from db_pool import DEFAULT_POOL_SIZE, get_pool
+from parser_cache import LookupCache
+from parse_results import deserialize_parsed_order, serialize_parsed_order
+from parse_tracing import ParseMetrics
+from parse_session import ParseSessionStore
+from shorthand_parser import ShorthandParser
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+
+class ParserPool:
+    """
+    Fixed-size pool of connected ShorthandParser instances.
+
+    A mysql.connector connection is not safe to share between threads, so each
+    request checks out its own parser. All parsers share the same lookup caches
+    and abbreviation index, which means a code resolved by one request is warm
+    for every other request.
+
+    Parser connections come from the shared db_pool pool, sized for the
+    parsers plus db_pool_size more for order sheet workers.
+    """
+
+    def __init__(self, db_config, size: int = 4, tracing: bool = False,
+                 db_pool_size: int = DEFAULT_POOL_SIZE):
+        self.db_config = db_config
+        self.size = size
+        self.tracing = tracing
+        self.connections = get_pool(db_config, size=size + db_pool_size)
+        self.customer_cache = LookupCache(maxsize=10000)
+        self.product_cache = LookupCache(maxsize=50000)
+        self.abbreviation_index = AbbreviationIndex()
+        self.customer_contexts = CustomerContextCache()
+        self.metrics = ParseMetrics()
+        self._idle = queue.Queue()
+        self.logger = logging.getLogger(__name__)
+
+        for _ in range(size):
+            parser = self._create_parser()
+            if not self.abbreviation_index.is_loaded and parser.connection:
+                self.abbreviation_index.load(parser.connection)
+            self._idle.put(parser)
+
+    def _create_parser(self) -> ShorthandParser:
+        """Create a parser wired to the shared caches and metrics"""
+        parser = ShorthandParser(self.db_config, abbreviation_index=self.abbreviation_index,
+                                 tracing=self.tracing)
+        parser.customer_cache = self.customer_cache
+        parser.product_cache = self.product_cache
+        parser.customer_contexts = self.customer_contexts
+        parser.metrics = self.metrics
+        parser.connect_database()
+        return parser
+
+    @contextmanager
+    def parser(self, timeout: float = 10.0):
+        """Check out a parser, reconnecting it if its connection was dropped"""
+        parser = self._idle.get(timeout=timeout)
+        try:
+            if not parser.connection or not self.connections.ping(parser.connection):
+                self.logger.warning("Parser connection lost, reconnecting")
+                parser.connect_database()
+            yield parser
+        finally:
+            self._idle.put(parser)
+
+    def close(self):
+        """Close every pooled connection"""
+        while not self._idle.empty():
+            self._idle.get_nowait().close_connection()
+        self.connections.close()
+
+
+class ParserRequestHandler(BaseHTTPRequestHandler):
+    """
+    JSON endpoints mirroring the CLI scripts:
+
+    POST /parse    {"input": "g18\\n1t2sm4rb"}
+    POST /reparse  {"order": {...}, "new_customer_id": 3}
+    POST /session  {"session_id": "...", "input": "g18\\n1t2sm4rb"}
+    POST /session/reparse  {"session_id": "...", "new_customer_id": 3}
+    GET  /health
+    GET  /stats
+    """
+
+    server_version = "ShorthandParserService/1.0"
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send_json(200, {'status': 'ok', 'parsers': self.server.pool.size})
+        elif self.path == '/stats':
+            pool = self.server.pool
+            self._send_json(200, {
+                'customer_cache': pool.customer_cache.stats(),
+                'product_cache': pool.product_cache.stats(),
+                'customer_contexts': pool.customer_contexts.stats(),
+                'db_pool': pool.connections.stats(),
+                'parse_metrics': pool.metrics.snapshot() if pool.tracing else None
+            })
+        else:
+            self._send_json(404, {'error': 'Not found'})
+
+    def do_POST(self):
+        routes = {
+            '/parse': self._handle_parse,
+            '/reparse': self._handle_reparse,
+            '/session': self._handle_session,
+            '/session/reparse': self._handle_session_reparse,
+        }
+        handler = routes.get(self.path)
+        if handler is None:
+            self._send_json(404, {'error': 'Not found'})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            data = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self._send_json(400, {'error': 'Invalid JSON body'})
+            return
+
+        try:
+            status, payload = handler(data)
+        except queue.Empty:
+            status, payload = 503, self._error_payload('Parser service busy')
+        except Exception as e:
+            logging.getLogger(__name__).exception("Parser service error")
+            status, payload = 500, self._error_payload(f'Parser error: {e}', str(e))
+
+        self._send_json(status, payload)
+
+    def _handle_parse(self, data):
+        if 'input' not in data:
+            return 400, {'error': 'Invalid input'}
+
+        with self.server.pool.parser() as parser:
+            parsed_order = parser.parse_order(data['input'])
+            return 200, serialize_parsed_order(parsed_order)
+
+    def _handle_reparse(self, data):
+        if 'order' not in data or 'new_customer_id' not in data:
+            return 400, {'error': 'Invalid input - need order and new_customer_id'}
+
+        parsed_order = deserialize_parsed_order(data['order'])
+        with self.server.pool.parser() as parser:
+            reparsed_order = parser.reparse_with_customer(parsed_order, int(data['new_customer_id']))
+            return 200, serialize_parsed_order(reparsed_order)
+
+    def _handle_session(self, data):
+        if 'input' not in data:
+            return 400, {'error': 'Invalid input'}
+
+        session = self.server.sessions.get_or_create(data.get('session_id'))
+        with session.lock, self.server.pool.parser() as parser:
+            delta = session.update(parser, data['input'])
+            if data.get('full'):
+                delta['order'] = serialize_parsed_order(session.to_parsed_order())
+            return 200, delta
+
+    def _handle_session_reparse(self, data):
+        if 'session_id' not in data or 'new_customer_id' not in data:
+            return 400, {'error': 'Invalid input - need session_id and new_customer_id'}
+
+        session = self.server.sessions.get(data['session_id'])
+        if session is None:
+            return 404, {'error': 'Unknown parse session', 'session_expired': True}
+
+        with session.lock, self.server.pool.parser() as parser:
+            delta = session.reparse(parser, int(data['new_customer_id']))
+            if data.get('full'):
+                delta['order'] = serialize_parsed_order(session.to_parsed_order())
+            return 200, delta
+
+    @staticmethod
+    def _error_payload(message: str, error: str = None):
+        """Error body in the same shape the CLI scripts print"""
+        return {
+            'error': error or message,
+            'customer': {'customer_name': '', 'confidence': 0, 'alternatives': []},
+            'items': [],
+            'parsing_errors': [message]
+        }
+
+    def _send_json(self, status: int, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.getLogger(__name__).debug("%s - %s", self.address_string(), format % args)
+
+
+class ParserService(ThreadingHTTPServer):
+    """Threaded HTTP server holding a pool of warm parsers"""
+
+    daemon_threads = True
+
+    def __init__(self, db_config, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 pool_size: int = 4, tracing: bool = False, db_pool_size: int = DEFAULT_POOL_SIZE):
+        self.pool = ParserPool(db_config, size=pool_size, tracing=tracing, db_pool_size=db_pool_size)
+        self.sessions = ParseSessionStore()
+        super().__init__((host, port), ParserRequestHandler)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.close()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Shorthand Parser Service')
+    arg_parser.add_argument('--host', default=DEFAULT_HOST, help='Address to bind (localhost only by default)')
+    arg_parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='Port to listen on')
+    arg_parser.add_argument('--pool-size', type=int, default=4, help='Number of warm parser connections')
+    arg_parser.add_argument('--db-pool-size', type=int, default=DEFAULT_POOL_SIZE,
+                            help='Extra pooled connections for order sheet workers')
+    arg_parser.add_argument('--trace', action='store_true',
+                            help='Trace every parse (per-stage timings in responses and /stats)')
+    args = arg_parser.parse_args()
+
+    # Database configuration
+    db_config = {
+        'host': 'localhost',
+        'database': 'orders',
+        'user': 'root',
+        'password': '',  # Adjust as needed
+        'charset': 'utf8mb4'
+    }
+
+    service = ParserService(db_config, args.host, args.port, args.pool_size, tracing=args.trace,
+                            db_pool_size=args.db_pool_size)
+    print(f"🚀 Shorthand parser service listening on http://{args.host}:{args.port}")
+
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Shutting down parser service")
+    finally:
+        service.server_close()
+
+
+if __name__ == '__main__':
+    main()
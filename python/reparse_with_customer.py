@@ -6,77 +6,16 @@ Handles customer correction and re-contextualization
 
 import sys
 import json
-from shorthand_parser import ShorthandParser, ParsedOrder, ParsedCustomer, ParsedItem
-
-def deserialize_parsed_order(data):
-    """Convert JSON dict back to ParsedOrder object"""
-    customer_data = data['customer']
-    customer = ParsedCustomer(
-        raw_input=customer_data['raw_input'],
-        customer_id=customer_data['customer_id'],
-        customer_name=customer_data['customer_name'],
-        customer_code=customer_data['customer_code'],
-        confidence=customer_data['confidence'],
-        alternatives=customer_data['alternatives']
-    )
-    
-    items = []
-    for item_data in data['items']:
-        item = ParsedItem(
-            raw_input=item_data['raw_input'],
-            quantity=item_data['quantity'],
-            product_code=item_data['product_code'],
-            product_name=item_data['product_name'],
-            product_id=item_data['product_id'],
-            uom=item_data['uom'],
-            uom_id=item_data['uom_id'],
-            confidence=item_data['confidence'],
-            alternatives=item_data['alternatives']
-        )
-        items.append(item)
-    
-    return ParsedOrder(
-        customer=customer,
-        items=items,
-        raw_input=data['raw_input'],
-        parsing_errors=data['parsing_errors']
-    )
-
-def serialize_parsed_order(parsed_order):
-    """Convert ParsedOrder to JSON-serializable dict"""
-    return {
-        'customer': {
-            'raw_input': parsed_order.customer.raw_input,
-            'customer_id': parsed_order.customer.customer_id,
-            'customer_name': parsed_order.customer.customer_name,
-            'customer_code': parsed_order.customer.customer_code,
-            'confidence': parsed_order.customer.confidence,
-            'alternatives': parsed_order.customer.alternatives
-        },
-        'items': [
-            {
-                'raw_input': item.raw_input,
-                'quantity': item.quantity,
-                'product_code': item.product_code,
-                'product_name': item.product_name,
-                'product_id': item.product_id,
-                'uom': item.uom,
-                'uom_id': item.uom_id,
-                'confidence': item.confidence,
-                'alternatives': item.alternatives
-            }
-            for item in parsed_order.items
-        ],
-        'raw_input': parsed_order.raw_input,
-        'parsing_errors': parsed_order.parsing_errors
-    }
+from parse_results import deserialize_parsed_order, serialize_parsed_order
+from shorthand_parser import ShorthandParser
 
 def main():
     if len(sys.argv) != 3:
-        print(json.dumps({'error': 'Usage: python reparse_with_customer.py "<order_json>" <new_customer_id>'}))
+        print(json.dumps({'error': 'Usage: python reparse_with_customer.py "<order_json>|-" <new_customer_id>'}))
         sys.exit(1)
     
-    order_json = sys.argv[1]
+    # Large orders can be piped on stdin instead of passed through argv
+    order_json = sys.stdin.read() if sys.argv[1] == '-' else sys.argv[1]
     new_customer_id = int(sys.argv[2])
     
     # Database configuration
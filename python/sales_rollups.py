@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Order Entry System - Sales Rollups
+Pre-aggregated sales per (customer, product, day) and (product, week), kept
+current by a catch-up job outside the order entry path, so reports read
+rollup rows instead of scanning orders and order_items
+"""
+
+import argparse
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from mysql.connector import Error
+
+from db_pool import acquire_connection, pooled_connection, release_connection
+
+# Row in sales_rollup_state holding the catch-up job's position
+STATE_NAME = 'sales'
+
+# Orders count toward sales unless cancelled (drafts are ordered quantity too)
+EXCLUDED_STATUS = 'cancelled'
+
+
+def week_start(day: date) -> date:
+    """Monday of day's week (MySQL WEEKDAY() numbering)"""
+    return day - timedelta(days=day.weekday())
+
+
+def refresh_orders(connection, order_ids: Sequence[int]) -> int:
+    """
+    Bring the rollup rows for these orders up to date (without committing);
+    returns how many (customer, day) keys were refreshed.
+
+    sales_rollup_orders remembers the (customer, day) each order was last
+    rolled into, so an order moved to another customer or date (or deleted)
+    also has its old day recomputed.
+    """
+    order_ids = list(dict.fromkeys(order_ids))
+    if not order_ids:
+        return 0
+    cursor = connection.cursor()
+    placeholders = ', '.join(['%s'] * len(order_ids))
+    cursor.execute(f"SELECT customer_id, sales_date FROM sales_rollup_orders WHERE order_id IN ({placeholders})",
+                   order_ids)
+    previous = cursor.fetchall()
+    cursor.execute(f"SELECT id, customer_id, order_date FROM orders WHERE id IN ({placeholders})", order_ids)
+    current = cursor.fetchall()
+
+    keys = list(dict.fromkeys(list(previous) + [(customer_id, day) for _, customer_id, day in current]))
+    refresh_keys(connection, keys)
+
+    if current:
+        cursor.executemany("""
+            INSERT INTO sales_rollup_orders (order_id, customer_id, sales_date)
+            VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE customer_id = VALUES(customer_id), sales_date = VALUES(sales_date)
+        """, current)
+    deleted = sorted(set(order_ids) - {order_id for order_id, _, _ in current})
+    if deleted:
+        cursor.execute(f"DELETE FROM sales_rollup_orders WHERE order_id IN ({', '.join(['%s'] * len(deleted))})",
+                       deleted)
+    return len(keys)
+
+
+def refresh_keys(connection, keys: Sequence[Tuple[int, date]]):
+    """
+    Recompute sales_daily_customer_product for (customer_id, day) keys from
+    orders, then the sales_weekly_product rows those days feed.
+
+    Recomputing instead of adding deltas keeps a refresh idempotent, so the
+    catch-up job and a rebuild can both run over the same orders.
+    """
+    keys = list(dict.fromkeys((customer_id, day) for customer_id, day in keys))
+    if not keys:
+        return
+    cursor = connection.cursor()
+    key_list = ', '.join(['(%s, %s)'] * len(keys))
+    key_params = [value for key in keys for value in key]
+
+    # Products these days had before and have now: a product dropped from an
+    # order still needs its weekly row recomputed
+    cursor.execute(f"""
+        SELECT product_id FROM sales_daily_customer_product
+        WHERE (customer_id, sales_date) IN ({key_list})
+        UNION
+        SELECT oi.product_id
+        FROM orders o
+        JOIN order_items oi ON oi.order_id = o.id
+        WHERE (o.customer_id, o.order_date) IN ({key_list})
+    """, key_params + key_params)
+    product_ids = [row[0] for row in cursor.fetchall()]
+
+    cursor.execute(f"""
+        DELETE FROM sales_daily_customer_product
+        WHERE (customer_id, sales_date) IN ({key_list})
+    """, key_params)
+
+    cursor.execute(f"""
+        INSERT INTO sales_daily_customer_product (
+            customer_id, sales_date, product_id, quantity, delivered_quantity, revenue, orders
+        )
+        SELECT o.customer_id, o.order_date, oi.product_id,
+               SUM(oi.quantity), SUM(COALESCE(oi.delivered_quantity, 0)), SUM(oi.line_total),
+               COUNT(DISTINCT o.id)
+        FROM orders o
+        JOIN order_items oi ON oi.order_id = o.id
+        WHERE (o.customer_id, o.order_date) IN ({key_list})
+          AND o.status <> %s
+        GROUP BY o.customer_id, o.order_date, oi.product_id
+    """, key_params + [EXCLUDED_STATUS])
+
+    if product_ids:
+        _refresh_weeks(cursor, product_ids, sorted({week_start(day) for _, day in keys}))
+
+
+def _refresh_weeks(cursor, product_ids: List[int], weeks: List[date]):
+    """Recompute sales_weekly_product for products x weeks from the daily rollup"""
+    product_list = ', '.join(['%s'] * len(product_ids))
+    week_list = ', '.join(['%s'] * len(weeks))
+    week_ranges = ' OR '.join(['sales_date BETWEEN %s AND %s'] * len(weeks))
+    range_params = [value for week in weeks for value in (week, week + timedelta(days=6))]
+
+    cursor.execute(f"""
+        DELETE FROM sales_weekly_product
+        WHERE product_id IN ({product_list}) AND week_start IN ({week_list})
+    """, list(product_ids) + list(weeks))
+
+    cursor.execute(f"""
+        INSERT INTO sales_weekly_product (
+            product_id, week_start, quantity, delivered_quantity, revenue, orders, customers
+        )
+        SELECT product_id, DATE_SUB(sales_date, INTERVAL WEEKDAY(sales_date) DAY) AS sales_week,
+               SUM(quantity), SUM(delivered_quantity), SUM(revenue), SUM(orders),
+               COUNT(DISTINCT customer_id)
+        FROM sales_daily_customer_product
+        WHERE product_id IN ({product_list}) AND ({week_ranges})
+        GROUP BY product_id, sales_week
+    """, list(product_ids) + range_params)
+
+
+def catch_up(connection, batch_size: int = 1000, settle_seconds: int = 10) -> int:
+    """
+    Refresh the rollups for orders changed since the high-water mark, one
+    batch per transaction; returns how many orders were processed.
+
+    Orders are walked by (updated_at, id). Orders changed in the last
+    settle_seconds are left for the next run, so a transaction still
+    committing with an older updated_at isn't skipped over.
+    """
+    processed = 0
+    cursor = connection.cursor()
+    while True:
+        cursor.execute("""
+            SELECT high_water_mark, last_order_id FROM sales_rollup_state
+            WHERE name = %s
+            FOR UPDATE
+        """, (STATE_NAME,))
+        state = cursor.fetchone()
+        high_water_mark, last_order_id = state if state else (datetime(1970, 1, 1), 0)
+
+        cursor.execute("""
+            SELECT id, updated_at
+            FROM orders
+            WHERE (updated_at > %s OR (updated_at = %s AND id > %s))
+              AND updated_at < NOW() - INTERVAL %s SECOND
+            ORDER BY updated_at, id
+            LIMIT %s
+        """, (high_water_mark, high_water_mark, last_order_id, settle_seconds, batch_size))
+        orders = cursor.fetchall()
+        if not orders:
+            connection.commit()
+            return processed
+
+        refresh_orders(connection, [order_id for order_id, _ in orders])
+        last_id, last_updated = orders[-1]
+        _save_state(cursor, last_updated, last_id)
+        connection.commit()
+
+        processed += len(orders)
+        if len(orders) < batch_size:
+            return processed
+
+
+def rebuild(connection, start: date = None, end: date = None) -> int:
+    """
+    Recompute the rollups for start..end (default: all orders) a month per
+    transaction; returns how many days were rebuilt. A full rebuild also
+    resets the catch-up job to the moment the rebuild started.
+    """
+    cursor = connection.cursor()
+    cursor.execute("SELECT NOW()")
+    started_at = cursor.fetchone()[0]
+
+    full = start is None and end is None
+    if start is None or end is None:
+        cursor.execute("""
+            SELECT MIN(first_day), MAX(last_day) FROM (
+                SELECT MIN(order_date) AS first_day, MAX(order_date) AS last_day FROM orders
+                UNION ALL
+                SELECT MIN(sales_date), MAX(sales_date) FROM sales_daily_customer_product
+            ) bounds
+        """)
+        first_day, last_day = cursor.fetchone()
+        if first_day is None:
+            connection.commit()
+            return 0
+        start = start or first_day
+        end = end or last_day
+
+    days = 0
+    month = date(start.year, start.month, 1)
+    while month <= end:
+        next_month = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+        chunk_start = max(start, month)
+        chunk_end = min(end, next_month - timedelta(days=1))
+        _rebuild_range(cursor, chunk_start, chunk_end)
+        connection.commit()
+        days += (chunk_end - chunk_start).days + 1
+        month = next_month
+
+    if full:
+        _save_state(cursor, started_at, 0)
+        connection.commit()
+    return days
+
+
+def _rebuild_range(cursor, start: date, end: date):
+    cursor.execute("DELETE FROM sales_rollup_orders WHERE sales_date BETWEEN %s AND %s", (start, end))
+    cursor.execute("""
+        INSERT INTO sales_rollup_orders (order_id, customer_id, sales_date)
+        SELECT id, customer_id, order_date FROM orders WHERE order_date BETWEEN %s AND %s
+    """, (start, end))
+
+    cursor.execute("DELETE FROM sales_daily_customer_product WHERE sales_date BETWEEN %s AND %s", (start, end))
+    cursor.execute("""
+        INSERT INTO sales_daily_customer_product (
+            customer_id, sales_date, product_id, quantity, delivered_quantity, revenue, orders
+        )
+        SELECT o.customer_id, o.order_date, oi.product_id,
+               SUM(oi.quantity), SUM(COALESCE(oi.delivered_quantity, 0)), SUM(oi.line_total),
+               COUNT(DISTINCT o.id)
+        FROM orders o
+        JOIN order_items oi ON oi.order_id = o.id
+        WHERE o.order_date BETWEEN %s AND %s
+          AND o.status <> %s
+        GROUP BY o.customer_id, o.order_date, oi.product_id
+    """, (start, end, EXCLUDED_STATUS))
+
+    # Whole weeks touching the range (the neighbouring month's days included)
+    first_week, last_week = week_start(start), week_start(end)
+    cursor.execute("DELETE FROM sales_weekly_product WHERE week_start BETWEEN %s AND %s",
+                   (first_week, last_week))
+    cursor.execute("""
+        INSERT INTO sales_weekly_product (
+            product_id, week_start, quantity, delivered_quantity, revenue, orders, customers
+        )
+        SELECT product_id, DATE_SUB(sales_date, INTERVAL WEEKDAY(sales_date) DAY) AS sales_week,
+               SUM(quantity), SUM(delivered_quantity), SUM(revenue), SUM(orders),
+               COUNT(DISTINCT customer_id)
+        FROM sales_daily_customer_product
+        WHERE sales_date BETWEEN %s AND %s
+        GROUP BY product_id, sales_week
+    """, (first_week, last_week + timedelta(days=6)))
+
+
+def _save_state(cursor, high_water_mark, last_order_id: int):
+    cursor.execute("""
+        INSERT INTO sales_rollup_state (name, high_water_mark, last_order_id)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE high_water_mark = VALUES(high_water_mark),
+                                last_order_id = VALUES(last_order_id)
+    """, (STATE_NAME, high_water_mark, last_order_id))
+
+
+def start_catch_up_worker(db_config, interval: float = 30.0, batch_size: int = 1000) -> threading.Event:
+    """
+    Run catch_up every interval seconds in a background thread on a pooled
+    connection; set the returned event to stop it
+    """
+    stop = threading.Event()
+
+    def refresh():
+        while not stop.is_set():
+            try:
+                with pooled_connection(db_config) as connection:
+                    catch_up(connection, batch_size)
+            except Error as e:
+                if e.errno == 1146:
+                    # Rollup tables not created yet (sql/add_sales_rollups.sql)
+                    print(f"Sales rollups unavailable ({e}), stopping rollup worker")
+                    return
+                print(f"Error refreshing sales rollups: {e}")
+            except Exception as e:
+                print(f"Unexpected error refreshing sales rollups: {e!r}")
+            stop.wait(interval)
+
+    threading.Thread(target=refresh, name='sales-rollups', daemon=True).start()
+    return stop
+
+
+def weekly_product_sales(connection, start: date, end: date, product_ids: Iterable[int] = None) -> List[Dict]:
+    """Weekly sales per product for the weeks touching start..end, from the rollup"""
+    query = """
+        SELECT w.week_start, w.product_id, p.item_code, p.description AS product_name,
+               w.quantity, w.delivered_quantity, w.revenue, w.orders, w.customers
+        FROM sales_weekly_product w
+        JOIN products p ON p.id = w.product_id
+        WHERE w.week_start BETWEEN %s AND %s
+    """
+    params = [week_start(start), week_start(end)]
+    product_ids = list(product_ids or [])
+    if product_ids:
+        query += f" AND w.product_id IN ({', '.join(['%s'] * len(product_ids))})"
+        params += product_ids
+    query += " ORDER BY w.week_start, w.revenue DESC"
+
+    cursor = connection.cursor(dictionary=True)
+    cursor.execute(query, params)
+    return cursor.fetchall()
+
+
+def customer_product_sales(connection, customer_id: int, start: date, end: date) -> List[Dict]:
+    """A customer's sales per product for start..end, from the daily rollup"""
+    cursor = connection.cursor(dictionary=True)
+    cursor.execute("""
+        SELECT d.product_id, p.item_code, p.description AS product_name,
+               SUM(d.quantity) AS quantity, SUM(d.delivered_quantity) AS delivered_quantity,
+               SUM(d.revenue) AS revenue, SUM(d.orders) AS orders
+        FROM sales_daily_customer_product d
+        JOIN products p ON p.id = d.product_id
+        WHERE d.customer_id = %s AND d.sales_date BETWEEN %s AND %s
+        GROUP BY d.product_id, p.item_code, p.description
+        ORDER BY revenue DESC
+    """, (customer_id, start, end))
+    return cursor.fetchall()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Maintain the sales rollup tables')
+    action = arg_parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--catch-up', action='store_true', help='Refresh rollups for orders changed since the last run')
+    action.add_argument('--rebuild', action='store_true', help='Recompute rollups from orders')
+    action.add_argument('--weekly', action='store_true', help='Print weekly product sales for --start..--end')
+    arg_parser.add_argument('--start', type=date.fromisoformat, help='First day (YYYY-MM-DD)')
+    arg_parser.add_argument('--end', type=date.fromisoformat, help='Last day (YYYY-MM-DD)')
+    arg_parser.add_argument('--batch-size', type=int, default=1000, help='Catch-up: orders per transaction')
+    arg_parser.add_argument('--watch', type=float, metavar='SECONDS',
+                            help='Catch-up: keep running, polling every SECONDS')
+    args = arg_parser.parse_args()
+
+    # Database configuration
+    db_config = {
+        'host': 'localhost',
+        'database': 'orders',
+        'user': 'root',
+        'password': '',  # Adjust as needed
+        'charset': 'utf8mb4'
+    }
+
+    try:
+        connection = acquire_connection(db_config)
+    except Exception as e:
+        print(f"❌ Could not connect to database: {e}")
+        sys.exit(1)
+
+    try:
+        if args.catch_up:
+            while True:
+                processed = catch_up(connection, batch_size=args.batch_size)
+                print(f"✅ Rollups refreshed for {processed} changed orders")
+                if not args.watch:
+                    break
+                time.sleep(args.watch)
+
+        elif args.rebuild:
+            start_time = time.perf_counter()
+            days = rebuild(connection, args.start, args.end)
+            print(f"✅ Rebuilt rollups for {days} days in {time.perf_counter() - start_time:.1f}s")
+
+        else:
+            end = args.end or date.today()
+            start = args.start or end - timedelta(weeks=4)
+            for row in weekly_product_sales(connection, start, end):
+                print(f"{row['week_start']}  {row['item_code']:<12} {float(row['quantity']):>10g} "
+                      f"${float(row['revenue']):>10.2f}  {row['customers']} customers")
+
+    except Exception as e:
+        print(f"❌ Rollup error: {e}")
+        connection.rollback()
+        sys.exit(1)
+
+    finally:
+        release_connection(connection)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,11 +5,12 @@ Load products from master_vendor_prices.csv and set up the order entry database
 """
 
 import pandas as pd
-import mysql.connector
 from mysql.connector import Error
 import os
 from datetime import datetime
 
+from db_pool import acquire_connection, release_connection
+
 class OrderEntryDBSetup:
     def __init__(self):
         # Database connection settings - adjust as needed
@@ -27,7 +28,7 @@ class OrderEntryDBSetup:
     def connect_database(self):
         """Connect to MySQL database"""
         try:
-            self.connection = mysql.connector.connect(**self.db_config)
+            self.connection = acquire_connection(self.db_config)
             if self.connection.is_connected():
                 print("✅ Connected to MySQL database successfully")
                 return True
@@ -334,8 +335,9 @@ class OrderEntryDBSetup:
 
     def close_connection(self):
         """Close database connection"""
-        if self.connection and self.connection.is_connected():
-            self.connection.close()
+        if self.connection is not None:
+            release_connection(self.connection)
+            self.connection = None
             print("📝 Database connection closed")
 
 def main():
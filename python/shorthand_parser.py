@@ -5,55 +5,22 @@ Recreates the brilliant shorthand parsing system with customer-context awareness
 """
 
 import re
-import mysql.connector
+import threading
+import time
 from mysql.connector import Error
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Tuple, Optional
-from dataclasses import dataclass
 from fuzzywuzzy import fuzz, process
 import logging
 
-@dataclass
-class ParsedItem:
-    """Represents a parsed product item"""
-    raw_input: str
-    quantity: float
-    product_code: str = ""
-    product_name: str = ""
-    product_id: int = None
-    uom: str = "EA"
-    uom_id: int = 1
-    confidence: int = 0
-    alternatives: List[Dict] = None
-    
-    def __post_init__(self):
-        if self.alternatives is None:
-            self.alternatives = []
-
-@dataclass 
-class ParsedCustomer:
-    """Represents a parsed customer"""
-    raw_input: str
-    customer_id: int = None
-    customer_name: str = ""
-    customer_code: str = ""
-    confidence: int = 0
-    alternatives: List[Dict] = None
-    
-    def __post_init__(self):
-        if self.alternatives is None:
-            self.alternatives = []
-
-@dataclass
-class ParsedOrder:
-    """Represents a complete parsed order"""
-    customer: ParsedCustomer
-    items: List[ParsedItem]
-    raw_input: str
-    parsing_errors: List[str] = None
-    
-    def __post_init__(self):
-        if self.parsing_errors is None:
-            self.parsing_errors = []
+from abbreviation_index import AbbreviationIndex
+from db_pool import acquire_connection, discard_connection, release_connection
+from customer_context import CustomerContext, CustomerContextCache
+from fuzzy_scoring import batch_score_matches, score_matches
+from parser_cache import LookupCache, MISSING
+from parse_results import (CustomerAlternative, ParsedCustomer, ParsedItem, ParsedOrder,
+                           ParsedOrderSheet, ProductAlternative)
+from parse_tracing import NULL_TRACE, ParseMetrics, ParseTrace
 
 class ShorthandParser:
     """
@@ -66,18 +33,34 @@ class ShorthandParser:
     - 4rb = 4 pieces roast beef
     """
     
-    def __init__(self, db_config):
+    def __init__(self, db_config, abbreviation_index: Optional[AbbreviationIndex] = None,
+                 cache_size: int = 10000, cache_ttl: float = 300.0, tracing: bool = False,
+                 prefetch_context: bool = True):
         self.db_config = db_config
         self.connection = None
         self.logger = self._setup_logging()
         
+        # Per-stage tracing; while off, self.trace is a no-op NullTrace
+        self.tracing = tracing
+        self.trace = NULL_TRACE
+        self.metrics = ParseMetrics()
+        
+        # Optional in-memory index; when set, exact matches skip the database
+        self.abbreviation_index = abbreviation_index
+        
         # Parsing patterns
         self.customer_pattern = re.compile(r'^([a-zA-Z]+\d*)', re.IGNORECASE)
         self.product_pattern = re.compile(r'(\d+)([a-zA-Z]+)', re.IGNORECASE)
+        # ParsedItem.raw_input stores the quantity as a float, e.g. "2.0sm"
+        self.raw_item_pattern = re.compile(r'(\d+(?:\.\d+)?)([a-zA-Z]+)$', re.IGNORECASE)
+        
+        # Cache for performance (bounded, expiring, safe to share across threads)
+        self.customer_cache = LookupCache(maxsize=cache_size, ttl=cache_ttl)
+        self.product_cache = LookupCache(maxsize=cache_size, ttl=cache_ttl)
         
-        # Cache for performance
-        self.customer_cache = {}
-        self.product_cache = {}
+        # Whole product vocabularies of recently seen customers
+        self.prefetch_context = prefetch_context
+        self.customer_contexts = CustomerContextCache(ttl=cache_ttl)
 
     def _setup_logging(self):
         """Set up logging for debugging"""
@@ -85,16 +68,28 @@ class ShorthandParser:
         return logging.getLogger(__name__)
 
     def connect_database(self):
-        """Connect to the database"""
+        """Check out a connection from the shared pool (replacing any held now)"""
+        if self.connection is not None:
+            # Reconnecting after a drop: free the old connection's pool slot
+            discard_connection(self.connection)
+            self.connection = None
         try:
-            self.connection = mysql.connector.connect(**self.db_config)
+            self.connection = acquire_connection(self.db_config)
             if self.connection.is_connected():
                 self.logger.info("Connected to database successfully")
                 return True
         except Error as e:
-            self.logger.error(f"Database connection error: {e}")
+            self.logger.error("Database connection error: %s", e)
             return False
 
+    def load_abbreviation_index(self, refresh_interval: float = 30.0) -> bool:
+        """Bulk-load the abbreviation tables into an in-memory index"""
+        index = AbbreviationIndex(refresh_interval=refresh_interval)
+        if not index.load(self.connection):
+            return False
+        self.abbreviation_index = index
+        return True
+
     def parse_order(self, input_text: str) -> ParsedOrder:
         """
         Parse complete order input with customer and products
@@ -103,14 +98,158 @@ class ShorthandParser:
         - Double newline = new customer
         - Single newline = same customer, new product line
         """
-        self.logger.info(f"Parsing order input: {input_text[:50]}...")
+        self.logger.info("Parsing order input: %.50s...", input_text)
+        
+        trace = self._start_trace()
+        self._refresh_abbreviation_index()
         
         # Split by double newlines for multiple customers
-        customer_blocks = re.split(r'\n\n+', input_text.strip())
+        with trace.span('split'):
+            customer_blocks = re.split(r'\n\n+', input_text.strip())
+        
+        # Single customer entry uses the first block; whole sheets go
+        # through parse_order_sheet
+        return self._finish_trace(self._parse_customer_block(customer_blocks[0], input_text))
+
+    def parse_order_sheet(self, input_text: str, workers: int = 4) -> ParsedOrderSheet:
+        """
+        Parse a sheet with one customer block per blank-line-separated section.
         
-        # For now, handle single customer (first block)
-        customer_block = customer_blocks[0]
+        Blocks are spread over a thread pool. Each worker has its own database
+        connection but shares this parser's caches and abbreviation index, so
+        codes resolved for one block are warm for every other block.
+        """
+        start = time.perf_counter()
         
+        # Sheets touch most customers, so a full index pays for itself
+        if self.abbreviation_index is None:
+            self.load_abbreviation_index()
+        else:
+            self._refresh_abbreviation_index()
+        
+        blocks = [block for block in re.split(r'\n\n+', input_text.strip()) if block.strip()]
+        self.logger.info("Parsing order sheet: %d customer blocks, %d workers", len(blocks), workers)
+        
+        if workers <= 1 or len(blocks) <= 1:
+            orders = [self._parse_traced_block(block) for block in blocks]
+        else:
+            local = threading.local()
+            worker_parsers = []
+            lock = threading.Lock()
+            
+            def parse_block(block):
+                parser = getattr(local, 'parser', None)
+                if parser is None:
+                    parser = self._spawn_worker()
+                    local.parser = parser
+                    with lock:
+                        worker_parsers.append(parser)
+                return parser._parse_traced_block(block)
+            
+            try:
+                with ThreadPoolExecutor(max_workers=min(workers, len(blocks))) as pool:
+                    orders = list(pool.map(parse_block, blocks))
+            finally:
+                for parser in worker_parsers:
+                    parser.close_connection()
+        
+        sheet = ParsedOrderSheet(
+            orders=orders,
+            raw_input=input_text,
+            elapsed_seconds=time.perf_counter() - start
+        )
+        self.logger.info(
+            "Parsed %d blocks in %.3fs (%.1f blocks/sec)",
+            len(orders), sheet.elapsed_seconds, sheet.blocks_per_second
+        )
+        return sheet
+
+    def _spawn_worker(self) -> 'ShorthandParser':
+        """Create a connected parser sharing this parser's caches and index"""
+        worker = ShorthandParser(self.db_config, abbreviation_index=self.abbreviation_index,
+                                 tracing=self.tracing, prefetch_context=self.prefetch_context)
+        worker.customer_cache = self.customer_cache
+        worker.product_cache = self.product_cache
+        worker.customer_contexts = self.customer_contexts
+        worker.metrics = self.metrics
+        if not worker.connect_database():
+            raise ConnectionError("Order sheet worker could not connect to database")
+        return worker
+
+    def _parse_traced_block(self, block: str) -> ParsedOrder:
+        """Parse one order sheet block with its own trace"""
+        self._start_trace()
+        return self._finish_trace(self._parse_customer_block(block, block))
+
+    def _start_trace(self):
+        """Begin tracing a parse (a no-op NullTrace unless tracing is on)"""
+        self.trace = ParseTrace() if self.tracing else NULL_TRACE
+        return self.trace
+
+    def _finish_trace(self, parsed_order: ParsedOrder) -> ParsedOrder:
+        """Attach the finished trace to the result and add it to the metrics"""
+        trace = self.trace
+        self.trace = NULL_TRACE
+        if trace.enabled:
+            trace.finish()
+            parsed_order.trace = trace
+            self.metrics.record(trace)
+        return parsed_order
+
+    def _query(self, cursor, query: str, params=(), one: bool = False):
+        """Execute and fetch, counting the query and its round-trip time in the trace"""
+        if not self.trace.enabled:
+            cursor.execute(query, params)
+            return cursor.fetchone() if one else cursor.fetchall()
+        
+        start = time.perf_counter()
+        cursor.execute(query, params)
+        rows = cursor.fetchone() if one else cursor.fetchall()
+        self.trace.record_query(time.perf_counter() - start)
+        return rows
+
+    def metrics_snapshot(self) -> Dict:
+        """Aggregated stage timings and counters over every traced parse"""
+        return self.metrics.snapshot()
+
+    def _refresh_abbreviation_index(self) -> bool:
+        """Pick up abbreviation edits made since the index was loaded; True if it reloaded"""
+        if self.abbreviation_index is None:
+            return False
+        with self.trace.span('index_refresh'):
+            reloaded = self.abbreviation_index.refresh(self.connection)
+        if reloaded:
+            self._clear_lookup_caches()
+        return reloaded
+
+    def _clear_lookup_caches(self):
+        """Drop every cached lookup after the abbreviation index reloads"""
+        self.customer_cache.clear()
+        self.product_cache.clear()
+        self.customer_contexts.invalidate()
+
+    def _product_lines(self, lines: List[str]) -> List[str]:
+        """Product text of a customer block: rest of the customer line, then each non-empty line"""
+        first_line = lines[0].strip()
+        product_lines = []
+        
+        # Check if first line has products after customer code
+        customer_match = self.customer_pattern.match(first_line)
+        if customer_match:
+            remaining_first_line = first_line[customer_match.end():]
+            if remaining_first_line.strip():
+                product_lines.append(remaining_first_line)
+        
+        # Remaining lines are products
+        for line in lines[1:]:
+            line = line.strip()
+            if line:
+                product_lines.append(line)
+        
+        return product_lines
+
+    def _parse_customer_block(self, customer_block: str, raw_input: str) -> ParsedOrder:
+        """Parse one customer block: customer code line followed by product lines"""
         # Split by single newlines for customer + products
         lines = customer_block.split('\n')
         
@@ -118,7 +257,7 @@ class ShorthandParser:
             return ParsedOrder(
                 customer=ParsedCustomer("", confidence=0),
                 items=[],
-                raw_input=input_text,
+                raw_input=raw_input,
                 parsing_errors=["Empty input"]
             )
         
@@ -126,39 +265,66 @@ class ShorthandParser:
         first_line = lines[0].strip()
         
         # Parse customer from first line
-        customer = self.parse_customer(first_line)
+        with self.trace.span('customer'):
+            customer = self.parse_customer(first_line)
         
-        # Parse all product lines
-        items = []
-        parsing_errors = []
+        # Gather all product text so every code resolves in one batch
+        product_lines = self._product_lines(lines)
         
-        # Check if first line has products after customer code
-        customer_match = self.customer_pattern.match(first_line)
-        if customer_match:
-            remaining_first_line = first_line[customer_match.end():]
-            if remaining_first_line.strip():
-                # Parse products from remainder of first line
-                first_line_items, first_line_errors = self.parse_products(
-                    remaining_first_line, customer.customer_id
-                )
-                items.extend(first_line_items)
-                parsing_errors.extend(first_line_errors)
-        
-        # Parse remaining lines as products
-        for line in lines[1:]:
-            line = line.strip()
-            if line:
-                line_items, line_errors = self.parse_products(line, customer.customer_id)
-                items.extend(line_items)
-                parsing_errors.extend(line_errors)
+        with self.trace.span('products'):
+            items, parsing_errors = self._parse_product_lines(product_lines, customer.customer_id)
         
         return ParsedOrder(
             customer=customer,
             items=items,
-            raw_input=input_text,
+            raw_input=raw_input,
             parsing_errors=parsing_errors
         )
 
+    # Lookup SQL, shared with AsyncShorthandParser.
+    # abbreviation uses a case-insensitive collation, so no LOWER() in the
+    # WHERE clauses keeps idx_abbreviation usable
+    CUSTOMER_EXACT_QUERY = """
+    SELECT c.id, c.name, c.code, ca.confidence_score
+    FROM customers c
+    JOIN customer_abbreviations ca ON c.id = ca.customer_id
+    WHERE ca.abbreviation = %s
+    ORDER BY ca.confidence_score DESC, ca.usage_count DESC
+    LIMIT 1
+    """
+    
+    CUSTOMER_FUZZY_QUERY = """
+    SELECT c.id, c.name, c.code, ca.abbreviation, ca.confidence_score
+    FROM customers c
+    JOIN customer_abbreviations ca ON c.id = ca.customer_id
+    """
+    
+    PRODUCT_EXACT_QUERY = """
+    SELECT pa.abbreviation, p.id, p.item_code, p.description,
+           pa.confidence_score, u.code, u.id
+    FROM products p
+    JOIN product_abbreviations pa ON p.id = pa.product_id
+    LEFT JOIN uom u ON p.uom_id = u.id
+    WHERE pa.customer_id = %s
+    AND pa.abbreviation IN ({placeholders})
+    ORDER BY pa.confidence_score DESC, pa.usage_count DESC
+    """
+    
+    PRODUCT_FUZZY_QUERY = """
+    SELECT p.id, p.item_code, p.description, pa.abbreviation, 
+           pa.confidence_score, u.code, u.id
+    FROM products p
+    JOIN product_abbreviations pa ON p.id = pa.product_id
+    LEFT JOIN uom u ON p.uom_id = u.id
+    WHERE pa.customer_id = %s
+    """
+    
+    CUSTOMER_BY_ID_QUERY = "SELECT id, name, code FROM customers WHERE id = %s"
+
+    @property
+    def index_loaded(self) -> bool:
+        return self.abbreviation_index is not None and self.abbreviation_index.is_loaded
+
     def parse_customer(self, input_text: str) -> ParsedCustomer:
         """
         Parse customer code from input
@@ -171,292 +337,515 @@ class ShorthandParser:
             return ParsedCustomer(
                 raw_input=input_text,
                 confidence=0,
-                alternatives=[]
+                alternatives=()
             )
         
         customer_code = match.group(1).lower()
-        self.logger.info(f"Parsing customer code: {customer_code}")
+        self.logger.info("Parsing customer code: %s", customer_code)
         
-        # Check cache first
-        if customer_code in self.customer_cache:
-            cached = self.customer_cache[customer_code]
-            return ParsedCustomer(
-                raw_input=input_text,
-                customer_id=cached['id'],
-                customer_name=cached['name'],
-                customer_code=cached['code'],
-                confidence=cached['confidence']
-            )
+        cached = self._cached_customer(customer_code, input_text)
+        if cached is not None:
+            return cached
+        
+        trace = self.trace
         
         # Query database for customer
         try:
             cursor = self.connection.cursor()
             
-            # Direct match first
-            cursor.execute("""
-            SELECT c.id, c.name, c.code, ca.confidence_score
-            FROM customers c
-            JOIN customer_abbreviations ca ON c.id = ca.customer_id
-            WHERE LOWER(ca.abbreviation) = %s
-            ORDER BY ca.confidence_score DESC
-            LIMIT 1
-            """, (customer_code,))
-            
-            result = cursor.fetchone()
+            # Direct match first (from memory when the index is loaded)
+            with trace.span('customer_exact'):
+                if self.index_loaded:
+                    result = self._indexed_customer(customer_code)
+                else:
+                    result = self._query(cursor, self.CUSTOMER_EXACT_QUERY, (customer_code,), one=True)
             
             if result:
-                # Cache the result
-                self.customer_cache[customer_code] = {
-                    'id': result[0],
-                    'name': result[1], 
-                    'code': result[2],
-                    'confidence': result[3]
-                }
-                
-                return ParsedCustomer(
-                    raw_input=input_text,
-                    customer_id=result[0],
-                    customer_name=result[1],
-                    customer_code=result[2],
-                    confidence=result[3]
-                )
+                return self._resolved_customer(customer_code, input_text, result)
             
             # Fuzzy matching if no direct match
-            cursor.execute("""
-            SELECT c.id, c.name, c.code, ca.abbreviation, ca.confidence_score
-            FROM customers c
-            JOIN customer_abbreviations ca ON c.id = ca.customer_id
-            """)
-            
-            all_customers = cursor.fetchall()
-            alternatives = []
-            
-            for cust_id, name, code, abbr, conf in all_customers:
-                # Calculate similarity
-                similarity = fuzz.ratio(customer_code, abbr.lower())
-                if similarity > 60:  # Threshold for suggestions
-                    alternatives.append({
-                        'customer_id': cust_id,
-                        'name': name,
-                        'code': code,
-                        'abbreviation': abbr,
-                        'similarity': similarity,
-                        'confidence': conf
-                    })
+            with trace.span('customer_fuzzy'):
+                if self.index_loaded:
+                    alternatives = self._indexed_customer_alternatives(customer_code)
+                else:
+                    all_customers = self._query(cursor, self.CUSTOMER_FUZZY_QUERY)
+                    alternatives = self._score_customer_alternatives(customer_code, all_customers)
             
-            # Sort by similarity
-            alternatives.sort(key=lambda x: x['similarity'], reverse=True)
+            return self._unresolved_customer(customer_code, input_text, alternatives)
             
+        except Error as e:
+            self.logger.error("Database error in customer parsing: %s", e)
             return ParsedCustomer(
                 raw_input=input_text,
-                confidence=0,
-                alternatives=alternatives[:5]  # Top 5 suggestions
+                confidence=0
             )
-            
-        except Error as e:
-            self.logger.error(f"Database error in customer parsing: {e}")
+
+    def _cached_customer(self, customer_code: str, input_text: str) -> Optional[ParsedCustomer]:
+        """Customer from the cache (negative entries hold the fuzzy suggestions)"""
+        cached = self.customer_cache.get(customer_code)
+        if cached is MISSING:
+            self.trace.count('customer_cache_misses')
+            return None
+        
+        self.trace.count('customer_cache_hits')
+        if 'alternatives' in cached:
             return ParsedCustomer(
                 raw_input=input_text,
-                confidence=0
+                confidence=0,
+                alternatives=cached['alternatives']
             )
+        return ParsedCustomer(
+            raw_input=input_text,
+            customer_id=cached['id'],
+            customer_name=cached['name'],
+            customer_code=cached['code'],
+            confidence=cached['confidence']
+        )
+
+    def _indexed_customer(self, customer_code: str) -> Optional[Tuple]:
+        result = self.abbreviation_index.lookup_customer(customer_code)
+        self.trace.count('customer_index_hits' if result else 'customer_index_misses')
+        return result
+
+    def _indexed_customer_alternatives(self, customer_code: str) -> Tuple[CustomerAlternative, ...]:
+        """Indexed search only scores abbreviations sharing a q-gram"""
+        trace = self.trace
+        on_candidates = None
+        if trace.enabled:
+            on_candidates = lambda n: trace.count('customer_fuzzy_candidates', n)
+        return self.abbreviation_index.search_customers(
+            customer_code, threshold=60, limit=5, on_candidates=on_candidates
+        )
+
+    def _score_customer_alternatives(self, customer_code: str, all_customers) -> Tuple[CustomerAlternative, ...]:
+        """Top 5 suggestions above 60 from (id, name, code, abbreviation, confidence) rows"""
+        self.trace.count('customer_fuzzy_candidates', len(all_customers))
+        
+        # Score every abbreviation in one call
+        matches = score_matches(customer_code, [row[3].lower() for row in all_customers], 60, 5)
+        alternatives = []
+        for similarity, position in matches:
+            cust_id, name, code, abbr, conf = all_customers[position]
+            alternatives.append(CustomerAlternative(cust_id, name, code, abbr, similarity, conf))
+        return tuple(alternatives)
+
+    def _resolved_customer(self, customer_code: str, input_text: str, result) -> ParsedCustomer:
+        """Cache and return an exact match row: (id, name, code, confidence)"""
+        self.customer_cache.set(customer_code, {
+            'id': result[0],
+            'name': result[1], 
+            'code': result[2],
+            'confidence': result[3]
+        })
+        
+        return ParsedCustomer(
+            raw_input=input_text,
+            customer_id=result[0],
+            customer_name=result[1],
+            customer_code=result[2],
+            confidence=result[3]
+        )
+
+    def _unresolved_customer(self, customer_code: str, input_text: str, alternatives: Tuple[CustomerAlternative, ...]) -> ParsedCustomer:
+        """Remember the miss so a repeated typo skips the fuzzy scan"""
+        self.customer_cache.set(customer_code, {'alternatives': alternatives}, negative=True)
+        
+        return ParsedCustomer(
+            raw_input=input_text,
+            confidence=0,
+            alternatives=alternatives
+        )
 
     def parse_products(self, input_text: str, customer_id: int) -> Tuple[List[ParsedItem], List[str]]:
         """
         Parse product codes from input
         Examples: 1t2sm4rb -> [1 turkey, 2 salami, 4 roast beef]
         """
+        return self._parse_product_lines([input_text], customer_id)
+
+    def _parse_product_lines(self, lines: List[str], customer_id: int) -> Tuple[List[ParsedItem], List[str]]:
+        """
+        Parse several product lines with a single batched resolution.
+        Items and errors come back in the same order as parsing line by line.
+        """
+        return self._flatten_lines(self._resolve_product_lines(lines, customer_id))
+
+    @staticmethod
+    def _flatten_lines(results) -> Tuple[List[ParsedItem], List[str]]:
         items = []
         errors = []
+        for line_items, line_errors in results:
+            items.extend(line_items)
+            errors.extend(line_errors)
+        return items, errors
+
+    def _resolve_product_lines(self, lines: List[str], customer_id: int) -> List[Tuple[List[ParsedItem], List[str]]]:
+        """Batch-resolve several product lines, returning (items, errors) per line"""
+        line_matches, tokens = self._tokenize_lines(lines)
+        return self._assemble_lines(lines, line_matches, self.resolve_products(tokens, customer_id))
+
+    def _tokenize_lines(self, lines: List[str]):
+        """Find all quantity+product combinations on every line first"""
+        line_matches = []
+        tokens = []
+        with self.trace.span('tokenize'):
+            for line in lines:
+                matches = self.product_pattern.findall(line)
+                line_matches.append(matches)
+                if matches:
+                    self.logger.info("Found %d product codes: %s", len(matches), matches)
+                for quantity_str, product_code in matches:
+                    tokens.append((product_code, float(quantity_str)))
+        return line_matches, tokens
+
+    @staticmethod
+    def _assemble_lines(lines: List[str], line_matches, items: List[ParsedItem]):
+        """Hand resolved items back to their lines, with per-line errors"""
+        resolved = iter(items)
         
-        # Find all quantity+product combinations
-        matches = self.product_pattern.findall(input_text)
-        
-        if not matches:
-            errors.append(f"No products found in: {input_text}")
-            return items, errors
-        
-        self.logger.info(f"Found {len(matches)} product codes: {matches}")
-        
-        for quantity_str, product_code in matches:
-            try:
-                quantity = float(quantity_str)
-                item = self.parse_single_product(product_code, quantity, customer_id)
+        results = []
+        for line, matches in zip(lines, line_matches):
+            items = []
+            errors = []
+            if not matches:
+                errors.append(f"No products found in: {line}")
+            
+            for quantity_str, product_code in matches:
+                item = next(resolved)
                 items.append(item)
                 
                 if item.confidence == 0:
                     errors.append(f"Could not identify product: {quantity_str}{product_code}")
-                    
-            except ValueError:
-                errors.append(f"Invalid quantity: {quantity_str}")
+            
+            results.append((items, errors))
         
-        return items, errors
+        return results
 
     def parse_single_product(self, product_code: str, quantity: float, customer_id: int) -> ParsedItem:
         """
         Parse a single product code with customer context
         Examples: t -> turkey (for customer), sm -> salami
         """
-        product_code_lower = product_code.lower()
-        cache_key = f"{customer_id}_{product_code_lower}"
-        
-        # Check cache
-        if cache_key in self.product_cache:
-            cached = self.product_cache[cache_key]
-            return ParsedItem(
-                raw_input=f"{quantity}{product_code}",
-                quantity=quantity,
-                product_id=cached['id'],
-                product_name=cached['name'],
-                product_code=cached['code'],
-                confidence=cached['confidence'],
-                uom=cached['uom'],
-                uom_id=cached['uom_id']
-            )
+        return self.resolve_products([(product_code, quantity)], customer_id)[0]
+
+    def resolve_products(self, tokens: List[Tuple[str, float]], customer_id: int) -> List[ParsedItem]:
+        """
+        Resolve (product_code, quantity) tokens for one customer in a batch.
         
-        try:
-            cursor = self.connection.cursor()
-            
-            # Direct abbreviation match for this customer
-            cursor.execute("""
-            SELECT p.id, p.item_code, p.description, pa.confidence_score, u.code, u.id
-            FROM products p
-            JOIN product_abbreviations pa ON p.id = pa.product_id
-            LEFT JOIN uom u ON p.uom_id = u.id
-            WHERE pa.customer_id = %s 
-            AND LOWER(pa.abbreviation) = %s
-            ORDER BY pa.confidence_score DESC, pa.usage_count DESC
-            LIMIT 1
-            """, (customer_id, product_code_lower))
+        Exact matches come from the cache, the abbreviation index, or the
+        customer's prefetched context (abbreviations, then customer_items
+        nicknames). The context is one query per customer and stays warm
+        across requests, and the fuzzy fallback scores its rows without
+        another round trip. With prefetching off, remaining codes go through
+        one IN (...) query and one fetch of the abbreviation list instead.
+        Items are returned in the same order as the tokens.
+        """
+        resolved, alternatives, pending = self._known_products(tokens, customer_id)
+        trace = self.trace
+        
+        if pending and customer_id is not None:
+            try:
+                cursor = self.connection.cursor()
+                context = self._customer_context(cursor, customer_id) if self.prefetch_context else None
+                
+                if context is not None:
+                    pending = self._resolve_from_context(context, pending, customer_id, resolved)
+                elif not self.index_loaded:
+                    # One exact-match query for every code not already known
+                    with trace.span('product_exact'):
+                        rows = self._query(cursor, self._product_exact_query(len(pending)), [customer_id] + pending)
+                    pending = self._resolve_from_rows(rows, pending, customer_id, resolved)
+                
+                if pending:
+                    with trace.span('product_fuzzy'):
+                        if context is not None:
+                            fuzzy = self._score_product_alternatives(pending, context.fuzzy_rows)
+                        else:
+                            fuzzy = self._fuzzy_product_alternatives(cursor, pending, customer_id)
+                    self._remember_product_misses(customer_id, fuzzy)
+                    alternatives.update(fuzzy)
+                    
+            except Error as e:
+                self.logger.error("Database error in product parsing: %s", e)
+        
+        return self._build_items(tokens, resolved, alternatives)
+
+    def _known_products(self, tokens: List[Tuple[str, float]], customer_id: int):
+        """
+        Split distinct codes into resolved (cache or index hit), alternatives
+        (cached miss) and pending (needs the context or the database)
+        """
+        resolved = {}
+        alternatives = {}
+        pending = []
+        trace = self.trace
+        
+        for product_code, _ in tokens:
+            code = product_code.lower()
+            if code in resolved or code in alternatives or code in pending:
+                continue
             
-            result = cursor.fetchone()
+            cache_key = (customer_id, code)
+            cached = self.product_cache.get(cache_key)
+            if cached is not MISSING:
+                trace.count('product_cache_hits')
+                if 'alternatives' in cached:
+                    alternatives[code] = cached['alternatives']
+                else:
+                    resolved[code] = cached
+                continue
             
+            trace.count('product_cache_misses')
+            if self.index_loaded:
+                result = self.abbreviation_index.lookup_product(customer_id, code)
+                if result:
+                    trace.count('product_index_hits')
+                    resolved[code] = self._cache_product(cache_key, result)
+                else:
+                    trace.count('product_index_misses')
+                    pending.append(code)
+            else:
+                pending.append(code)
+        
+        return resolved, alternatives, pending
+
+    def _product_exact_query(self, count: int) -> str:
+        return self.PRODUCT_EXACT_QUERY.format(placeholders=', '.join(['%s'] * count))
+
+    def _resolve_from_context(self, context: CustomerContext, pending: List[str], customer_id: int,
+                              resolved: Dict) -> List[str]:
+        """Resolve pending codes from a customer context; returns what is still pending"""
+        for code in pending:
+            result = context.lookup(code)
             if result:
-                # Cache the result
-                self.product_cache[cache_key] = {
-                    'id': result[0],
-                    'code': result[1],
-                    'name': result[2],
-                    'confidence': result[3],
-                    'uom': result[4] or 'EA',
-                    'uom_id': result[5] or 1
-                }
-                
-                return ParsedItem(
+                resolved[code] = self._cache_product((customer_id, code), result)
+        return [code for code in pending if code not in resolved]
+
+    def _resolve_from_rows(self, rows, pending: List[str], customer_id: int, resolved: Dict) -> List[str]:
+        """Resolve pending codes from PRODUCT_EXACT_QUERY rows; returns what is still pending"""
+        for abbr, *result in rows:
+            code = abbr.lower()
+            # Rows are ranked, so the first one per code wins
+            if code not in resolved:
+                resolved[code] = self._cache_product((customer_id, code), result)
+        return [code for code in pending if code not in resolved]
+
+    def _remember_product_misses(self, customer_id: int, fuzzy: Dict[str, Tuple[ProductAlternative, ...]]):
+        for code, suggestions in fuzzy.items():
+            # Remember the miss so a repeated typo skips the fuzzy scan
+            self.product_cache.set((customer_id, code), {'alternatives': suggestions}, negative=True)
+
+    @staticmethod
+    def _build_items(tokens: List[Tuple[str, float]], resolved: Dict, alternatives: Dict) -> List[ParsedItem]:
+        """One ParsedItem per token, in token order"""
+        items = []
+        for product_code, quantity in tokens:
+            cached = resolved.get(product_code.lower())
+            if cached:
+                items.append(ParsedItem(
                     raw_input=f"{quantity}{product_code}",
                     quantity=quantity,
-                    product_id=result[0],
-                    product_code=result[1],
-                    product_name=result[2],
-                    confidence=result[3],
-                    uom=result[4] or 'EA',
-                    uom_id=result[5] or 1
-                )
-            
-            # Fuzzy matching against customer's product history
-            cursor.execute("""
-            SELECT p.id, p.item_code, p.description, pa.abbreviation, 
-                   pa.confidence_score, u.code, u.id
-            FROM products p
-            JOIN product_abbreviations pa ON p.id = pa.product_id
-            LEFT JOIN uom u ON p.uom_id = u.id
-            WHERE pa.customer_id = %s
-            """, (customer_id,))
-            
-            all_products = cursor.fetchall()
+                    product_id=cached['id'],
+                    product_name=cached['name'],
+                    product_code=cached['code'],
+                    confidence=cached['confidence'],
+                    uom=cached['uom'],
+                    uom_id=cached['uom_id']
+                ))
+            else:
+                items.append(ParsedItem(
+                    raw_input=f"{quantity}{product_code}",
+                    quantity=quantity,
+                    confidence=0,
+                    alternatives=alternatives.get(product_code.lower(), ())
+                ))
+        
+        return items
+
+    def _cache_product(self, cache_key: Tuple[int, str], result) -> Dict:
+        """Cache an exact match row: (id, item_code, description, confidence, uom, uom_id)"""
+        entry = {
+            'id': result[0],
+            'code': result[1],
+            'name': result[2],
+            'confidence': result[3],
+            'uom': result[4] or 'EA',
+            'uom_id': result[5] or 1
+        }
+        self.product_cache.set(cache_key, entry)
+        return entry
+
+    def _customer_context(self, cursor, customer_id: int) -> CustomerContext:
+        """A customer's resolution context, fetched in one query on first use"""
+        context = self._cached_context(customer_id)
+        if context is not None:
+            return context
+        
+        with self.trace.span('context_fetch'):
+            rows = self._query(cursor, CustomerContext.QUERY, (customer_id, customer_id))
+            context = CustomerContext(customer_id, rows)
+        self.customer_contexts.set(context)
+        return context
+
+    def _cached_context(self, customer_id: int) -> Optional[CustomerContext]:
+        context = self.customer_contexts.get(customer_id)
+        self.trace.count('context_hits' if context is not None else 'context_misses')
+        return context
+
+    def _fuzzy_product_alternatives(self, cursor, codes: List[str], customer_id: int) -> Dict[str, Tuple[ProductAlternative, ...]]:
+        """Score every unmatched code against the customer's product history in one pass"""
+        # Fuzzy matching against customer's product history
+        all_products = self._query(cursor, self.PRODUCT_FUZZY_QUERY, (customer_id,))
+        return self._score_product_alternatives(codes, all_products)
+
+    def _score_product_alternatives(self, codes: List[str], all_products) -> Dict[str, Tuple[ProductAlternative, ...]]:
+        """Top 5 suggestions per code from (id, item_code, desc, abbr, conf, uom, uom_id) rows"""
+        self.trace.count('product_fuzzy_candidates', len(all_products) * len(codes))
+        
+        # One similarity matrix for every unknown code (higher threshold for products)
+        abbreviations = [row[3].lower() for row in all_products]
+        results = {}
+        for code, matches in zip(codes, batch_score_matches(codes, abbreviations, 70, 5)):
             alternatives = []
-            
-            for prod_id, item_code, desc, abbr, conf, uom_code, uom_id in all_products:
-                similarity = fuzz.ratio(product_code_lower, abbr.lower())
-                if similarity > 70:  # Higher threshold for products
-                    alternatives.append({
-                        'product_id': prod_id,
-                        'item_code': item_code,
-                        'description': desc,
-                        'abbreviation': abbr,
-                        'similarity': similarity,
-                        'confidence': conf,
-                        'uom': uom_code or 'EA',
-                        'uom_id': uom_id or 1
-                    })
-            
-            # Sort by similarity
-            alternatives.sort(key=lambda x: x['similarity'], reverse=True)
-            
-            return ParsedItem(
-                raw_input=f"{quantity}{product_code}",
-                quantity=quantity,
-                confidence=0,
-                alternatives=alternatives[:5]
-            )
-            
-        except Error as e:
-            self.logger.error(f"Database error in product parsing: {e}")
-            return ParsedItem(
-                raw_input=f"{quantity}{product_code}",
-                quantity=quantity,
-                confidence=0
-            )
+            for similarity, position in matches:
+                prod_id, item_code, desc, abbr, conf, uom_code, uom_id = all_products[position]
+                alternatives.append(ProductAlternative(
+                    prod_id, item_code, desc, abbr, similarity, conf, uom_code or 'EA', uom_id or 1
+                ))
+            results[code] = tuple(alternatives)
+        
+        return results
+
+    def _fetch_customer(self, customer_id: int) -> Optional[Tuple]:
+        """(id, name, code) for a customer id, or None"""
+        cursor = self.connection.cursor()
+        return self._query(cursor, self.CUSTOMER_BY_ID_QUERY, (customer_id,), one=True)
 
     def reparse_with_customer(self, parsed_order: ParsedOrder, new_customer_id: int) -> ParsedOrder:
         """
         Reparse all products with new customer context - the magic feature!
         When customer is corrected, all products get re-interpreted
         """
-        self.logger.info(f"Re-parsing order with new customer ID: {new_customer_id}")
+        self.logger.info("Re-parsing order with new customer ID: %s", new_customer_id)
+        
+        trace = self._start_trace()
         
         # Get new customer info
         try:
-            cursor = self.connection.cursor()
-            cursor.execute("SELECT id, name, code FROM customers WHERE id = %s", (new_customer_id,))
-            customer_info = cursor.fetchone()
+            with trace.span('customer'):
+                customer_info = self._fetch_customer(new_customer_id)
             
             if not customer_info:
                 parsed_order.parsing_errors.append(f"Customer ID {new_customer_id} not found")
-                return parsed_order
-            
-            # Update customer
-            parsed_order.customer.customer_id = customer_info[0]
-            parsed_order.customer.customer_name = customer_info[1]
-            parsed_order.customer.customer_code = customer_info[2]
-            parsed_order.customer.confidence = 100
-            
-            # Re-parse all products with new customer context
-            reparsed_items = []
-            
-            for item in parsed_order.items:
-                # Extract original product code from raw input
-                match = self.product_pattern.match(item.raw_input)
-                if match:
-                    quantity_str, product_code = match.groups()
-                    quantity = float(quantity_str)
-                    
-                    # Re-parse with new customer context
-                    reparsed_item = self.parse_single_product(product_code, quantity, new_customer_id)
-                    reparsed_items.append(reparsed_item)
-                else:
-                    # Keep original if can't re-parse
-                    reparsed_items.append(item)
-            
-            parsed_order.items = reparsed_items
+                return self._finish_trace(parsed_order)
             
-            # Clear customer-related errors
-            parsed_order.parsing_errors = [
-                error for error in parsed_order.parsing_errors 
-                if 'customer' not in error.lower()
-            ]
+            self._apply_customer(parsed_order, customer_info)
             
-            self.logger.info(f"Successfully re-parsed {len(reparsed_items)} items with new customer context")
+            # Re-parse all products with new customer context in one batch
+            tokens, positions = self._reparse_tokens(parsed_order)
+            with trace.span('products'):
+                reparsed = self.resolve_products(tokens, new_customer_id)
+            self._apply_reparsed(parsed_order, positions, reparsed)
             
         except Exception as e:
-            self.logger.error(f"Error re-parsing with new customer: {e}")
+            self.logger.error("Error re-parsing with new customer: %s", e)
             parsed_order.parsing_errors.append(f"Error re-parsing: {e}")
         
-        return parsed_order
+        return self._finish_trace(parsed_order)
+
+    @staticmethod
+    def _apply_customer(parsed_order: ParsedOrder, customer_info: Tuple):
+        """Point the order at a corrected customer: (id, name, code)"""
+        parsed_order.customer.customer_id = customer_info[0]
+        parsed_order.customer.customer_name = customer_info[1]
+        parsed_order.customer.customer_code = customer_info[2]
+        parsed_order.customer.confidence = 100
+
+    def _reparse_tokens(self, parsed_order: ParsedOrder):
+        """(tokens, positions) for every item whose raw input can be re-parsed"""
+        tokens = []
+        positions = []
+        
+        for position, item in enumerate(parsed_order.items):
+            # Extract original product code from raw input ("2.0sm")
+            match = self.raw_item_pattern.match(item.raw_input)
+            if match:
+                quantity_str, product_code = match.groups()
+                tokens.append((product_code, float(quantity_str)))
+                positions.append(position)
+        
+        return tokens, positions
+
+    def _apply_reparsed(self, parsed_order: ParsedOrder, positions: List[int], reparsed: List[ParsedItem]):
+        # Keep original items that can't be re-parsed
+        reparsed_items = list(parsed_order.items)
+        for position, reparsed_item in zip(positions, reparsed):
+            reparsed_items[position] = reparsed_item
+        
+        parsed_order.items = reparsed_items
+        
+        # Clear customer-related errors
+        parsed_order.parsing_errors = [
+            error for error in parsed_order.parsing_errors 
+            if 'customer' not in error.lower()
+        ]
+        
+        self.logger.info("Successfully re-parsed %d items with new customer context", len(reparsed_items))
+
+    def invalidate_customer_abbreviations(self, abbreviation: str = None):
+        """Call after customers or customer_abbreviations change"""
+        if abbreviation is None:
+            self.customer_cache.clear()
+        else:
+            # A new or changed abbreviation can also turn any cached miss
+            # into a hit or change its suggestions
+            self.customer_cache.invalidate(abbreviation.lower())
+            self.customer_cache.invalidate_where(lambda key, value, negative: negative)
+        if self.abbreviation_index is not None:
+            self.abbreviation_index.invalidate()
+
+    def invalidate_product_abbreviations(self, customer_id: int = None):
+        """Call after product_abbreviations change (for one customer or all)"""
+        if customer_id is None:
+            self.product_cache.clear()
+        else:
+            self.product_cache.invalidate_where(lambda key, value, negative: key[0] == customer_id)
+        self.customer_contexts.invalidate(customer_id)
+        if self.abbreviation_index is not None:
+            self.abbreviation_index.invalidate()
+
+    def invalidate_customer_items(self, customer_id: int = None):
+        """Call after customer_items nicknames change (for one customer or all)"""
+        # Cached misses for the customer may now resolve through a nickname
+        if customer_id is None:
+            self.product_cache.clear()
+        else:
+            self.product_cache.invalidate_where(lambda key, value, negative: key[0] == customer_id)
+        self.customer_contexts.invalidate(customer_id)
+
+    def invalidate_product(self, product_id: int):
+        """Call after a product's description, item code or UOM changes"""
+        # Negative entries may list the product among their suggestions
+        self.product_cache.invalidate_where(
+            lambda key, value, negative: negative or value['id'] == product_id
+        )
+        self.customer_contexts.invalidate_product(product_id)
+        if self.abbreviation_index is not None:
+            self.abbreviation_index.invalidate()
+
+    def cache_stats(self) -> Dict[str, Dict]:
+        """Hit/miss/eviction counters for the lookup caches"""
+        return {
+            'customer_cache': self.customer_cache.stats(),
+            'product_cache': self.product_cache.stats(),
+            'customer_contexts': self.customer_contexts.stats()
+        }
 
     def close_connection(self):
-        """Close database connection"""
-        if self.connection and self.connection.is_connected():
-            self.connection.close()
+        """Hand the connection back to the shared pool"""
+        if self.connection is not None:
+            release_connection(self.connection)
+            self.connection = None
 
 # Test function
 def test_parser():
@@ -0,0 +1,204 @@
+"""
+Shared fixtures: the benchmark's synthetic catalogue in SQLite, with the order
+tables added and the few MySQL expressions the order code uses translated
+"""
+
+import os
+import re
+import sqlite3
+import sys
+from datetime import date, datetime, timedelta
+
+import pytest
+from mysql.connector import errors
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark_parser import StandInConnection, StandInCursor, SyntheticCatalog  # noqa: E402
+
+ORDER_SCHEMA = """
+CREATE TABLE orders (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_number TEXT UNIQUE,
+    customer_id INTEGER,
+    order_date DATE,
+    delivery_date DATE,
+    status TEXT DEFAULT 'draft',
+    order_method TEXT,
+    subtotal REAL,
+    total_amount REAL,
+    original_input TEXT,
+    idempotency_key TEXT UNIQUE,
+    delivered_date DATE,
+    delivered_at TIMESTAMP,
+    delivery_notes TEXT,
+    submitted_at TIMESTAMP,
+    archived_at TIMESTAMP,
+    created_at TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE order_items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_id INTEGER,
+    product_id INTEGER,
+    item_code TEXT,
+    product_name TEXT,
+    quantity REAL,
+    delivered_quantity REAL,
+    uom_id INTEGER,
+    unit_price REAL,
+    line_total REAL,
+    customer_reference TEXT,
+    parsed_from TEXT,
+    line_number INTEGER
+);
+CREATE TABLE order_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_id INTEGER,
+    old_status TEXT,
+    new_status TEXT,
+    changed_by TEXT,
+    change_notes TEXT
+);
+CREATE TABLE order_captures (
+    capture_id TEXT PRIMARY KEY,
+    order_id INTEGER,
+    captured_at TIMESTAMP
+);
+CREATE TABLE product_learning_queue (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_id INTEGER
+);
+CREATE TABLE sales_daily_customer_product (
+    customer_id INTEGER, sales_date DATE, product_id INTEGER,
+    quantity REAL, delivered_quantity REAL, revenue REAL, orders INTEGER,
+    PRIMARY KEY (customer_id, sales_date, product_id)
+);
+CREATE TABLE sales_weekly_product (
+    product_id INTEGER, week_start DATE,
+    quantity REAL, delivered_quantity REAL, revenue REAL, orders INTEGER, customers INTEGER,
+    PRIMARY KEY (product_id, week_start)
+);
+CREATE TABLE sales_rollup_orders (
+    order_id INTEGER PRIMARY KEY, customer_id INTEGER, sales_date DATE
+);
+CREATE TABLE sales_rollup_state (
+    name TEXT PRIMARY KEY, high_water_mark TIMESTAMP, last_order_id INTEGER
+);
+"""
+
+# MySQL-only syntax used by the order code -> SQLite
+TRANSLATIONS = [
+    (re.compile(r'DATE_SUB\((\w+), INTERVAL WEEKDAY\(\1\) DAY\)'), r'week_start(\1)'),
+    (re.compile(r'NOW\(\) - INTERVAL %s SECOND'), "datetime('now', 'localtime', '-' || %s || ' seconds')"),
+    (re.compile(r'\bNOW\(\)'), "datetime('now', 'localtime')"),
+    (re.compile(r'\bFOR UPDATE\b'), ''),
+    (re.compile(r'ON DUPLICATE KEY UPDATE'), 'ON CONFLICT DO UPDATE SET'),
+    (re.compile(r'\bVALUES\((\w+)\)'), r'excluded.\1'),
+]
+
+
+def _week_start(value):
+    day = date.fromisoformat(str(value)[:10])
+    return (day - timedelta(days=day.weekday())).isoformat()
+
+
+_DATE = re.compile(r'\d{4}-\d\d-\d\d')
+_DATETIME = re.compile(r'\d{4}-\d\d-\d\d \d\d:\d\d:\d\d')
+
+
+def _mysql_value(value):
+    """Dates come back from MySQL as date/datetime even out of MIN() and NOW()"""
+    if isinstance(value, str):
+        if _DATE.fullmatch(value):
+            return date.fromisoformat(value)
+        if _DATETIME.fullmatch(value):
+            return datetime.fromisoformat(value)
+    return value
+
+
+def _translate(query: str) -> str:
+    for pattern, replacement in TRANSLATIONS:
+        query = pattern.sub(replacement, query)
+    return query
+
+
+def _mysql_error(error: sqlite3.Error) -> errors.Error:
+    """The mysql.connector error (and errno) MySQL would have raised"""
+    message = str(error)
+    if isinstance(error, sqlite3.IntegrityError):
+        return errors.IntegrityError(msg=message, errno=1062)
+    if 'no such table' in message:
+        return errors.ProgrammingError(msg=message, errno=1146)
+    if 'no such column' in message or 'has no column' in message:
+        return errors.ProgrammingError(msg=message, errno=1054)
+    return errors.DatabaseError(msg=message)
+
+
+class MySQLStandInCursor(StandInCursor):
+    def execute(self, query, params=()):
+        try:
+            super().execute(_translate(query), params)
+        except sqlite3.Error as e:
+            raise _mysql_error(e) from e
+
+    def executemany(self, query, seq_params):
+        try:
+            super().executemany(_translate(query), seq_params)
+        except sqlite3.Error as e:
+            raise _mysql_error(e) from e
+
+    def _row(self, row):
+        if row is not None:
+            row = tuple(_mysql_value(value) for value in row)
+        return super()._row(row)
+
+
+class MySQLStandInConnection(StandInConnection):
+    def cursor(self, dictionary: bool = False, **kwargs):
+        return MySQLStandInCursor(self, dictionary)
+
+
+def _adapt_datetime(value: datetime) -> str:
+    return value.isoformat(' ', 'seconds')
+
+
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, _adapt_datetime)
+
+
+@pytest.fixture(scope='session')
+def catalog():
+    """Small synthetic catalogue (customers, products, abbreviations)"""
+    return SyntheticCatalog(40, 800, seed=7)
+
+
+@pytest.fixture
+def order_db(catalog):
+    """A fresh copy of the catalogue with the order tables, as a MySQL-style connection"""
+    db = sqlite3.connect(':memory:', check_same_thread=False)
+    catalog.db.backup(db)
+    db.executescript(ORDER_SCHEMA)
+    db.create_function('week_start', 1, _week_start)
+    yield MySQLStandInConnection(db)
+    db.close()
+
+
+@pytest.fixture
+def parser(catalog):
+    from shorthand_parser import ShorthandParser
+
+    shorthand_parser = ShorthandParser({})
+    shorthand_parser.connection = catalog.connection()
+    return shorthand_parser
+
+
+@pytest.fixture
+def manager(order_db, monkeypatch):
+    """OrderManager on order_db, numbering orders by scanning (no sequence table)"""
+    from order_manager import OrderManager
+
+    order_manager = OrderManager({})
+    monkeypatch.setattr(order_manager, 'generate_order_number', order_manager._scan_order_number)
+    order_manager.connection = order_db
+    return order_manager
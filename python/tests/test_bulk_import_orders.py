@@ -0,0 +1,45 @@
+import bulk_import_orders
+from order_manager import OrderManager
+from shorthand_parser import ShorthandParser
+
+
+def test_identical_orders_in_one_import_are_saved_separately(catalog, order_db, monkeypatch, tmp_path):
+    def connect_parser(parser):
+        parser.connection = order_db
+        return True
+
+    def connect_manager(manager):
+        manager.connection = order_db
+        return True
+
+    monkeypatch.setattr(ShorthandParser, 'connect_database', connect_parser)
+    monkeypatch.setattr(OrderManager, 'connect_database', connect_manager)
+    monkeypatch.setattr(OrderManager, 'generate_order_number', OrderManager._scan_order_number)
+
+    # A standing order: the same text for the same customer, twice in one file
+    codes = catalog.product_codes[1]
+    standing_order = f"{catalog.customer_codes[1]}\n3{codes[0]}\n2{codes[1]}"
+    (tmp_path / 'orders.txt').write_text(f"{standing_order}\n\n{standing_order}\n", encoding='utf-8')
+
+    report = bulk_import_orders.import_orders([str(tmp_path)], {}, workers=1, use_index=False,
+                                              review_path=str(tmp_path / 'review.jsonl'))
+
+    assert report['saved'] == 2 and report['review'] == 0
+    cursor = order_db.cursor()
+    cursor.execute("SELECT id, customer_id FROM orders ORDER BY id")
+    orders = cursor.fetchall()
+    assert len(orders) == 2
+    assert orders[0][0] != orders[1][0]
+    assert orders[0][1] == orders[1][1] == 1
+
+
+def test_save_orders_dedupes_on_caller_keys_only(manager, parser, catalog):
+    codes = catalog.product_codes[2]
+    parsed_order = parser.parse_order(f"{catalog.customer_codes[2]}\n4{codes[0]}")
+
+    first, second = manager.save_orders([parsed_order, parsed_order])
+    assert first != second
+
+    keyed = manager.save_orders([parsed_order, parsed_order], idempotency_keys=['route-7', 'route-7'])
+    assert keyed[0] == keyed[1] not in (first, second)
+    assert manager.save_orders([parsed_order], idempotency_keys=['route-7']) == [keyed[0]]
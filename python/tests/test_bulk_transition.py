@@ -0,0 +1,51 @@
+from datetime import date
+
+import pytest
+
+
+@pytest.fixture
+def orders(order_db):
+    cursor = order_db.cursor()
+    cursor.executemany(
+        "INSERT INTO orders (id, order_number, customer_id, order_date, delivery_date, status) "
+        "VALUES (%s, %s, %s, %s, %s, %s)",
+        [(1, 'B-1', 1, date(2024, 6, 1), None, 'submitted'),
+         (2, 'B-2', 2, date(2024, 6, 1), None, 'processing'),
+         (3, 'B-3', 3, date(2024, 6, 1), date(2024, 6, 7), 'submitted'),
+         (4, 'B-4', 4, date(2024, 6, 1), None, 'draft'),
+         (5, 'B-5', 5, date(2024, 6, 1), None, 'delivered')])
+    order_db.commit()
+    return order_db
+
+
+def statuses(connection):
+    cursor = connection.cursor()
+    cursor.execute("SELECT id, status, delivery_date FROM orders ORDER BY id")
+    return {order_id: (status, delivery_date) for order_id, status, delivery_date in cursor.fetchall()}
+
+
+def test_start_delivery_by_status_picks_orders_without_a_delivery_date(manager, orders):
+    results = manager.bulk_transition('start_delivery')
+
+    assert [result['order_id'] for result in results] == [1, 2, 3]
+    assert all(result['success'] for result in results)
+    after = statuses(orders)
+    assert after[1] == after[2] == ('out_for_delivery', date.today())
+    assert after[3] == ('out_for_delivery', date.today())
+    assert after[4][0] == 'draft' and after[5][0] == 'delivered'
+
+
+def test_start_delivery_by_date_filters_on_that_date(manager, orders):
+    results = manager.bulk_transition('start_delivery', delivery_date=date(2024, 6, 7))
+
+    assert [result['order_id'] for result in results] == [3]
+    assert statuses(orders)[3] == ('out_for_delivery', date(2024, 6, 7))
+    assert statuses(orders)[1][0] == 'submitted'
+
+
+def test_submit_only_moves_drafts(manager, orders):
+    results = {result['order_id']: result for result in manager.bulk_transition('submit', order_ids=[4, 5])}
+
+    assert results[4]['success'] and not results[5]['success']
+    assert statuses(orders)[4][0] == 'submitted'
+    assert statuses(orders)[5][0] == 'delivered'
@@ -0,0 +1,59 @@
+import mysql.connector
+import pytest
+from mysql.connector import errors
+
+import db_pool
+from order_manager import OrderManager
+from shorthand_parser import ShorthandParser
+
+
+class FakeConnection:
+    def __init__(self):
+        self.alive = True
+        self.closed = False
+        self.in_transaction = False
+
+    def is_connected(self):
+        return self.alive
+
+    def ping(self, reconnect=False, **kwargs):
+        if not self.alive:
+            raise errors.InterfaceError(msg="MySQL server has gone away")
+
+    def reconnect(self, attempts=1, delay=0):
+        raise errors.InterfaceError(msg="Can't connect to MySQL server")
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def pool_config(monkeypatch):
+    monkeypatch.setattr(mysql.connector, 'connect', lambda **config: FakeConnection())
+    config = {'host': 'pool-test', 'database': 'orders'}
+    pool = db_pool.get_pool(config, size=2)
+    pool.timeout = 0.1
+    yield config
+    db_pool.close_pools()
+
+
+@pytest.mark.parametrize('component', [ShorthandParser, OrderManager])
+def test_reconnecting_frees_the_dropped_connection(pool_config, component):
+    pool = db_pool.get_pool(pool_config)
+    holder = component(pool_config)
+
+    # More outages than the pool has connections
+    for _ in range(pool.size + 2):
+        assert holder.connect_database()
+        holder.connection.alive = False
+        assert not pool.ping(holder.connection)
+
+    dropped = holder.connection
+    assert holder.connect_database()
+    assert dropped.closed
+    assert pool.stats()['in_use'] == 1
+    holder.close_connection()
+    assert pool.stats()['in_use'] == 0
@@ -0,0 +1,40 @@
+import random
+
+import pytest
+
+from fuzzy_index import FuzzyIndex, _random_typo
+from fuzzy_scoring import score_matches
+
+
+def full_scan(entries, query, threshold, limit):
+    """Every entry scored, no prefilter"""
+    matches = score_matches(query, [key for key, _ in entries], threshold, limit)
+    return [(similarity, entries[position][1]) for similarity, position in matches]
+
+
+@pytest.fixture(scope='module')
+def abbreviation_entries(catalog):
+    cursor = catalog.db.cursor()
+    cursor.execute("SELECT abbreviation, customer_id FROM customer_abbreviations ORDER BY id")
+    customers = [(abbreviation.lower(), customer_id) for abbreviation, customer_id in cursor.fetchall()]
+    cursor.execute("SELECT DISTINCT abbreviation FROM product_abbreviations ORDER BY abbreviation")
+    products = [(abbreviation.lower(), position) for position, (abbreviation,) in enumerate(cursor.fetchall())]
+    return customers, products
+
+
+@pytest.mark.parametrize('threshold', [50, 60, 75])
+def test_search_matches_full_scan_on_catalogue(abbreviation_entries, threshold):
+    rng = random.Random(threshold)
+    for entries in abbreviation_entries:
+        index = FuzzyIndex(entries)
+        queries = [_random_typo(rng.choice(entries)[0], rng) for _ in range(300)]
+        queries += [key for key, _ in rng.sample(entries, 50)]
+        for query in queries:
+            assert index.search(query, threshold, 5) == full_scan(entries, query, threshold, 5), query
+
+
+def test_entry_sharing_no_qgram_is_still_found():
+    # 'bcegh' shares no bigram with the query but scores 62 against it
+    entries = [('bcegh', 1), ('zzzzzzzzz', 2)]
+    assert FuzzyIndex(entries).candidates('xbxcxexgxhx', 60) == []
+    assert FuzzyIndex(entries).search('xbxcxexgxhx', 60) == [(62, 1)]
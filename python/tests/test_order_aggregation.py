@@ -0,0 +1,111 @@
+import sqlite3
+from datetime import date
+
+import pytest
+
+from order_aggregation import (DEMAND_STATUSES, PRODUCT_COLUMNS, VENDOR_COLUMNS, OrderAggregator,
+                               report_rows)
+
+DELIVERY_DAY = date(2024, 6, 3)
+
+
+@pytest.fixture
+def demand_db(order_db):
+    """Orders around one delivery day; products 1-3 (vendors 1-3), 25 (vendor 0), 26 (vendor 1)"""
+    cursor = order_db.cursor()
+    orders = [
+        # id, customer, order date, delivery date, status
+        (1, 1, date(2024, 6, 1), DELIVERY_DAY, 'submitted'),
+        (2, 2, date(2024, 6, 2), DELIVERY_DAY, 'processing'),
+        (3, 3, DELIVERY_DAY, None, 'submitted'),             # no delivery date yet: counts by order date
+        (4, 4, DELIVERY_DAY, date(2024, 6, 5), 'submitted'),  # delivered another day
+        (5, 5, date(2024, 6, 1), DELIVERY_DAY, 'draft'),      # not submitted
+        (6, 6, date(2024, 6, 1), DELIVERY_DAY, 'delivered'),
+    ]
+    cursor.executemany(
+        "INSERT INTO orders (id, customer_id, order_date, delivery_date, status) VALUES (%s, %s, %s, %s, %s)",
+        orders)
+    items = [
+        # order, product, uom, quantity, delivered, line total
+        (1, 1, 1, 2, None, 10.0),
+        (1, 26, 4, 1, None, 40.0),
+        (2, 1, 1, 3, None, 15.0),
+        (2, 2, 3, 5, None, 12.5),
+        (3, 25, 1, 4, None, 8.0),
+        (4, 1, 1, 100, None, 500.0),
+        (5, 1, 1, 100, None, 500.0),
+        (6, 3, 2, 6, 6, 30.0),
+    ]
+    cursor.executemany(
+        "INSERT INTO order_items (order_id, product_id, uom_id, quantity, delivered_quantity, line_total) "
+        "VALUES (%s, %s, %s, %s, %s, %s)", items)
+    order_db.commit()
+    return order_db
+
+
+def by_product(rows):
+    return {row['product_id']: row for row in rows}
+
+
+def test_product_demand_filters_by_date_and_status(demand_db):
+    products = by_product(OrderAggregator(demand_db).product_demand(DELIVERY_DAY))
+
+    assert set(products) == {1, 2, 25, 26}
+    assert products[1]['quantity'] == 5.0 and products[1]['orders'] == 2 and products[1]['customers'] == 2
+    assert products[1]['total_amount'] == 25.0 and products[1]['uom'] == 'EA'
+    assert products[25]['quantity'] == 4.0
+    assert products[26]['vendor'] == 'Vendor 1' and products[26]['uom'] == 'CS'
+
+
+def test_product_demand_date_range_and_history(demand_db):
+    aggregator = OrderAggregator(demand_db)
+    week = by_product(aggregator.product_demand(date(2024, 6, 3), date(2024, 6, 9)))
+    assert week[1]['quantity'] == 105.0 and week[1]['orders'] == 3
+
+    assert aggregator.product_demand(date(2024, 6, 1), date(2024, 6, 2)) == []
+
+    history = by_product(aggregator.product_demand(DELIVERY_DAY, statuses=DEMAND_STATUSES))
+    assert history[3]['delivered_quantity'] == 6.0
+    assert 3 not in by_product(aggregator.product_demand(DELIVERY_DAY))
+
+
+def test_product_demand_closes_its_cursor(demand_db, monkeypatch):
+    opened = []
+    open_cursor = demand_db.cursor
+
+    def cursor(*args, **kwargs):
+        opened.append(open_cursor(*args, **kwargs))
+        return opened[-1]
+
+    monkeypatch.setattr(demand_db, 'cursor', cursor)
+    OrderAggregator(demand_db).product_demand(DELIVERY_DAY)
+
+    assert len(opened) == 1
+    with pytest.raises(sqlite3.ProgrammingError):
+        opened[0]._cursor.execute("SELECT 1")
+
+
+def test_vendor_purchase_list_rolls_up_by_vendor(demand_db):
+    products = OrderAggregator(demand_db).product_demand(DELIVERY_DAY)
+    vendors = {vendor['vendor']: vendor for vendor in OrderAggregator.vendor_purchase_list(products)}
+
+    assert set(vendors) == {'Vendor 0', 'Vendor 1', 'Vendor 2'}
+    assert vendors['Vendor 1']['products'] == 2
+    assert vendors['Vendor 1']['quantities'] == {'EA': 5.0, 'CS': 1.0}
+    assert vendors['Vendor 1']['total_amount'] == 65.0
+    assert [item['item_code'] for item in vendors['Vendor 1']['items']] == ['ITEM000001', 'ITEM000026']
+    assert vendors['Vendor 2']['quantities'] == {'LB': 5.0}
+
+
+def test_report_rows(demand_db):
+    report = OrderAggregator(demand_db).pick_list(DELIVERY_DAY)
+    assert report['start'] == report['end'] == '2024-06-03'
+
+    product_rows = report_rows(report, 'products')
+    assert len(product_rows) == 4
+    assert all(list(row) == PRODUCT_COLUMNS for row in product_rows)
+
+    vendor_rows = {row['vendor']: row for row in report_rows(report, 'vendors')}
+    assert all(list(row) == VENDOR_COLUMNS for row in vendor_rows.values())
+    assert vendor_rows['Vendor 1']['quantities'] == '1 CS, 5 EA'
+    assert vendor_rows['Vendor 1']['total_amount'] == 65.0
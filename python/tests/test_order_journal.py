@@ -0,0 +1,158 @@
+import json
+import threading
+
+import pytest
+
+from order_journal import OrderJournal
+from order_manager import OrderManager
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return str(tmp_path / 'capture.jsonl')
+
+
+@pytest.fixture
+def journaled(manager, journal_path):
+    manager.journal = OrderJournal(journal_path, fsync=False)
+    yield manager
+    manager.journal.close()
+
+
+@pytest.fixture
+def parsed_orders(parser, catalog):
+    return [parser.parse_order(f"{catalog.customer_codes[cid]}\n{cid}{catalog.product_codes[cid][0]}")
+            for cid in (1, 2, 3)]
+
+
+def drain_all(manager) -> int:
+    drained = 0
+    while True:
+        count = manager.drain_journal()
+        if not count:
+            return drained
+        drained += count
+
+
+def order_count(connection) -> int:
+    cursor = connection.cursor()
+    cursor.execute("SELECT COUNT(*) FROM orders")
+    return cursor.fetchone()[0]
+
+
+def rejected(journal_path):
+    with open(journal_path + '.rejected', encoding='utf-8') as handle:
+        return [json.loads(line) for line in handle]
+
+
+def test_replay_after_crash_skips_saved_orders(journaled, journal_path, parsed_orders, order_db):
+    capture_ids = [journaled.save_order(parsed_order) for parsed_order in parsed_orders]
+    entries = journaled.journal.read_pending()
+    journaled._save_captures([entry for _, entry in entries])
+
+    # Crash after the commit, before the offset moved: a new process replays it all
+    journaled.journal.close()
+    journaled.journal = OrderJournal(journal_path, fsync=False)
+    assert journaled.journal.pending_bytes() > 0
+    assert drain_all(journaled) == 3
+
+    assert order_count(order_db) == 3
+    assert all(journaled.resolve_capture(capture_id) for capture_id in capture_ids)
+    assert journaled.journal.pending_bytes() == 0
+
+
+def test_torn_last_line_is_dropped_on_open(journaled, journal_path, parsed_orders, order_db):
+    journaled.save_order(parsed_orders[0])
+    journaled.journal.close()
+    with open(journal_path, 'ab') as handle:
+        handle.write(b'{"capture_id": "half-writ')
+
+    journaled.journal = OrderJournal(journal_path, fsync=False)
+    assert drain_all(journaled) == 1
+    assert order_count(order_db) == 1
+
+
+def test_malformed_entries_are_set_aside(journaled, journal_path, parsed_orders, order_db):
+    journaled.save_order(parsed_orders[0])
+    bad_date = dict(journaled.journal.read_pending()[0][1], capture_id='b' * 32, captured_at='yesterday')
+    with open(journal_path, 'a', encoding='utf-8') as handle:
+        handle.write('not json\n')
+        handle.write('{"capture_id": "no order"}\n')
+        handle.write(json.dumps(bad_date) + '\n')
+    journaled.save_order(parsed_orders[1])
+
+    assert drain_all(journaled) == 5
+    assert order_count(order_db) == 2
+    assert [entry.get('capture_id') for entry in rejected(journal_path)] == [None, None, 'b' * 32]
+    assert journaled.journal.pending_bytes() == 0
+
+
+def test_key_clash_with_live_save_resolves_to_that_order(journaled, parsed_orders, order_db, monkeypatch):
+    capture_id = journaled.save_order(parsed_orders[0], idempotency_key='web-42')
+
+    # The live save commits between the writer's lookup and its insert
+    live = OrderManager({})
+    live.connection = order_db
+    monkeypatch.setattr(live, 'generate_order_number', live._scan_order_number)
+    live_order_id = live.save_order(parsed_orders[0], idempotency_key='web-42')
+    lookup = journaled._find_saved_orders
+    calls = []
+
+    def stale_lookup(keys):
+        # Stale for the batch and for the first one-at-a-time attempt
+        calls.append(keys)
+        return {} if len(calls) <= 2 else lookup(keys)
+
+    monkeypatch.setattr(journaled, '_find_saved_orders', stale_lookup)
+    assert drain_all(journaled) == 1
+    assert journaled.resolve_capture(capture_id) == live_order_id
+    assert order_count(order_db) == 1
+
+
+def test_second_journal_object_sees_truncation(journaled, journal_path, parsed_orders, order_db):
+    # The application appends; `--drain-journal` drains from its own OrderJournal
+    drainer = OrderManager({})
+    drainer.connection = order_db
+    drainer.generate_order_number = drainer._scan_order_number
+    drainer.journal = OrderJournal(journal_path, fsync=False)
+
+    journaled.save_order(parsed_orders[0])
+    journaled.save_order(parsed_orders[1])
+    assert journaled.drain_journal(batch_size=1) == 1
+    assert drain_all(drainer) == 1
+
+    # The drainer truncated the file; the application's next drain starts over at 0
+    journaled.save_order(parsed_orders[2])
+    assert journaled.drain_journal() == 1
+    assert order_count(order_db) == 3
+    drainer.journal.close()
+
+
+def test_writer_survives_unexpected_errors(journaled, parsed_orders, order_db, monkeypatch):
+    def connect(manager):
+        manager.connection = order_db
+        return True
+
+    monkeypatch.setattr(OrderManager, 'connect_database', connect)
+    monkeypatch.setattr(OrderManager, 'close_connection', lambda manager: None)
+    monkeypatch.setattr(OrderManager, 'generate_order_number', OrderManager._scan_order_number)
+    read_pending = journaled.journal.read_pending
+    failures = []
+
+    def flaky_read(max_entries=100):
+        if not failures:
+            failures.append(1)
+            raise ValueError("simulated bug")
+        return read_pending(max_entries)
+
+    monkeypatch.setattr(journaled.journal, 'read_pending', flaky_read)
+    journaled.save_order(parsed_orders[0])
+    stop = journaled.start_journal_writer(interval=0.01)
+    try:
+        for _ in range(200):
+            if order_count(order_db):
+                break
+            threading.Event().wait(0.01)
+    finally:
+        stop.set()
+    assert failures and order_count(order_db) == 1
@@ -0,0 +1,25 @@
+from order_keys import DEFAULT_DEDUPE_WINDOW, order_idempotency_keys
+
+WINDOW = DEFAULT_DEDUPE_WINDOW
+
+
+def matches(first_at, repeat_at):
+    """Would a repeat at repeat_at find the key stored by a save at first_at?"""
+    stored = order_idempotency_keys(7, "g18\n2sm", at=first_at)[0]
+    return stored in order_idempotency_keys(7, "g18  \n2SM", at=repeat_at)
+
+
+def test_repeat_within_one_window_is_always_caught():
+    bucket_start = 1000 * WINDOW
+    for offset in (0, 1, WINDOW // 2, WINDOW - 1):
+        first_at = bucket_start + offset
+        assert matches(first_at, first_at + WINDOW - 1)
+
+
+def test_repeat_can_be_caught_up_to_two_windows_apart():
+    bucket_start = 1000 * WINDOW
+    # Saved at the start of a bucket: caught until the end of the next one
+    assert matches(bucket_start, bucket_start + 2 * WINDOW - 1)
+    assert not matches(bucket_start, bucket_start + 2 * WINDOW)
+    # Saved at the end of a bucket: only caught for one window
+    assert not matches(bucket_start + WINDOW - 1, bucket_start + 2 * WINDOW)
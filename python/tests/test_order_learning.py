@@ -0,0 +1,106 @@
+import threading
+
+import pytest
+from mysql.connector import errors
+
+from order_manager import OrderManager
+
+
+@pytest.fixture
+def delivered_orders(order_db):
+    cursor = order_db.cursor()
+    for order_id in (1, 2):
+        cursor.execute("INSERT INTO orders (id, order_number, customer_id, order_date, status) "
+                       "VALUES (%s, %s, 1, '2024-06-03', 'out_for_delivery')", (order_id, f"T-{order_id}"))
+        cursor.execute("INSERT INTO order_items (order_id, product_id, quantity, line_total) "
+                       "VALUES (%s, 5, 2, 10)", (order_id,))
+    order_db.commit()
+    return order_db
+
+
+def count(connection, query):
+    cursor = connection.cursor()
+    cursor.execute(query)
+    return cursor.fetchone()[0]
+
+
+def test_failed_learning_keeps_the_queue(manager, delivered_orders, monkeypatch):
+    manager.defer_learning = True
+    assert manager.complete_delivery(1) and manager.complete_delivery(2)
+    assert count(delivered_orders, "SELECT COUNT(*) FROM product_learning_queue") == 2
+
+    # The learning statements fail
+    delivered_orders.cursor().execute("DROP TABLE customer_items")
+    assert manager.apply_learning_queue() == 0
+    assert count(delivered_orders, "SELECT COUNT(*) FROM product_learning_queue") == 2
+
+    monkeypatch.setattr(manager, '_update_customer_product_frequency', lambda order_ids: None)
+    assert manager.apply_learning_queue() == 2
+    assert count(delivered_orders, "SELECT COUNT(*) FROM product_learning_queue") == 0
+
+
+def test_delivery_is_recorded_when_learning_fails(manager, delivered_orders):
+    delivered_orders.cursor().execute("DROP TABLE customer_items")
+    assert manager.complete_delivery(1) is True
+    assert count(delivered_orders, "SELECT status FROM orders WHERE id = 1") == 'delivered'
+    assert count(delivered_orders, "SELECT COUNT(*) FROM order_history WHERE order_id = 1") == 1
+
+    # Deferred: a queue that can't be written doesn't block the delivery either
+    manager.defer_learning = True
+    delivered_orders.cursor().execute("DROP TABLE product_learning_queue")
+    assert manager.bulk_transition('complete_delivery', order_ids=[2])[0]['success']
+    assert count(delivered_orders, "SELECT status FROM orders WHERE id = 2") == 'delivered'
+
+
+def test_failed_learning_rolls_back_only_its_own_writes(manager, delivered_orders, monkeypatch):
+    def half_learn(order_ids):
+        delivered_orders.cursor().execute(
+            "INSERT INTO customer_items (customer_id, product_id, frequency_score) VALUES (1, 5, 1)")
+        delivered_orders.cursor().execute("UPDATE no_such_table SET x = 1")
+
+    monkeypatch.setattr(manager, '_update_customer_product_frequency', half_learn)
+    before = count(delivered_orders, "SELECT COUNT(*) FROM customer_items")
+    assert manager.complete_delivery(1) is True
+    assert count(delivered_orders, "SELECT COUNT(*) FROM customer_items") == before
+    assert count(delivered_orders, "SELECT status FROM orders WHERE id = 1") == 'delivered'
+
+
+class DroppedConnection:
+    """A connection MySQL has closed: every statement and the rollback fail"""
+
+    def cursor(self, *args, **kwargs):
+        return self
+
+    def execute(self, *args, **kwargs):
+        raise errors.OperationalError(msg="Lost connection to MySQL server during query", errno=2013)
+
+    def rollback(self):
+        raise errors.OperationalError(msg="MySQL Connection not available", errno=2055)
+
+    def is_connected(self):
+        return False
+
+
+def test_learning_worker_reconnects_after_the_connection_drops(delivered_orders, monkeypatch):
+    connections = [DroppedConnection(), delivered_orders]
+
+    def connect(manager):
+        manager.connection = connections.pop(0) if connections else delivered_orders
+        return True
+
+    monkeypatch.setattr(OrderManager, 'connect_database', connect)
+    monkeypatch.setattr(OrderManager, 'close_connection', lambda manager: None)
+    monkeypatch.setattr(OrderManager, '_update_customer_product_frequency', lambda manager, order_ids: None)
+    delivered_orders.cursor().execute("INSERT INTO product_learning_queue (order_id) VALUES (1)")
+    delivered_orders.commit()
+
+    stop = OrderManager({}).start_learning_worker(interval=0.01)
+    try:
+        for _ in range(200):
+            if not count(delivered_orders, "SELECT COUNT(*) FROM product_learning_queue"):
+                break
+            threading.Event().wait(0.01)
+    finally:
+        stop.set()
+    assert not connections
+    assert count(delivered_orders, "SELECT COUNT(*) FROM product_learning_queue") == 0
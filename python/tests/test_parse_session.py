@@ -0,0 +1,29 @@
+from parse_session import ParseSession
+from shorthand_parser import ShorthandParser
+
+
+def test_session_picks_up_abbreviation_edits(order_db, catalog):
+    parser = ShorthandParser({})
+    parser.connection = order_db
+    assert parser.load_abbreviation_index(refresh_interval=0)
+
+    session = ParseSession('s1')
+    text = f"{catalog.customer_codes[1]}\n3{catalog.product_codes[1][0]}\n2qzxw"
+    session.update(parser, text)
+    product_id = next(item.product_id for item in session.results[0][0])
+
+    # Someone teaches the parser a new abbreviation while the entry screen is open
+    order_db.cursor().execute(
+        "INSERT INTO product_abbreviations (customer_id, product_id, abbreviation, confidence_score, usage_count) "
+        "VALUES (%s, %s, %s, %s, %s)", (1, product_id, 'qzxw', 100, 1))
+    order_db.commit()
+
+    delta = session.update(parser, text)
+    assert delta['resolved_lines'] == 2
+    assert [item.product_id for item in session.results[1][0]] == [product_id]
+
+    # A customer correction also sees the reloaded index
+    order_db.cursor().execute("DELETE FROM product_abbreviations WHERE abbreviation = 'qzxw'")
+    order_db.commit()
+    session.reparse(parser, 1)
+    assert [item.product_id for item in session.results[1][0]] != [product_id]
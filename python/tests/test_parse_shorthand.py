@@ -0,0 +1,19 @@
+import json
+
+import pytest
+
+import parse_shorthand
+
+
+@pytest.mark.parametrize('argv', [
+    ['--sheet', 'g18\n2sm', '--workers'],
+    ['--sheet', '--workers', 'four', 'g18\n2sm'],
+    ['--sheet', '--workers', '0', 'g18\n2sm'],
+    ['--sheet', '--workers', '-2', 'g18\n2sm'],
+])
+def test_bad_workers_value_prints_usage(argv, monkeypatch, capsys):
+    monkeypatch.setattr('sys.argv', ['parse_shorthand.py'] + argv)
+    with pytest.raises(SystemExit) as exit_info:
+        parse_shorthand.main()
+    assert exit_info.value.code == 1
+    assert json.loads(capsys.readouterr().out) == {'error': parse_shorthand.USAGE}
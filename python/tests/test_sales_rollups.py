@@ -0,0 +1,147 @@
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import sales_rollups
+
+
+class Clock:
+    """updated_at values in the past (older than catch_up's settle window), always increasing"""
+
+    def __init__(self):
+        self.now = datetime.now().replace(microsecond=0) - timedelta(days=1)
+
+    def tick(self) -> datetime:
+        self.now += timedelta(seconds=1)
+        return self.now
+
+
+@pytest.fixture
+def orders(order_db):
+    rng = random.Random(3)
+    clock = Clock()
+    cursor = order_db.cursor()
+
+    def add(order_id):
+        cursor.execute(
+            "INSERT INTO orders (id, order_number, customer_id, order_date, status, updated_at) "
+            "VALUES (%s, %s, %s, %s, %s, %s)",
+            (order_id, f"T-{order_id}", rng.randint(1, 8), date(2024, 3, 1) + timedelta(days=rng.randrange(60)),
+             rng.choice(['draft', 'submitted', 'delivered', 'cancelled']), clock.tick()))
+        for _ in range(rng.randint(1, 4)):
+            quantity = rng.randint(1, 9)
+            cursor.execute(
+                "INSERT INTO order_items (order_id, product_id, quantity, delivered_quantity, line_total) "
+                "VALUES (%s, %s, %s, %s, %s)",
+                (order_id, rng.randint(1, 25), quantity, rng.choice([None, quantity]), quantity * 2.5))
+
+    def touch(order_id, **columns):
+        columns['updated_at'] = clock.tick()
+        assignments = ', '.join(f"{column} = %s" for column in columns)
+        cursor.execute(f"UPDATE orders SET {assignments} WHERE id = %s", list(columns.values()) + [order_id])
+
+    for order_id in range(1, 301):
+        add(order_id)
+    order_db.commit()
+    return add, touch
+
+
+def rollup_rows(connection):
+    cursor = connection.cursor()
+    tables = {}
+    for table in ('sales_daily_customer_product', 'sales_weekly_product'):
+        cursor.execute(f"SELECT * FROM {table}")
+        tables[table] = sorted(tuple(round(value, 4) if isinstance(value, float) else value for value in row)
+                               for row in cursor.fetchall())
+    return tables
+
+
+def naive_daily(connection):
+    cursor = connection.cursor()
+    cursor.execute("""
+        SELECT o.customer_id, o.order_date, oi.product_id, SUM(oi.quantity),
+               SUM(COALESCE(oi.delivered_quantity, 0)), SUM(oi.line_total), COUNT(DISTINCT o.id)
+        FROM orders o JOIN order_items oi ON oi.order_id = o.id
+        WHERE o.status <> 'cancelled'
+        GROUP BY o.customer_id, o.order_date, oi.product_id
+    """)
+    return sorted(tuple(round(value, 4) if isinstance(value, float) else value for value in row)
+                  for row in cursor.fetchall())
+
+
+def customer_of(connection, order_id):
+    cursor = connection.cursor()
+    cursor.execute("SELECT customer_id FROM orders WHERE id = %s", (order_id,))
+    return cursor.fetchone()[0]
+
+
+def test_rebuild_matches_orders(order_db, orders):
+    assert sales_rollups.rebuild(order_db) > 0
+    assert rollup_rows(order_db)['sales_daily_customer_product'] == naive_daily(order_db)
+
+
+def test_catch_up_matches_rebuild_after_changes(order_db, orders):
+    add, touch = orders
+    assert sales_rollups.catch_up(order_db, batch_size=64) == 300
+
+    # Moves between customers and days, cancellations, new orders, changed items
+    touch(5, order_date=date(2024, 6, 20))
+    touch(6, customer_id=8 if customer_of(order_db, 6) != 8 else 1)
+    touch(7, customer_id=2, order_date=date(2024, 2, 26))
+    touch(8, status='cancelled')
+    touch(9, status='draft')
+    order_db.cursor().execute("DELETE FROM order_items WHERE order_id = 10")
+    touch(10)
+    order_db.cursor().execute("UPDATE order_items SET product_id = 24 WHERE order_id = 11")
+    touch(11)
+    for order_id in range(301, 311):
+        add(order_id)
+    order_db.commit()
+
+    assert sales_rollups.catch_up(order_db, batch_size=4) == 17
+    assert sales_rollups.catch_up(order_db) == 0
+    incremental = rollup_rows(order_db)
+    assert incremental['sales_daily_customer_product'] == naive_daily(order_db)
+
+    sales_rollups.rebuild(order_db)
+    assert rollup_rows(order_db) == incremental
+
+
+def test_refresh_orders_forgets_deleted_order(order_db, orders):
+    sales_rollups.rebuild(order_db)
+    cursor = order_db.cursor()
+    cursor.execute("DELETE FROM order_items WHERE order_id = 12")
+    cursor.execute("DELETE FROM orders WHERE id = 12")
+    sales_rollups.refresh_orders(order_db, [12])
+    order_db.commit()
+
+    assert rollup_rows(order_db)['sales_daily_customer_product'] == naive_daily(order_db)
+    cursor.execute("SELECT COUNT(*) FROM sales_rollup_orders WHERE order_id = 12")
+    assert cursor.fetchone()[0] == 0
+
+
+def test_order_changes_are_stamped_by_the_database_clock(manager, order_db, monkeypatch):
+    import order_manager
+
+    class SlowClock(datetime):
+        """The app host's clock, an hour behind MySQL's"""
+
+        @classmethod
+        def now(cls, tz=None):
+            return datetime.now(tz) - timedelta(hours=1)
+
+    monkeypatch.setattr(order_manager, 'datetime', SlowClock)
+    cursor = order_db.cursor()
+    cursor.executemany(
+        "INSERT INTO orders (id, order_number, customer_id, order_date, status) VALUES (%s, %s, 1, %s, %s)",
+        [(1, 'C-1', date(2024, 6, 3), 'submitted'), (2, 'C-2', date(2024, 6, 3), 'submitted'),
+         (3, 'C-3', date(2024, 6, 3), 'draft')])
+    order_db.commit()
+
+    assert manager.start_delivery(1)
+    assert manager.bulk_transition('start_delivery', order_ids=[2])[0]['success']
+    assert manager.submit_order(3)
+
+    cursor.execute("SELECT COUNT(*) FROM orders WHERE updated_at < NOW() - INTERVAL %s SECOND", (60,))
+    assert cursor.fetchone()[0] == 0
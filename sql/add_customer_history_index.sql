@@ -0,0 +1,10 @@
+-- Index for paging customer order history newest first
+-- OrderManager.get_customer_order_history seeks on
+-- (customer_id, order_date, created_at, id); InnoDB secondary indexes carry
+-- the primary key, so id doesn't need to be listed.
+
+USE orders;
+
+ALTER TABLE orders ADD INDEX idx_customer_history (customer_id, order_date, created_at);
+
+SELECT 'Customer history index created' AS status;
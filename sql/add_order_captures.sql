@@ -0,0 +1,17 @@
+-- Order capture ids for the write-behind order journal
+-- With a journal, OrderManager.save_order appends the order to a local file
+-- and returns its capture id; the journal writer saves it later and records
+-- the capture id here in the same transaction, so replaying the journal
+-- after a crash skips orders that were already saved.
+
+USE orders;
+
+CREATE TABLE IF NOT EXISTS order_captures (
+    capture_id CHAR(32) PRIMARY KEY, -- Provisional id returned by save_order
+    order_id INT NOT NULL,
+    captured_at DATETIME NOT NULL, -- When the clerk entered it
+    saved_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (order_id) REFERENCES orders(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='Journaled orders saved to MySQL';
+
+SELECT 'Order captures table created' AS status;
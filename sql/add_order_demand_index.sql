@@ -0,0 +1,9 @@
+-- Index for pick lists and product demand by delivery date
+-- order_aggregation.py selects orders by delivery_date (falling back to
+-- order_date, already indexed by idx_order_date) and status.
+
+USE orders;
+
+ALTER TABLE orders ADD INDEX idx_delivery_date (delivery_date, status);
+
+SELECT 'Order demand index created' AS status;
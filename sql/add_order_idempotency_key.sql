@@ -0,0 +1,15 @@
+-- Idempotency key for order saves
+-- save_order (Python and php/save_order.php) looks the key up before
+-- inserting, so a double-click or retry returns the order it already created.
+-- The key is caller-supplied or derived from the customer, the normalized
+-- input and a 10 minute bucket (python/order_keys.py); repeats within 10 minutes
+-- are always caught, up to 20 minutes apart sometimes. NULLs don't collide,
+-- so existing orders need no backfill.
+
+USE orders;
+
+ALTER TABLE orders
+    ADD COLUMN idempotency_key CHAR(64) NULL AFTER original_input,
+    ADD UNIQUE KEY uniq_idempotency_key (idempotency_key);
+
+SELECT 'Order idempotency key added' AS status;
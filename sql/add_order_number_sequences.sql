@@ -0,0 +1,23 @@
+-- Per-day order number counters
+-- Replaces the MAX(SUBSTRING(order_number, 10)) scan: each save reserves its
+-- number with one atomic upsert on the day's row, so numbers stay unique
+-- across concurrent writers and allocation cost doesn't grow with orders.
+
+USE orders;
+
+CREATE TABLE IF NOT EXISTS order_number_sequences (
+    sequence_date DATE PRIMARY KEY,
+    last_value INT UNSIGNED NOT NULL DEFAULT 0, -- Last NNNN handed out for the day
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='Order number counters (YYYYMMDD-NNNN)';
+
+-- Start every day that already has orders after its highest existing number
+INSERT INTO order_number_sequences (sequence_date, last_value)
+SELECT STR_TO_DATE(LEFT(order_number, 8), '%Y%m%d'),
+       MAX(CAST(SUBSTRING(order_number, 10) AS UNSIGNED))
+FROM orders
+WHERE order_number REGEXP '^[0-9]{8}-[0-9]+$'
+GROUP BY LEFT(order_number, 8)
+ON DUPLICATE KEY UPDATE last_value = GREATEST(last_value, VALUES(last_value));
+
+SELECT 'Order number sequences created' AS status;
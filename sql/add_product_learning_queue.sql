@@ -0,0 +1,15 @@
+-- Deferred product learning queue
+-- With defer_learning, complete_delivery records the delivered order here in
+-- its own transaction instead of updating customer_items and
+-- product_abbreviations inline; OrderManager.apply_learning_queue (or
+-- order_manager.py --apply-learning) applies the queue in batches.
+
+USE orders;
+
+CREATE TABLE IF NOT EXISTS product_learning_queue (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY, -- Applied in id order
+    order_id INT NOT NULL,
+    queued_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='Delivered orders waiting for product learning';
+
+SELECT 'Product learning queue created' AS status;
@@ -0,0 +1,57 @@
+-- Sales rollup tables for reporting
+-- python/sales_rollups.py keeps per (customer, product, day) and per
+-- (product, week) totals current: `sales_rollups.py --catch-up` (or
+-- sales_rollups.start_catch_up_worker) picks up orders changed since its
+-- high-water mark, outside the order entry path. Run
+-- `sales_rollups.py --rebuild` once after creating the tables to fill them
+-- from existing orders.
+
+USE orders;
+
+CREATE TABLE IF NOT EXISTS sales_daily_customer_product (
+    customer_id INT NOT NULL,
+    sales_date DATE NOT NULL, -- orders.order_date
+    product_id INT NOT NULL,
+    quantity DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    delivered_quantity DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    revenue DECIMAL(14,2) NOT NULL DEFAULT 0.00, -- Sum of line_total
+    orders INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (customer_id, sales_date, product_id),
+    INDEX idx_product_date (product_id, sales_date)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='Sales per customer, product and order day';
+
+CREATE TABLE IF NOT EXISTS sales_weekly_product (
+    product_id INT NOT NULL,
+    week_start DATE NOT NULL, -- Monday
+    quantity DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    delivered_quantity DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    revenue DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    orders INT NOT NULL DEFAULT 0,
+    customers INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (product_id, week_start),
+    INDEX idx_week (week_start)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='Sales per product and week';
+
+-- The (customer, day) each order was last rolled into, so an order moved to
+-- another customer or date has its old day recomputed too
+CREATE TABLE IF NOT EXISTS sales_rollup_orders (
+    order_id INT PRIMARY KEY,
+    customer_id INT NOT NULL,
+    sales_date DATE NOT NULL,
+    INDEX idx_sales_date (sales_date)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='Where each order is counted in the sales rollups';
+
+-- How far the catch-up job has read orders, by (updated_at, id)
+CREATE TABLE IF NOT EXISTS sales_rollup_state (
+    name VARCHAR(50) PRIMARY KEY,
+    high_water_mark DATETIME NOT NULL,
+    last_order_id INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='Sales rollup catch-up position';
+
+-- The catch-up job walks orders by updated_at
+ALTER TABLE orders ADD INDEX idx_updated_at (updated_at, id);
+
+SELECT 'Sales rollup tables created' AS status;
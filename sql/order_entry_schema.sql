@@ -3,8 +3,15 @@
 -- Created: November 11, 2025
 
 -- Drop tables if they exist (for development)
+DROP TABLE IF EXISTS sales_rollup_state;
+DROP TABLE IF EXISTS sales_rollup_orders;
+DROP TABLE IF EXISTS sales_weekly_product;
+DROP TABLE IF EXISTS sales_daily_customer_product;
+DROP TABLE IF EXISTS product_learning_queue;
 DROP TABLE IF EXISTS order_items;
+DROP TABLE IF EXISTS order_captures;
 DROP TABLE IF EXISTS orders;
+DROP TABLE IF EXISTS order_number_sequences;
 DROP TABLE IF EXISTS customer_items;
 DROP TABLE IF EXISTS customers;
 DROP TABLE IF EXISTS uom;
@@ -97,13 +104,85 @@ CREATE TABLE orders (
     notes TEXT,
     delivery_instructions TEXT,
     original_input TEXT, -- Store the original shorthand input for reference
+    idempotency_key CHAR(64), -- Repeated saves of this order find it by this (python/order_keys.py)
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     FOREIGN KEY (customer_id) REFERENCES customers(id),
     INDEX idx_order_number (order_number),
     INDEX idx_customer_date (customer_id, order_date),
+    INDEX idx_customer_history (customer_id, order_date, created_at), -- keyset paging of history
     INDEX idx_status (status),
-    INDEX idx_order_date (order_date)
+    INDEX idx_order_date (order_date),
+    INDEX idx_delivery_date (delivery_date, status), -- pick lists by delivery date
+    INDEX idx_updated_at (updated_at, id), -- sales rollup catch-up
+    UNIQUE KEY uniq_idempotency_key (idempotency_key)
+);
+
+-- Per-day order number counters (YYYYMMDD-NNNN), reserved with one atomic upsert
+CREATE TABLE order_number_sequences (
+    sequence_date DATE PRIMARY KEY,
+    last_value INT UNSIGNED NOT NULL DEFAULT 0, -- Last NNNN handed out for the day
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+-- Journaled orders already written to MySQL, by capture id (OrderManager.drain_journal)
+CREATE TABLE order_captures (
+    capture_id CHAR(32) PRIMARY KEY, -- Provisional id returned by save_order
+    order_id INT NOT NULL,
+    captured_at DATETIME NOT NULL, -- When the clerk entered it
+    saved_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (order_id) REFERENCES orders(id) ON DELETE CASCADE
+);
+
+-- Delivered orders waiting for deferred product learning (OrderManager.apply_learning_queue)
+CREATE TABLE product_learning_queue (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY, -- Applied in id order
+    order_id INT NOT NULL,
+    queued_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Sales per customer, product and order day (python/sales_rollups.py)
+CREATE TABLE sales_daily_customer_product (
+    customer_id INT NOT NULL,
+    sales_date DATE NOT NULL, -- orders.order_date
+    product_id INT NOT NULL,
+    quantity DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    delivered_quantity DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    revenue DECIMAL(14,2) NOT NULL DEFAULT 0.00, -- Sum of line_total
+    orders INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (customer_id, sales_date, product_id),
+    INDEX idx_product_date (product_id, sales_date)
+);
+
+-- Sales per product and week (Monday), from sales_daily_customer_product
+CREATE TABLE sales_weekly_product (
+    product_id INT NOT NULL,
+    week_start DATE NOT NULL,
+    quantity DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    delivered_quantity DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    revenue DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    orders INT NOT NULL DEFAULT 0,
+    customers INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (product_id, week_start),
+    INDEX idx_week (week_start)
+);
+
+-- The (customer, day) each order was last rolled into (old days are recomputed when it moves)
+CREATE TABLE sales_rollup_orders (
+    order_id INT PRIMARY KEY,
+    customer_id INT NOT NULL,
+    sales_date DATE NOT NULL,
+    INDEX idx_sales_date (sales_date)
+);
+
+-- Sales rollup catch-up position, by orders (updated_at, id)
+CREATE TABLE sales_rollup_state (
+    name VARCHAR(50) PRIMARY KEY,
+    high_water_mark DATETIME NOT NULL,
+    last_order_id INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
 );
 
 -- Order Items table
@@ -8,6 +8,7 @@
 -- Drop tables if they exist (for development)
 DROP TABLE IF EXISTS order_items;
 DROP TABLE IF EXISTS orders;
+DROP TABLE IF EXISTS order_number_sequences;
 DROP TABLE IF EXISTS customer_items;
 DROP TABLE IF EXISTS product_abbreviations;
 DROP TABLE IF EXISTS customer_abbreviations;
@@ -132,13 +133,22 @@ CREATE TABLE orders (
     notes TEXT,
     delivery_instructions TEXT,
     original_input TEXT,
+    idempotency_key CHAR(64), -- Repeated saves of this order find it by this (python/order_keys.py)
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     FOREIGN KEY (customer_id) REFERENCES customers(id),
     INDEX idx_order_number (order_number),
     INDEX idx_customer_date (customer_id, order_date),
     INDEX idx_status (status),
-    INDEX idx_order_date (order_date)
+    INDEX idx_order_date (order_date),
+    UNIQUE KEY uniq_idempotency_key (idempotency_key)
+);
+
+-- Per-day order number counters (YYYYMMDD-NNNN), reserved with one atomic upsert
+CREATE TABLE order_number_sequences (
+    sequence_date DATE PRIMARY KEY,
+    last_value INT UNSIGNED NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
 );
 
 -- Order Items table